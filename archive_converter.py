@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩包批量转换
+
+直接从zip/tar压缩包中逐个读取待转换的文件，并行转换后把结果写入一个新的zip包，
+整个过程不解压到磁盘：
+- zip包按中央目录逐个读取成员，tar包（含 .tar.gz/.tar.bz2/.tar.xz）按流顺序读取
+- 成员数量、单个文件大小、总大小和压缩比都有上限，防止压缩炸弹；
+  声明的大小不可信，读取时按实际字节数再检查一次；
+  tar流跳过成员时同样要解压，所以跳过的成员也计入总大小，压缩比按整个流检查
+- 同时在转换中的文件数不超过进程数的两倍，内存占用与压缩包大小无关
+- 结果包边转换边写出，可以直接作为HTTP响应流返回；最后附带一份转换报告
+- 结果文件名按源文件在压缩包中的顺序确定，a.md 和 a.txt 这样同名不同扩展名的文件
+  不会互相覆盖：先读到的为 a.html，后读到的保留源文件扩展名为 a.txt.html
+"""
+
+import io
+import itertools
+import json
+import posixpath
+import tarfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from format_sniffer import format_from_suffix
+
+# 支持的压缩包扩展名
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+# 结果包中的转换报告文件名
+REPORT_NAME = 'conversion_report.json'
+
+# 每次从压缩包成员中读取的字节数
+_READ_CHUNK = 1024 * 1024
+
+# tar流解压后小于这个大小时不检查压缩比（tar的块填充本身压缩比很高）
+_MIN_RATIO_CHECK_BYTES = 1024 * 1024
+
+
+class ArchiveError(ValueError):
+    """压缩包无效或超出大小限制"""
+
+
+class ArchiveLimits:
+    """压缩包大小限制"""
+
+    def __init__(self, max_members=5000, max_member_bytes=64 * 1024 * 1024,
+                 max_total_bytes=512 * 1024 * 1024, max_ratio=200):
+        """初始化
+
+        Args:
+            max_members (int): 最多包含的成员数（含目录和跳过的文件）
+            max_member_bytes (int): 单个文件解压后的大小上限，超过的文件不转换
+            max_total_bytes (int): 所有文件解压后的总大小上限，超过时中止
+            max_ratio (int): 压缩比上限：zip按成员检查，超过的文件不转换；tar按整个流检查，超过时中止
+        """
+        self.max_members = max_members
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_ratio = max_ratio
+
+
+def is_archive(file_path):
+    """根据文件名判断是否为支持的压缩包"""
+    return str(file_path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def safe_member_name(name):
+    """规范化成员路径，绝对路径或包含 .. 的路径返回 None"""
+    name = name.replace('\\', '/')
+    if name.startswith('/') or (len(name) > 1 and name[1] == ':'):
+        return None
+    normalized = posixpath.normpath(name)
+    if normalized in ('', '.') or normalized == '..' or normalized.startswith('../'):
+        return None
+    return normalized
+
+
+def _skip_reason(name):
+    """不需要转换的成员返回原因，需要转换时返回 None"""
+    parts = name.split('/')
+    if parts[0] == '__MACOSX' or any(part.startswith('.') for part in parts):
+        return '隐藏文件'
+    if format_from_suffix(name) == 'unknown':
+        return '不支持的格式'
+    return None
+
+
+def _read_bounded(stream, limit):
+    """最多读取 limit 字节，超过时返回 None"""
+    chunks = []
+    size = 0
+    while True:
+        chunk = stream.read(_READ_CHUNK)
+        if not chunk:
+            return b''.join(chunks)
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+
+
+class _CountingReader:
+    """记录已读取字节数的文件对象包装（tar流的压缩后大小）"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class ArchiveReader:
+    """逐个读取压缩包中待转换的文件
+
+    迭代时生成 (成员名, 文件内容)；跳过的成员记录在 skipped 中（成员名, 原因）。
+    """
+
+    def __init__(self, source, limits=None):
+        """初始化
+
+        Args:
+            source: 压缩包路径，或以二进制方式打开的文件对象（zip包需要可随机读取）
+            limits (ArchiveLimits): 大小限制
+        """
+        self.source = source
+        self.limits = limits or ArchiveLimits()
+        self.skipped = []
+        self.members = 0
+        self.total_bytes = 0
+        self.expanded_bytes = 0
+
+    def _is_zip(self):
+        if not hasattr(self.source, 'read'):
+            return zipfile.is_zipfile(self.source)
+        if not self.source.seekable():
+            return False
+        position = self.source.tell()
+        try:
+            return zipfile.is_zipfile(self.source)
+        finally:
+            self.source.seek(position)
+
+    def _count(self):
+        self.members += 1
+        if self.members > self.limits.max_members:
+            raise ArchiveError(f"压缩包中的文件超过 {self.limits.max_members} 个")
+
+    def _accept(self, raw_name, size):
+        """检查成员名和声明的大小，返回规范化的成员名，不转换时返回 None"""
+        name = safe_member_name(raw_name)
+        if name is None:
+            self.skipped.append((raw_name, '不安全的路径'))
+            return None
+        reason = _skip_reason(name)
+        if reason is None and size > self.limits.max_member_bytes:
+            reason = '文件过大'
+        if reason:
+            self.skipped.append((name, reason))
+            return None
+        return name
+
+    def _expand(self, size):
+        """累计解压的字节数，超过总大小上限时中止"""
+        self.expanded_bytes += size
+        if self.expanded_bytes > self.limits.max_total_bytes:
+            raise ArchiveError(f"压缩包解压后超过 {self.limits.max_total_bytes // 1024 // 1024} MB")
+
+    def _check_ratio(self, expanded, compressed):
+        """检查tar流整体的压缩比"""
+        if expanded >= _MIN_RATIO_CHECK_BYTES and expanded > max(compressed, 1) * self.limits.max_ratio:
+            raise ArchiveError(f"压缩包的压缩比超过 {self.limits.max_ratio}，疑似压缩炸弹")
+
+    def _take(self, name, stream, counted=False):
+        """按实际大小读取成员内容，不可信的声明大小在这里再检查一次
+
+        Args:
+            counted (bool): 解压大小是否已计入总大小（tar成员按声明大小预先计入）
+        """
+        data = _read_bounded(stream, self.limits.max_member_bytes)
+        if data is None:
+            self.skipped.append((name, '文件过大'))
+            return None
+        if not counted:
+            self._expand(len(data))
+        self.total_bytes += len(data)
+        return data
+
+    def _iter_zip(self):
+        try:
+            archive = zipfile.ZipFile(self.source)
+        except zipfile.BadZipFile as e:
+            raise ArchiveError(f"无效的zip压缩包: {e}") from e
+
+        with archive:
+            infos = archive.infolist()
+            if len(infos) > self.limits.max_members:
+                raise ArchiveError(f"压缩包中的文件超过 {self.limits.max_members} 个")
+            for info in infos:
+                self._count()
+                if info.is_dir():
+                    continue
+                name = self._accept(info.filename, info.file_size)
+                if name is None:
+                    continue
+                if info.file_size > max(info.compress_size, 1) * self.limits.max_ratio:
+                    self.skipped.append((name, '压缩比异常'))
+                    continue
+                with archive.open(info) as stream:
+                    data = self._take(name, stream)
+                if data is not None:
+                    yield name, data
+
+    def _iter_tar(self):
+        if hasattr(self.source, 'read'):
+            yield from self._iter_tar_stream(self.source)
+        else:
+            with open(self.source, 'rb') as f:
+                yield from self._iter_tar_stream(f)
+
+    def _iter_tar_stream(self, source):
+        compressed = _CountingReader(source)
+        try:
+            archive = tarfile.open(fileobj=compressed, mode='r|*')
+        except tarfile.TarError as e:
+            raise ArchiveError("不支持的压缩包格式，请使用zip或tar包") from e
+
+        with archive:
+            try:
+                for info in archive:
+                    # 读到这个成员时，前面的成员（包括跳过的）都已解压
+                    self._check_ratio(info.offset, compressed.bytes_read)
+                    self._count()
+                    if not info.isfile():
+                        continue
+                    # 跳过的成员在读下一个成员时仍会被解压，按声明大小计入总大小
+                    self._expand(info.size)
+                    name = self._accept(info.name, info.size)
+                    if name is None:
+                        continue
+                    data = self._take(name, archive.extractfile(info), counted=True)
+                    self._check_ratio(info.offset_data + info.size, compressed.bytes_read)
+                    if data is not None:
+                        yield name, data
+                self._check_ratio(archive.offset, compressed.bytes_read)
+            except tarfile.TarError as e:
+                raise ArchiveError(f"无效的tar压缩包: {e}") from e
+
+    def __iter__(self):
+        return self._iter_zip() if self._is_zip() else self._iter_tar()
+
+
+# 子进程中的转换器（由 _init_worker 创建）
+_worker_converter = None
+
+
+def _init_worker(converter_class, options):
+    """子进程初始化：每个进程只创建一次转换器"""
+    global _worker_converter
+    _worker_converter = converter_class(**options)
+
+
+def output_name(name, used):
+    """结果包中的文件名，与已使用的文件名（不区分大小写）不重复
+
+    Args:
+        name (str): 压缩包中的源文件名
+        used (set): 已使用的文件名（小写），会加入本次返回的文件名
+
+    Returns:
+        str: 结果文件名
+    """
+    stem = posixpath.splitext(name)[0]
+    candidates = itertools.chain([stem + '.html', name + '.html'], (f'{name}.{n}.html' for n in itertools.count(2)))
+    for candidate in candidates:
+        if candidate.lower() not in used:
+            used.add(candidate.lower())
+            return candidate
+
+
+def convert_member(job, converter=None):
+    """转换压缩包中的一个文件，可在子进程中执行
+
+    Args:
+        job (dict): 转换任务，包含 name, data, title, subtitle 和结果文件名 output
+        converter: 转换器，为 None 时使用子进程中的转换器
+
+    Returns:
+        dict: 转换结果，成功时包含 html
+    """
+    converter = converter or _worker_converter
+    name = job['name']
+    output = job.get('output') or posixpath.splitext(name)[0] + '.html'
+    result = {'source': name, 'output': output, 'bytes_in': len(job['data'])}
+    start = time.perf_counter()
+
+    try:
+        result['html'] = converter.convert_bytes(job['data'], name, job.get('title', ''), job.get('subtitle', ''))
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+class _StreamBuffer(io.RawIOBase):
+    """不可随机写入的输出缓冲区，zip包写入后由调用方取走已生成的数据"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ArchiveConverter:
+    """压缩包转换器：从压缩包中读取文件并行转换，结果写入新的zip包"""
+
+    def __init__(self, converter, workers=1, limits=None, mp_context=None):
+        """初始化
+
+        Args:
+            converter: UniversalToWeChatConverter 转换器
+            workers (int): 并行转换的进程数，1表示在当前进程中顺序转换
+            limits (ArchiveLimits): 压缩包大小限制
+            mp_context: 创建转换进程的 multiprocessing 上下文，为 None 时使用平台默认方式；
+                在多线程的程序（如网站）中应使用 spawn，fork 出的子进程可能继承其他线程持有的锁
+        """
+        self.converter = converter
+        self.workers = max(1, workers)
+        self.limits = limits or ArchiveLimits()
+        self.mp_context = mp_context
+        # 最近一次转换的报告
+        self.report = None
+
+    def worker_options(self):
+        """子进程中创建转换器的参数"""
+        return {
+            'style': self.converter.style,
+            'docx_engine': self.converter.docx_engine,
+            'asset_store': self.converter.asset_store,
+            'markdown_cache': self.converter.markdown_cache,
+        }
+
+    def iter_results(self, reader, title="", subtitle=""):
+        """逐个产出转换结果（按完成顺序）
+
+        同时提交的任务数不超过进程数的两倍，压缩包中的文件按需读取。
+        """
+        used = {REPORT_NAME.lower()}
+        jobs = (
+            {'name': name, 'data': data, 'title': title, 'subtitle': subtitle, 'output': output_name(name, used)}
+            for name, data in reader
+        )
+
+        if self.workers == 1:
+            for job in jobs:
+                yield convert_member(job, self.converter)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self.mp_context,
+            initializer=_init_worker,
+            initargs=(type(self.converter), self.worker_options())
+        ) as executor:
+            running = set()
+
+            def submit_next():
+                job = next(jobs, None)
+                if job is not None:
+                    running.add(executor.submit(convert_member, job))
+
+            for _ in range(self.workers * 2):
+                submit_next()
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.remove(future)
+                    submit_next()
+                    yield future.result()
+
+    def iter_archive(self, source, title="", subtitle=""):
+        """转换压缩包，逐段产出结果zip包的字节（可直接作为HTTP响应流）"""
+        reader = ArchiveReader(source, self.limits)
+        buffer = _StreamBuffer()
+        report = {'started_at': datetime.now().isoformat(), 'results': []}
+
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as output:
+            for result in self.iter_results(reader, title, subtitle):
+                html_content = result.pop('html', None)
+                if html_content is not None:
+                    output.writestr(result['output'], html_content)
+                report['results'].append(result)
+                data = buffer.drain()
+                if data:
+                    yield data
+
+            report['results'].sort(key=lambda item: item['source'])
+            report['converted'] = sum(1 for item in report['results'] if item['status'] == 'ok')
+            report['failed'] = len(report['results']) - report['converted']
+            report['skipped'] = [{'source': name, 'reason': reason} for name, reason in reader.skipped]
+            report['bytes_in'] = reader.total_bytes
+            report['finished_at'] = datetime.now().isoformat()
+            output.writestr(REPORT_NAME, json.dumps(report, ensure_ascii=False, indent=2))
+
+        yield buffer.drain()
+        self.report = report
+
+    def convert(self, source, output_file, title="", subtitle=""):
+        """转换压缩包并写入结果zip包
+
+        Returns:
+            dict: 转换报告
+        """
+        with open(output_file, 'wb') as f:
+            for data in self.iter_archive(source, title, subtitle):
+                f.write(data)
+        return self.report
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址的资源存储
+
+Word文档中的图片按内容哈希命名保存：同一张图片只保存一份，
+重复上传同一文档时已处理过的图片直接复用，不再解码和重新编码。
+"""
+
+import hashlib
+import io
+import os
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 尝试导入可选依赖
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# 图片处理流程版本，处理方式变化时递增，使图片重新生成
+IMAGE_PIPELINE_VERSION = '1'
+
+# 浏览器可以直接显示的图片格式（扩展名 -> Pillow格式名）
+WEB_IMAGE_FORMATS = {
+    '.png': 'PNG',
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.gif': 'GIF',
+    '.webp': 'WEBP',
+}
+
+# 超过此宽度的图片缩小后保存（微信公众号正文宽度远小于此值）
+MAX_IMAGE_WIDTH = 1920
+
+# 单个媒体文件解压后的大小上限，超过的文件不提取
+MAX_MEDIA_BYTES = 32 * 1024 * 1024
+
+# Word文档中媒体文件所在的目录
+DOCX_MEDIA_PREFIX = 'word/media/'
+
+
+def content_digest(data):
+    """图片的内容哈希（包含处理流程版本）"""
+    digest = hashlib.sha256(f'{IMAGE_PIPELINE_VERSION}:'.encode('utf-8'))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def prepare_image(data, suffix):
+    """解码图片并在需要时重新编码
+
+    浏览器不能直接显示的格式（如BMP、TIFF）转换为PNG，过宽的图片缩小；
+    其余图片保留原始数据，避免有损格式重复压缩。无法解码的文件（如EMF）原样保存。
+
+    Returns:
+        tuple: (图片数据, 扩展名)
+    """
+    if not PIL_AVAILABLE:
+        return data, suffix
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Exception:
+        return data, suffix
+
+    convert = suffix not in WEB_IMAGE_FORMATS
+    resize = image.width > MAX_IMAGE_WIDTH and not getattr(image, 'is_animated', False)
+    if not convert and not resize:
+        return data, suffix
+
+    if resize:
+        height = max(1, round(image.height * MAX_IMAGE_WIDTH / image.width))
+        image = image.resize((MAX_IMAGE_WIDTH, height), Image.LANCZOS)
+
+    if convert:
+        suffix = '.png'
+    image_format = WEB_IMAGE_FORMATS[suffix]
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    output = io.BytesIO()
+    image.save(output, format=image_format, optimize=True)
+    return output.getvalue(), suffix
+
+
+class AssetStore:
+    """按内容哈希保存资源文件的目录
+
+    文件保存为 <哈希前两位>/<哈希><扩展名>，写入是原子的，
+    多个进程同时保存同一资源也不会产生半个文件。
+    """
+
+    def __init__(self, root, url_prefix='assets'):
+        """初始化资源存储
+
+        Args:
+            root (str): 资源目录
+            url_prefix (str): 文章中引用资源使用的地址前缀
+        """
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip('/')
+
+    @classmethod
+    def for_output(cls, root, output_file):
+        """创建资源存储，文章中使用相对于输出文件的地址引用资源"""
+        output_dir = Path(output_file).resolve().parent
+        url_prefix = Path(os.path.relpath(Path(root).resolve(), output_dir)).as_posix()
+        return cls(root, url_prefix=url_prefix)
+
+    def find(self, digest):
+        """查找已保存的资源，返回资源名，不存在时返回 None"""
+        directory = self.root / digest[:2]
+        if not directory.is_dir():
+            return None
+        for path in directory.glob(f'{digest}.*'):
+            return f'{digest[:2]}/{path.name}'
+        return None
+
+    def put(self, digest, data, suffix):
+        """保存资源，已存在时直接返回资源名"""
+        name = f'{digest[:2]}/{digest}{suffix}'
+        path = self.root / name
+        if path.exists():
+            return name
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        return name
+
+    def url(self, name):
+        """资源在文章中的引用地址"""
+        return f'{self.url_prefix}/{name}' if self.url_prefix else name
+
+
+class DocxImages:
+    """Word文档中的图片到资源地址的映射"""
+
+    def __init__(self, store, part_names, digest_names, stored=0, reused=0):
+        """初始化
+
+        Args:
+            store (AssetStore): 资源存储
+            part_names (dict): 文档包中的文件名 -> 资源名
+            digest_names (dict): 内容哈希 -> 资源名
+            stored (int): 本次新保存的图片数
+            reused (int): 直接复用的图片数
+        """
+        self.store = store
+        self.part_names = part_names
+        self.digest_names = digest_names
+        self.stored = stored
+        self.reused = reused
+
+    def url_for_part(self, partname):
+        """按文档包中的文件名（如 /word/media/image1.png）查找图片地址"""
+        name = self.part_names.get(partname.lstrip('/'))
+        return self.store.url(name) if name else None
+
+    def url_for_bytes(self, data):
+        """按图片内容查找图片地址"""
+        name = self.digest_names.get(content_digest(data))
+        return self.store.url(name) if name else None
+
+
+def extract_docx_images(source, store, workers=4):
+    """提取Word文档中的图片并保存到资源存储
+
+    相同内容的图片只处理一次；资源存储中已有的图片直接复用，
+    其余图片在线程池中解码和重新编码（Pillow在编解码时释放GIL）。
+
+    Args:
+        source: Word文档路径或以二进制方式打开的文件对象
+        store (AssetStore): 资源存储
+        workers (int): 线程数
+
+    Returns:
+        DocxImages: 图片地址映射
+    """
+    with zipfile.ZipFile(source) as archive:
+        blobs = {
+            info.filename: archive.read(info)
+            for info in archive.infolist()
+            if info.filename.startswith(DOCX_MEDIA_PREFIX)
+            and not info.is_dir()
+            and info.file_size <= MAX_MEDIA_BYTES
+        }
+
+    digests = {}
+    unique = {}
+    for part_name, data in blobs.items():
+        digest = content_digest(data)
+        digests[part_name] = digest
+        unique.setdefault(digest, (data, posixpath.splitext(part_name)[1].lower()))
+
+    digest_names = {}
+    pending = []
+    for digest in unique:
+        name = store.find(digest)
+        if name:
+            digest_names[digest] = name
+        else:
+            pending.append(digest)
+
+    def process(digest):
+        data, suffix = prepare_image(*unique[digest])
+        return digest, store.put(digest, data, suffix)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            for digest, name in executor.map(process, pending):
+                digest_names[digest] = name
+
+    part_names = {part_name: digest_names[digest] for part_name, digest in digests.items()}
+    return DocxImages(store, part_names, digest_names, stored=len(pending), reused=len(unique) - len(pending))
@@ -0,0 +1,1100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量转换器
+将目录中的文档批量转换为微信公众号HTML
+
+功能：
+1. 递归收集目录中所有支持格式的输入文件
+2. 基于本地git仓库的增量转换：只转换指定提交（或上次构建提交）之后变更的文件；
+   构建状态还记录上次转换过的源文件及其内容指纹，git差异看不到的变化
+   （未跟踪文件被删除、未提交的修改被撤销）也能发现
+3. 源文件被删除或重命名时，同步删除对应的输出文件
+4. 确定性分片：多台机器各自处理互不重叠的一部分文件，最后合并分片清单并校验覆盖完整
+5. 断点续转：完成和失败的文件记录到预写日志，中断后使用 --resume 跳过已完成的文件
+6. 任务清单：按清单为每篇文章分别指定风格、标题、副标题和输出路径，
+   转换结果以JSON Lines流的形式实时输出，供下游工具边转换边消费
+7. 进度报告：显示吞吐量（篇/秒、MB/秒）、预计剩余时间、进行中的任务数和当前最慢的任务
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from format_sniffer import format_from_suffix
+from fs_utils import atomic_write_text
+from markdown_cache import source_digest
+from universal_converter import UniversalToWeChatConverter
+from wechat_styles import WeChatStyleTemplates
+
+# 构建状态文件（保存在输出目录中），记录上次成功构建时的提交和风格
+BUILD_STATE_FILE = '.wechat_build_state.json'
+
+# 断点续转日志文件（保存在输出目录中）
+JOURNAL_FILE = '.batch_journal.jsonl'
+
+
+class GitError(RuntimeError):
+    """git命令执行失败"""
+
+
+class GitChangeDetector:
+    """基于本地git仓库的变更检测
+
+    只调用本地git命令读取 .git 目录，不需要访问远程仓库。
+    返回的路径均相对于 work_dir。
+    """
+
+    def __init__(self, work_dir):
+        self.work_dir = Path(work_dir)
+
+    def _run(self, *args):
+        """执行git命令并返回标准输出"""
+        try:
+            result = subprocess.run(
+                ['git', *args],
+                cwd=self.work_dir,
+                capture_output=True,
+            )
+        except FileNotFoundError:
+            raise GitError("未找到git命令")
+
+        if result.returncode != 0:
+            raise GitError(result.stderr.decode('utf-8', 'replace').strip())
+
+        return result.stdout
+
+    def is_repository(self):
+        """检查工作目录是否位于git仓库中"""
+        try:
+            self._run('rev-parse', '--git-dir')
+            return True
+        except GitError:
+            return False
+
+    def head_commit(self):
+        """获取当前HEAD提交"""
+        return self._run('rev-parse', 'HEAD').decode('utf-8').strip()
+
+    def resolve(self, ref):
+        """将分支、标签等引用解析为提交哈希"""
+        return self._run('rev-parse', '--verify', '--quiet', f'{ref}^{{commit}}').decode('utf-8').strip()
+
+    def changed_since(self, ref):
+        """获取指定提交之后的变更
+
+        包括已提交和未提交的修改以及未跟踪的新文件。
+        重命名按"删除旧路径 + 新增新路径"处理。
+
+        Returns:
+            tuple: (变更文件集合, 删除文件集合)
+        """
+        changed = set()
+        deleted = set()
+
+        output = self._run('diff', '--name-status', '--no-renames', '--relative', '-z', ref, '--')
+        fields = output.decode('utf-8').split('\0')
+        for status, path in zip(fields[0::2], fields[1::2]):
+            if status == 'D':
+                deleted.add(path)
+            else:
+                changed.add(path)
+
+        output = self._run('ls-files', '--others', '--exclude-standard', '-z')
+        changed.update(path for path in output.decode('utf-8').split('\0') if path)
+
+        return changed, deleted
+
+
+def stable_hash(rel_path):
+    """路径的稳定哈希（不受进程的哈希随机化影响）"""
+    return hashlib.sha1(rel_path.encode('utf-8')).hexdigest()
+
+
+def parse_shard(value):
+    """解析 "i/n" 形式的分片参数，i 从0开始
+
+    Returns:
+        tuple: (分片序号, 分片总数)
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"分片格式应为 i/n: {value}")
+
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"分片序号应满足 0 <= i < n: {value}")
+
+    return index, count
+
+
+def assign_shards(entries, shard_count):
+    """按文件大小均衡地将文件分配到各分片
+
+    文件按大小从大到小（大小相同时按路径的稳定哈希）排序，依次分配给当前
+    总大小最小的分片。只要输入相同，每个节点都会独立算出完全相同的分配结果。
+
+    Args:
+        entries (list): (相对路径, 文件大小) 列表
+        shard_count (int): 分片总数
+
+    Returns:
+        dict: 相对路径 -> 分片序号
+    """
+    loads = [(0, shard) for shard in range(shard_count)]
+    assignment = {}
+
+    for rel_path, size in sorted(entries, key=lambda entry: (-entry[1], stable_hash(entry[0]))):
+        load, shard = heapq.heappop(loads)
+        assignment[rel_path] = shard
+        heapq.heappush(loads, (load + size, shard))
+
+    return assignment
+
+
+def plan_digest(to_convert, to_remove):
+    """计算转换计划的摘要，用于校验各分片基于同一份计划"""
+    digest = hashlib.sha256()
+    for rel_path in to_convert:
+        digest.update(f'convert:{rel_path}\n'.encode('utf-8'))
+    for rel_path in to_remove:
+        digest.update(f'remove:{rel_path}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def merge_manifests(manifest_files):
+    """合并各分片的清单并校验覆盖完整性
+
+    Returns:
+        tuple: (合并后的清单, 问题列表)，问题列表为空表示所有分片齐全且互不重叠
+    """
+    manifests = []
+    for manifest_file in manifest_files:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifests.append(json.load(f))
+
+    problems = []
+    if not manifests:
+        return {}, ["没有提供分片清单"]
+
+    first = manifests[0]
+    shard_count = first['shard_count']
+    for manifest in manifests:
+        if manifest['shard_count'] != shard_count or manifest['plan_digest'] != first['plan_digest']:
+            problems.append(f"分片 {manifest['shard']}/{manifest['shard_count']} 与其他分片的转换计划不一致")
+
+    seen_shards = [manifest['shard'] for manifest in manifests]
+    for shard in range(shard_count):
+        count = seen_shards.count(shard)
+        if count == 0:
+            problems.append(f"缺少分片 {shard}/{shard_count}")
+        elif count > 1:
+            problems.append(f"分片 {shard}/{shard_count} 重复出现 {count} 次")
+
+    files = {}
+    removed = set()
+    for manifest in manifests:
+        for entry in manifest['files']:
+            if entry['source'] in files:
+                problems.append(f"文件被多个分片处理: {entry['source']}")
+            files[entry['source']] = entry
+        removed.update(manifest['removed'])
+
+    covered = len(files) + len(removed)
+    if covered != first['plan_total']:
+        problems.append(f"覆盖不完整: 计划 {first['plan_total']} 项，实际 {covered} 项")
+
+    failed = [entry for entry in files.values() if entry['status'] != 'ok']
+    for entry in failed:
+        problems.append(f"转换失败: {entry['source']}")
+
+    merged = {
+        'shard_count': shard_count,
+        'plan_digest': first['plan_digest'],
+        'plan_total': first['plan_total'],
+        'files': [files[source] for source in sorted(files)],
+        'removed': sorted(removed),
+        'complete': not problems,
+    }
+
+    return merged, problems
+
+
+class BatchJournal:
+    """批量转换的预写日志
+
+    每完成（或失败）一个文件追加一行JSON记录。每条记录写入后立即刷新到
+    操作系统，按组调用 fsync 持久化到磁盘，避免每个文件都等待一次磁盘同步。
+    """
+
+    def __init__(self, path, sync_every=64, sync_interval=2.0):
+        """初始化日志
+
+        Args:
+            path (str): 日志文件路径
+            sync_every (int): 累计多少条记录后执行一次 fsync
+            sync_interval (float): 距上次 fsync 超过多少秒后执行一次 fsync
+        """
+        self.path = Path(path)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.file = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    @staticmethod
+    def load(path):
+        """读取日志，返回每个文件的最新记录
+
+        崩溃时最后一行可能只写了一半，这样的行会被忽略。
+        """
+        records = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    records[record['id']] = record
+        except OSError:
+            pass
+        return records
+
+    def open(self, resume=False):
+        """打开日志，续转时追加，否则清空重新记录"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        if resume and self.path.exists():
+            # 截掉崩溃时写了一半的最后一行，保证后续追加的记录独占一行
+            with open(self.path, 'rb+') as f:
+                data = f.read()
+                if data and not data.endswith(b'\n'):
+                    f.truncate(data.rfind(b'\n') + 1)
+            self.file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self.file = open(self.path, 'w', encoding='utf-8')
+
+        return self
+
+    def append(self, record):
+        """追加一条记录"""
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.unsynced += 1
+
+        if (self.unsynced >= self.sync_every
+                or time.monotonic() - self.last_sync >= self.sync_interval):
+            self.sync()
+
+    def sync(self):
+        """将已写入的记录持久化到磁盘"""
+        if self.unsynced:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        """同步并关闭日志"""
+        if self.file:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_job_manifest(manifest_file, output_dir, style="default"):
+    """读取任务清单
+
+    清单可以是JSON Lines文件（.jsonl，每行一个任务），也可以是JSON文件
+    （任务数组，或包含 "jobs" 数组的对象）。每个任务的字段：
+
+        input     输入文件路径（必填），相对路径相对于清单文件所在目录
+        output    输出文件路径，默认为输出目录下与输入同名的 .html 文件
+        style     文章风格，默认为命令行指定的风格
+        title     文章标题
+        subtitle  文章副标题
+        id        任务标识，默认为 input
+
+    Returns:
+        list: 转换任务列表
+    """
+    manifest_path = Path(manifest_file)
+    base_dir = manifest_path.parent.resolve()
+    output_dir = Path(output_dir).resolve()
+    available_styles = WeChatStyleTemplates.get_available_styles()
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        if manifest_path.suffix.lower() == '.jsonl':
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+            entries = data.get('jobs') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("任务清单应为任务数组，或包含 jobs 数组的对象")
+
+    jobs = []
+    seen = set()
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"任务 {number} 应为对象")
+        if not entry.get('input'):
+            raise ValueError(f"任务 {number} 缺少 input 字段")
+
+        input_path = Path(entry['input'])
+        if entry.get('output'):
+            output_path = base_dir / entry['output']
+        elif input_path.is_absolute():
+            output_path = output_dir / input_path.with_suffix('.html').name
+        else:
+            output_path = output_dir / input_path.with_suffix('.html')
+
+        job_style = entry.get('style') or style
+        if job_style not in available_styles:
+            raise ValueError(f"任务 {number} 的风格不存在: {job_style}")
+
+        job_id = str(entry.get('id') or entry['input'])
+        if job_id in seen:
+            raise ValueError(f"任务标识重复: {job_id}")
+        seen.add(job_id)
+
+        jobs.append({
+            'id': job_id,
+            'source': str(base_dir / input_path),
+            'output': str(output_path),
+            'style': job_style,
+            'title': entry.get('title') or '',
+            'subtitle': entry.get('subtitle') or '',
+        })
+
+    return jobs
+
+
+def format_duration(seconds):
+    """将秒数格式化为 时:分:秒"""
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class ProgressReporter:
+    """批量转换进度报告
+
+    start/finish 只更新计数器，输出按时间间隔节流，不会每个文件刷新一次。
+    输出到终端时在同一行原地刷新；否则（重定向到文件、CI日志）定期输出
+    一行JSON格式的进度摘要，便于机器解析。
+    """
+
+    def __init__(self, total, total_bytes, workers=1, stream=None, interval=None):
+        """初始化进度报告
+
+        Args:
+            total (int): 待转换的任务数
+            total_bytes (int): 待转换的源文件总字节数
+            workers (int): 并行进程数
+            stream: 输出流，默认为标准输出
+            interval (float): 刷新间隔（秒），默认终端0.5秒、非终端10秒
+        """
+        self.total = total
+        self.total_bytes = total_bytes
+        self.workers = workers
+        self.stream = stream or sys.stdout
+        self.is_tty = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        if interval is None:
+            interval = 0.5 if self.is_tty else 10.0
+        self.interval = interval
+
+        self.started = time.monotonic()
+        self.last_render = self.started
+        self.done = 0
+        self.failed = 0
+        self.done_bytes = 0
+        self.in_flight = {}
+
+    def start(self, job):
+        """记录任务开始"""
+        self.in_flight[job['id']] = time.monotonic()
+
+    def finish(self, result):
+        """记录任务完成"""
+        self.in_flight.pop(result['id'], None)
+        self.done += 1
+        self.done_bytes += result.get('source_size') or 0
+        if result['status'] != 'ok':
+            self.failed += 1
+        self.tick()
+
+    def tick(self):
+        """距上次输出超过刷新间隔时输出一次进度"""
+        now = time.monotonic()
+        if now - self.last_render >= self.interval:
+            self.last_render = now
+            self.render(now)
+
+    def snapshot(self, now=None):
+        """当前进度指标"""
+        now = now or time.monotonic()
+        elapsed = max(now - self.started, 1e-9)
+        docs_per_second = self.done / elapsed
+        bytes_per_second = self.done_bytes / elapsed
+
+        # 优先按字节吞吐量估算剩余时间，文件大小差异大时比按篇数更准确
+        eta = None
+        if bytes_per_second > 0 and self.total_bytes:
+            eta = max(self.total_bytes - self.done_bytes, 0) / bytes_per_second
+        elif docs_per_second > 0:
+            eta = (self.total - self.done) / docs_per_second
+
+        slowest = None
+        if self.in_flight:
+            job_id, started = min(self.in_flight.items(), key=lambda item: item[1])
+            slowest = {'id': job_id, 'seconds': round(now - started, 3)}
+
+        return {
+            'done': self.done,
+            'failed': self.failed,
+            'total': self.total,
+            'elapsed': round(elapsed, 3),
+            'docs_per_second': round(docs_per_second, 3),
+            'mb_per_second': round(bytes_per_second / 1024 / 1024, 3),
+            'eta': round(eta, 1) if eta is not None else None,
+            'in_flight': len(self.in_flight),
+            'workers': self.workers,
+            'slowest': slowest,
+        }
+
+    def render(self, now=None, event='progress'):
+        """输出一次进度"""
+        stats = self.snapshot(now)
+
+        if not self.is_tty:
+            self.stream.write(json.dumps(dict(stats, event=event), ensure_ascii=False) + '\n')
+            self.stream.flush()
+            return
+
+        percent = stats['done'] / stats['total'] * 100 if stats['total'] else 100.0
+        line = (
+            f"📊 {stats['done']}/{stats['total']} ({percent:.1f}%)"
+            f" | {stats['docs_per_second']:.1f} 篇/秒"
+            f" | {stats['mb_per_second']:.2f} MB/秒"
+            f" | 剩余 {format_duration(stats['eta']) if stats['eta'] is not None else '--:--'}"
+            f" | 进行中 {stats['in_flight']}/{stats['workers']}"
+        )
+        if stats['failed']:
+            line += f" | 失败 {stats['failed']}"
+        if stats['slowest']:
+            line += f" | 最慢: {stats['slowest']['id']} {stats['slowest']['seconds']:.1f}秒"
+
+        # \x1b[K 清除行尾残留的旧内容
+        self.stream.write('\r' + line + '\x1b[K')
+        self.stream.flush()
+
+    def close(self):
+        """输出最终进度"""
+        self.render(event='summary')
+        if self.is_tty:
+            self.stream.write('\n')
+            self.stream.flush()
+
+
+# 子进程内按风格缓存的转换器
+_worker_converters = {}
+
+
+def convert_one(job):
+    """转换单个文件，可在子进程中执行
+
+    Args:
+        job (dict): 转换任务，包含 id, source, output, style, title, subtitle
+
+    Returns:
+        dict: 转换结果
+    """
+    style = job.get('style', 'default')
+    converter = _worker_converters.get(style)
+    if converter is None:
+        converter = _worker_converters[style] = UniversalToWeChatConverter(style=style)
+
+    result = {
+        'id': job['id'],
+        'source': job['source'],
+        'output': job['output'],
+        'style': style,
+        'title': job.get('title', ''),
+        'subtitle': job.get('subtitle', ''),
+        'started_at': datetime.now().isoformat(),
+    }
+    timings = result['timings'] = {}
+    start = time.perf_counter()
+
+    try:
+        source_stat = os.stat(job['source'])
+        result['source_size'] = source_stat.st_size
+        result['source_mtime_ns'] = source_stat.st_mtime_ns
+
+        wechat_html = converter.convert_file_to_html(
+            job['source'],
+            job.get('title', ''),
+            job.get('subtitle', '')
+        )
+        timings['convert'] = time.perf_counter() - start
+
+        write_start = time.perf_counter()
+        result['bytes'] = atomic_write_text(job['output'], wechat_html)
+        timings['write'] = time.perf_counter() - write_start
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+class BatchConverter:
+    """批量转换器"""
+
+    def __init__(self, source_dir, output_dir, style="default", workers=1, shard=None):
+        """初始化批量转换器
+
+        Args:
+            source_dir (str): 源文件目录
+            output_dir (str): 输出目录，保持与源目录相同的子目录结构
+            style (str): 文章风格
+            workers (int): 并行转换的进程数，1表示在当前进程中顺序转换
+            shard (tuple): (分片序号, 分片总数)，为None时处理全部文件
+        """
+        self.source_dir = Path(source_dir).resolve()
+        self.output_dir = Path(output_dir).resolve()
+        self.style = style
+        self.workers = max(1, workers)
+        self.shard = shard or (0, 1)
+
+    def is_source(self, rel_path):
+        """检查相对路径是否为需要转换的源文件"""
+        path = self.source_dir / rel_path
+
+        # 跳过隐藏文件/目录以及输出目录中的文件
+        if any(part.startswith('.') for part in Path(rel_path).parts):
+            return False
+        if self.output_dir == path.resolve() or self.output_dir in path.resolve().parents:
+            return False
+
+        # 按扩展名选择源文件（已删除的文件也要能判断），转换时再检测内容
+        return format_from_suffix(path) != 'unknown'
+
+    def collect_sources(self):
+        """递归收集源目录中的所有源文件"""
+        sources = []
+
+        for root, dirs, files in os.walk(self.source_dir):
+            root_path = Path(root)
+            dirs[:] = sorted(
+                d for d in dirs
+                if not d.startswith('.') and (root_path / d).resolve() != self.output_dir
+            )
+            for name in files:
+                rel_path = (root_path / name).relative_to(self.source_dir).as_posix()
+                if self.is_source(rel_path):
+                    sources.append(rel_path)
+
+        return sorted(sources)
+
+    def output_path(self, rel_path):
+        """源文件对应的输出文件路径"""
+        return self.output_dir / Path(rel_path).with_suffix('.html')
+
+    def load_state(self):
+        """读取上次构建状态"""
+        state_file = self.output_dir / BUILD_STATE_FILE
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        """保存构建状态"""
+        atomic_write_text(self.output_dir / BUILD_STATE_FILE, json.dumps(state, ensure_ascii=False, indent=2))
+
+    def source_record(self, rel_path, record=None):
+        """源文件的大小、修改时间和内容指纹，大小和修改时间都与 record 相同时沿用其中的指纹"""
+        stat = (self.source_dir / rel_path).stat()
+        if record and record.get('size') == stat.st_size and record.get('mtime_ns') == stat.st_mtime_ns:
+            return record
+        return {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'fingerprint': source_digest(self.source_dir / rel_path),
+        }
+
+    def recorded_sources(self, state):
+        """构建状态中记录的已转换源文件（相对路径 -> 大小、修改时间和内容指纹）"""
+        if state.get('style') != self.style:
+            return {}
+        return state.get('sources', {})
+
+    def plan(self, since=None, incremental=False):
+        """计算需要转换的源文件和需要删除的输出文件
+
+        Args:
+            since (str): 基准git引用，只转换其后变更的文件
+            incremental (bool): 未指定 since 时，以上次成功构建的提交为基准
+
+        Returns:
+            tuple: (待转换的相对路径列表, 待删除的输出路径列表, 基准提交)
+        """
+        git = GitChangeDetector(self.source_dir)
+
+        state = self.load_state()
+        base_commit = None
+        if since:
+            try:
+                base_commit = git.resolve(since)
+            except GitError:
+                raise GitError(f"无法解析git引用: {since}")
+        elif incremental:
+            if state.get('commit') and state.get('style') == self.style:
+                try:
+                    base_commit = git.resolve(state['commit'])
+                except GitError:
+                    print(f"⚠️  上次构建的提交 {state['commit'][:12]} 已不存在，执行全量转换")
+
+        if base_commit is None:
+            return self.collect_sources(), [], None
+
+        changed, deleted = git.changed_since(base_commit)
+
+        # 与上次转换过的源文件比较：已不存在的（如转换后又删除的未跟踪文件）删除输出，
+        # 内容与转换时不同的（如转换后又撤销的未提交修改）重新转换
+        recorded = self.recorded_sources(state)
+        if recorded:
+            current = set(self.collect_sources())
+            deleted.update(set(recorded) - current)
+            changed.update(
+                path for path in current & set(recorded)
+                if self.source_record(path, recorded[path])['fingerprint'] != recorded[path].get('fingerprint')
+            )
+
+        to_convert = sorted(
+            path for path in changed
+            if self.is_source(path) and (self.source_dir / path).is_file()
+        )
+        to_remove = sorted(
+            self.output_path(path) for path in deleted
+            if self.is_source(path)
+        )
+
+        return to_convert, to_remove, base_commit
+
+    def select_shard(self, jobs, deleted):
+        """从完整计划中选出属于当前分片的部分
+
+        转换任务按源文件大小均衡分配；已删除的文件没有大小，按路径哈希取模分配。
+        """
+        index, count = self.shard
+        if count == 1:
+            return jobs, deleted
+
+        entries = []
+        for job in jobs:
+            try:
+                entries.append((job['id'], os.path.getsize(job['source'])))
+            except OSError:
+                entries.append((job['id'], 0))
+        assignment = assign_shards(entries, count)
+
+        return (
+            [job for job in jobs if assignment[job['id']] == index],
+            [path for path in deleted if int(stable_hash(path), 16) % count == index],
+        )
+
+    def manifest_path(self):
+        """当前分片清单的默认路径"""
+        index, count = self.shard
+        return self.output_dir / f'manifest.shard-{index}-of-{count}.json'
+
+    def write_manifest(self, manifest, manifest_file=None):
+        """写入分片清单"""
+        manifest_file = Path(manifest_file) if manifest_file else self.manifest_path()
+        manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest_file
+
+    def journal_path(self):
+        """断点续转日志路径，分片运行时每个分片使用独立的日志"""
+        index, count = self.shard
+        if count == 1:
+            return self.output_dir / JOURNAL_FILE
+        return self.output_dir / f'.batch_journal.shard-{index}-of-{count}.jsonl'
+
+    def is_finished(self, job, record, retry_failed=False):
+        """检查日志记录是否表明该任务无需重新转换
+
+        任务参数变化、源文件在记录之后被修改、或输出文件缺失/大小不符时需要重新转换。
+        """
+        if record['status'] != 'ok' and retry_failed:
+            return False
+
+        for key in ('output', 'style', 'title', 'subtitle'):
+            if record.get(key) != job.get(key, ''):
+                return False
+
+        try:
+            source_stat = os.stat(job['source'])
+        except OSError:
+            return False
+        if (record.get('source_size') != source_stat.st_size
+                or record.get('source_mtime_ns') != source_stat.st_mtime_ns):
+            return False
+
+        if record['status'] == 'ok':
+            try:
+                return Path(record['output']).stat().st_size == record['bytes']
+            except OSError:
+                return False
+
+        return True
+
+    def make_job(self, rel_path):
+        """为源文件创建转换任务"""
+        return {
+            'id': rel_path,
+            'source': str(self.source_dir / rel_path),
+            'output': str(self.output_path(rel_path)),
+            'style': self.style,
+            'title': '',
+            'subtitle': '',
+        }
+
+    def remove_outputs(self, output_paths):
+        """删除已失效的输出文件"""
+        removed = []
+        for output_path in output_paths:
+            if output_path.exists():
+                output_path.unlink()
+                removed.append(str(output_path))
+        return removed
+
+    def convert_jobs(self, jobs, reporter=None):
+        """执行转换任务，逐个产出转换结果
+
+        并行转换时同时提交的任务数不超过进程数，这样进度报告中
+        任务的开始时间和进行中的任务数都是准确的。
+        """
+        if self.workers == 1 or len(jobs) <= 1:
+            for job in jobs:
+                if reporter:
+                    reporter.start(job)
+                result = convert_one(job)
+                if reporter:
+                    reporter.finish(result)
+                yield result
+            return
+
+        remaining = iter(jobs)
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            running = set()
+
+            def submit_next():
+                job = next(remaining, None)
+                if job is not None:
+                    if reporter:
+                        reporter.start(job)
+                    running.add(executor.submit(convert_one, job))
+
+            for _ in range(self.workers):
+                submit_next()
+
+            while running:
+                done, _ = wait(running, timeout=reporter.interval if reporter else None,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.remove(future)
+                    submit_next()
+                    result = future.result()
+                    if reporter:
+                        reporter.finish(result)
+                    yield result
+                if reporter:
+                    reporter.tick()
+
+    def relative_output(self, output):
+        """输出路径尽量表示为相对于输出目录的路径"""
+        try:
+            return Path(output).relative_to(self.output_dir).as_posix()
+        except ValueError:
+            return str(output)
+
+    def execute(self, jobs, deleted=(), base_commit=None, manifest_file=None,
+                resume=False, retry_failed=False, results_file=None, progress_stream=None):
+        """执行转换任务
+
+        Args:
+            jobs (list): 完整计划中的转换任务（分片前）
+            deleted (list): 完整计划中需要删除的输出文件（相对于输出目录）
+            base_commit (str): 增量转换的基准提交，记录到清单中
+            manifest_file (str): 清单输出路径，分片运行时默认写入输出目录
+            resume (bool): 根据断点续转日志跳过已完成的任务
+            retry_failed (bool): 续转时重新转换日志中记录为失败的任务
+            results_file: 文本文件对象，每得到一个结果就写入一行JSON并立即刷新
+            progress_stream: 进度报告的输出流，为None时不报告进度
+
+        Returns:
+            dict: 转换汇总
+        """
+        digest = plan_digest([job['id'] for job in jobs], deleted)
+        plan_total = len(jobs) + len(deleted)
+
+        jobs, deleted = self.select_shard(jobs, list(deleted))
+        removed = self.remove_outputs([self.output_dir / path for path in deleted])
+
+        def emit(result):
+            results.append(result)
+            if results_file is not None:
+                results_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+                results_file.flush()
+
+        # 续转时跳过日志中已完成的任务
+        results = []
+        pending = jobs
+        if resume:
+            records = BatchJournal.load(self.journal_path())
+            pending = []
+            for job in jobs:
+                record = records.get(job['id'])
+                if record and self.is_finished(job, record, retry_failed):
+                    emit(dict(record, resumed=True))
+                else:
+                    pending.append(job)
+        skipped = len(results)
+
+        reporter = None
+        if progress_stream is not None:
+            total_bytes = 0
+            for job in pending:
+                try:
+                    total_bytes += os.path.getsize(job['source'])
+                except OSError:
+                    pass
+            reporter = ProgressReporter(len(pending), total_bytes, self.workers, progress_stream)
+
+        with BatchJournal(self.journal_path()).open(resume) as journal:
+            for result in self.convert_jobs(pending, reporter):
+                journal.append(result)
+                emit(result)
+
+        if reporter:
+            reporter.close()
+
+        failed = [result for result in results if result['status'] != 'ok']
+
+        manifest = None
+        if manifest_file or self.shard[1] > 1:
+            index, count = self.shard
+            manifest = {
+                'shard': index,
+                'shard_count': count,
+                'style': self.style,
+                'base_commit': base_commit,
+                'plan_digest': digest,
+                'plan_total': plan_total,
+                'timestamp': datetime.now().isoformat(),
+                'files': sorted((
+                    {
+                        'source': result['id'],
+                        'output': self.relative_output(result['output']),
+                        'size': result.get('source_size'),
+                        'status': result['status'],
+                        'error': result.get('error'),
+                    }
+                    for result in results
+                ), key=lambda entry: entry['source']),
+                'removed': deleted,
+            }
+            manifest_file = self.write_manifest(manifest, manifest_file)
+
+        return {
+            'base_commit': base_commit,
+            'converted': [result['source'] for result in results if result['status'] == 'ok'],
+            'failed': failed,
+            'removed': removed,
+            'skipped': skipped,
+            'manifest_file': str(manifest_file) if manifest else None,
+        }
+
+    def run(self, since=None, incremental=False, manifest_file=None, resume=False,
+            retry_failed=False, results_file=None, progress_stream=None):
+        """转换源目录中的文件
+
+        Args:
+            since (str): 基准git引用
+            incremental (bool): 是否以上次成功构建的提交为基准
+            其余参数见 execute
+
+        Returns:
+            dict: 转换汇总
+        """
+        to_convert, to_remove, base_commit = self.plan(since, incremental)
+        deleted = [path.relative_to(self.output_dir).as_posix() for path in to_remove]
+
+        summary = self.execute(
+            [self.make_job(path) for path in to_convert], deleted, base_commit,
+            manifest_file, resume, retry_failed, results_file, progress_stream
+        )
+
+        # 全部成功时才推进构建提交，失败的文件下次会被重新转换。
+        # 分片运行只处理了计划的一部分，不更新构建状态，否则各分片会互相覆盖对方的记录
+        git = GitChangeDetector(self.source_dir)
+        if not summary['failed'] and self.shard[1] == 1 and git.is_repository():
+            # 此时所有源文件的输出都是最新的，记录它们的内容指纹（未变化的文件沿用上次的记录）
+            recorded = self.recorded_sources(self.load_state())
+            self.save_state({
+                'commit': git.head_commit(),
+                'style': self.style,
+                'timestamp': datetime.now().isoformat(),
+                'sources': {path: self.source_record(path, recorded.get(path)) for path in self.collect_sources()},
+            })
+
+        return summary
+
+    def run_manifest(self, job_manifest, manifest_file=None, resume=False,
+                     retry_failed=False, results_file=None, progress_stream=None):
+        """按任务清单转换
+
+        Args:
+            job_manifest (str): 任务清单路径，格式见 load_job_manifest
+            其余参数见 execute
+
+        Returns:
+            dict: 转换汇总
+        """
+        jobs = load_job_manifest(job_manifest, self.output_dir, self.style)
+        return self.execute(jobs, [], None, manifest_file, resume, retry_failed,
+                            results_file, progress_stream)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='批量转换目录中的文档为微信公众号文章格式')
+    parser.add_argument('input_dir', nargs='?', help='源文件目录')
+    parser.add_argument('-o', '--output-dir', default='wechat_output', help='输出目录（默认: wechat_output）')
+    parser.add_argument('--style', help='文章风格',
+                       choices=WeChatStyleTemplates.get_available_styles(),
+                       default='default')
+    parser.add_argument('--since', help='只转换该git引用之后变更的文件')
+    parser.add_argument('--incremental', action='store_true',
+                       help='只转换上次成功构建之后变更的文件（基于本地git仓库）')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='并行转换的进程数')
+    parser.add_argument('--shard', help='只处理第 i 个分片（共 n 个，i 从0开始），格式 i/n')
+    parser.add_argument('--manifest', help='清单输出路径（分片运行时默认写入输出目录）')
+    parser.add_argument('--merge-manifests', nargs='+', metavar='MANIFEST',
+                       help='合并各分片清单并校验覆盖完整性')
+    parser.add_argument('--resume', action='store_true', help='从上次中断处继续，跳过已完成的文件')
+    parser.add_argument('--retry-failed', action='store_true', help='续转时重新转换上次失败的文件')
+    parser.add_argument('--jobs', metavar='JOB_MANIFEST',
+                       help='任务清单（.jsonl 或 .json），为每篇文章指定风格、标题、副标题和输出路径')
+    parser.add_argument('--results', metavar='FILE',
+                       help='以JSON Lines格式实时写出每个文件的转换结果，"-" 表示标准输出')
+    parser.add_argument('--no-progress', action='store_true', help='不显示转换进度')
+
+    args = parser.parse_args()
+
+    # 结果流占用标准输出时，提示信息改为输出到标准错误
+    log = sys.stderr if args.results == '-' else sys.stdout
+
+    # 合并分片清单
+    if args.merge_manifests:
+        merged, problems = merge_manifests(args.merge_manifests)
+        if args.manifest and merged:
+            with open(args.manifest, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, ensure_ascii=False, indent=2)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            return 1
+        print(f"✅ {merged['shard_count']} 个分片覆盖完整，共 {merged['plan_total']} 项")
+        return 0
+
+    if args.jobs:
+        if not Path(args.jobs).is_file():
+            parser.error(f"任务清单不存在: {args.jobs}")
+        source_dir = Path(args.jobs).parent
+    else:
+        if not args.input_dir:
+            parser.error("需要提供源文件目录或任务清单")
+        if not Path(args.input_dir).is_dir():
+            parser.error(f"源目录不存在: {args.input_dir}")
+        source_dir = args.input_dir
+
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    batch = BatchConverter(source_dir, args.output_dir, style=args.style,
+                           workers=args.workers, shard=shard)
+
+    progress_stream = None if args.no_progress else log
+
+    results_file = None
+    if args.results == '-':
+        results_file = sys.stdout
+    elif args.results:
+        results_file = open(args.results, 'w', encoding='utf-8')
+
+    try:
+        if args.jobs:
+            summary = batch.run_manifest(args.jobs, manifest_file=args.manifest,
+                                         resume=args.resume, retry_failed=args.retry_failed,
+                                         results_file=results_file, progress_stream=progress_stream)
+        else:
+            summary = batch.run(since=args.since, incremental=args.incremental,
+                                manifest_file=args.manifest, resume=args.resume,
+                                retry_failed=args.retry_failed, results_file=results_file,
+                                progress_stream=progress_stream)
+    except GitError as e:
+        print(f"❌ git错误: {e}", file=log)
+        return 1
+    except ValueError as e:
+        print(f"❌ 任务清单错误: {e}", file=log)
+        return 1
+    finally:
+        if results_file not in (None, sys.stdout):
+            results_file.close()
+
+    if summary['base_commit']:
+        print(f"📌 增量转换基准提交: {summary['base_commit'][:12]}", file=log)
+    print(f"🎉 转换完成: {len(summary['converted'])} 个文件", file=log)
+    if summary['skipped']:
+        print(f"⏭️  跳过已完成: {summary['skipped']} 个文件", file=log)
+    if summary['removed']:
+        print(f"🗑️  删除失效输出: {len(summary['removed'])} 个文件", file=log)
+    if summary['manifest_file']:
+        print(f"📋 清单文件: {summary['manifest_file']}", file=log)
+    for result in summary['failed']:
+        print(f"❌ 转换失败: {result['source']} - {result['error']}", file=log)
+
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word文档转换性能测试
+对比旧的逐个run调用 str.replace 的格式化方式与单次遍历的 DocxMarkdownBuilder，
+以及 python-docx（经过Markdown）与 mammoth（直接生成HTML）两条转换路径的速度和内存峰值
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx import Document
+
+from docx_markdown import DocxMarkdownBuilder
+
+
+def make_document(path, pages, runs):
+    """生成一篇Word文档，每页包含标题、多run段落、列表和表格"""
+    doc = Document()
+    for page in range(pages):
+        if page % 5 == 0:
+            doc.add_heading(f'第 {page // 5 + 1} 章', level=1)
+        doc.add_heading(f'第 {page + 1} 页', level=2)
+
+        for index in range(4):
+            paragraph = doc.add_paragraph()
+            for run_index in range(runs):
+                run = paragraph.add_run(f'第{index}段第{run_index}句，这是一段用于测试的正文内容。')
+                run.bold = run_index % 3 == 0
+                run.italic = run_index % 5 == 0
+
+        for index in range(3):
+            doc.add_paragraph(f'列表项 {index}', style='List Bullet')
+
+        if page % 3 == 0:
+            table = doc.add_table(rows=5, cols=4)
+            for row in table.rows:
+                for col, cell in enumerate(row.cells):
+                    cell.text = f'单元格 {page}-{col}'
+
+        doc.add_page_break()
+    doc.save(path)
+
+
+def legacy_docx_to_markdown(doc):
+    """旧实现：每个run对整段文字调用一次 str.replace"""
+    markdown_content = []
+    for paragraph in doc.paragraphs:
+        text = paragraph.text.strip()
+        if not text:
+            continue
+        if paragraph.style.name.startswith('Heading'):
+            level = paragraph.style.name.split()[-1]
+            markdown_content.append(f"{'#' * int(level) if level.isdigit() else '#'} {text}")
+        else:
+            formatted_text = text
+            for run in paragraph.runs:
+                if run.bold:
+                    formatted_text = formatted_text.replace(run.text, f"**{run.text}**")
+                if run.italic:
+                    formatted_text = formatted_text.replace(run.text, f"*{run.text}*")
+            markdown_content.append(formatted_text)
+    return '\n\n'.join(markdown_content)
+
+
+def run_benchmark(pages, runs):
+    """运行性能测试"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.docx'
+        make_document(path, pages, runs)
+        size_mb = path.stat().st_size / 1024 / 1024
+        print(f"📄 测试文档: {pages} 页，每段 {runs} 个run，{size_mb:.1f} MB")
+        print("=" * 50)
+
+        start = time.perf_counter()
+        doc = Document(path)
+        load = time.perf_counter() - start
+        print(f"加载文档 (python-docx):          {load:.2f} 秒")
+
+        start = time.perf_counter()
+        legacy = legacy_docx_to_markdown(doc)
+        legacy_time = time.perf_counter() - start
+        print(f"旧实现 (逐run str.replace):      {legacy_time:.2f} 秒，{len(legacy) // 1024} KB")
+
+        start = time.perf_counter()
+        result = DocxMarkdownBuilder(doc).build()
+        builder_time = time.perf_counter() - start
+        print(f"单次遍历 (DocxMarkdownBuilder):  {builder_time:.2f} 秒，{len(result) // 1024} KB（含表格和列表）")
+
+        print(f"🚀 加速比: {legacy_time / builder_time:.2f}x")
+
+
+def peak_rss_mb():
+    """当前进程的内存峰值（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def measure_engine(engine, path):
+    """在当前进程中用指定路径转换一次，输出耗时和内存峰值（在独立子进程中调用）"""
+    from universal_converter import UniversalToWeChatConverter
+
+    converter = UniversalToWeChatConverter(docx_engine=engine)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    html_content = converter.file_to_html(path)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({'elapsed': elapsed, 'peak_mb': peak_rss_mb() - baseline, 'html_kb': len(html_content) // 1024}))
+
+
+def run_engine_benchmark(pages, runs):
+    """对比两条转换路径，每条路径在独立子进程中运行，内存峰值互不影响"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.docx'
+        make_document(path, pages, runs)
+        print(f"📄 测试文档: {pages} 页，转换为HTML片段")
+        print("=" * 50)
+
+        for engine, label in (('python-docx', 'python-docx → Markdown → HTML'), ('mammoth', 'mammoth → HTML')):
+            output = subprocess.run(
+                [sys.executable, __file__, '--engine', engine, str(path)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:32} {stats['elapsed']:.2f} 秒，内存峰值增加 {stats['peak_mb']:.0f} MB")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Word文档转换性能测试')
+    parser.add_argument('--pages', type=int, default=300, help='文档页数')
+    parser.add_argument('--runs', type=int, default=40, help='每个段落的run数量')
+    parser.add_argument('--engine', choices=['python-docx', 'mammoth'], help=argparse.SUPPRESS)
+    parser.add_argument('document', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.engine:
+        measure_engine(args.engine, args.document)
+        return
+
+    run_benchmark(args.pages, args.runs)
+    print()
+    run_engine_benchmark(args.pages, args.runs)
+
+
+if __name__ == "__main__":
+    main()
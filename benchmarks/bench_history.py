@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换历史存储压力测试
+模拟多个gunicorn工作进程（每个进程多个线程）同时写入转换记录，
+并按ID查找其他进程刚写入的记录、列出最近记录，统计吞吐量、延迟和查找不到的次数
+"""
+
+import argparse
+import multiprocessing
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from history_store import HistoryStore
+
+
+def make_record():
+    conversion_id = str(uuid.uuid4())
+    return {
+        'id': conversion_id,
+        'original_filename': 'article.md',
+        'converted_filename': f'converted_{conversion_id}.html',
+        'style': random.choice(['default', 'tech', 'minimal']),
+        'title': '标题',
+        'subtitle': '',
+        'timestamp': datetime.now().isoformat(),
+        'file_size': random.randint(1000, 100000),
+        'intermediate': None,
+    }
+
+
+def run_worker(path, requests, threads, barrier, shared_ids, results):
+    """一个工作进程：每个请求写入一条记录，再查找一条其他进程写入的记录，每10个请求列出一次最近记录"""
+    store = HistoryStore(path)
+    latencies = []
+    misses = 0
+    lock = threading.Lock()
+
+    def serve(count):
+        nonlocal misses
+        for index in range(count):
+            record = make_record()
+            start = time.perf_counter()
+            store.add(record)
+            elapsed = time.perf_counter() - start
+
+            # 共享ID列表的进程间通信不计入延迟
+            shared_ids.append(record['id'])
+            other = shared_ids[random.randrange(len(shared_ids))]
+
+            start = time.perf_counter()
+            found = store.get(other) is not None
+            if index % 10 == 0:
+                store.recent(50)
+            elapsed += time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                misses += not found
+
+    barrier.wait()
+    pool = [threading.Thread(target=serve, args=(requests // threads,)) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((latencies, misses))
+
+
+def run_benchmark(workers, requests, threads):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'history.db'
+        HistoryStore(path)
+
+        context = multiprocessing.get_context('spawn')
+        manager = context.Manager()
+        shared_ids = manager.list()
+        barrier = context.Barrier(workers + 1)
+        results = context.Queue()
+        processes = [
+            context.Process(target=run_worker, args=(path, requests, threads, barrier, shared_ids, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        barrier.wait()
+        start = time.perf_counter()
+        collected = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+
+        latencies = sorted(latency for worker_latencies, _ in collected for latency in worker_latencies)
+        misses = sum(worker_misses for _, worker_misses in collected)
+        total = len(latencies)
+        stored = len(HistoryStore(path))
+
+        print(f"📊 {workers} 个进程 × {threads} 个线程，共 {total} 个请求（写入 + 查找）")
+        print("=" * 50)
+        print(f"吞吐量: {total / elapsed:.0f} 请求/秒（含测试本身的进程间通信）")
+        print(f"延迟: 中位数 {statistics.median(latencies) * 1000:.2f} 毫秒，"
+              f"P99 {latencies[int(total * 0.99) - 1] * 1000:.2f} 毫秒")
+        print(f"保存的记录: {stored}，跨进程查找不到: {misses}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='转换历史存储压力测试')
+    parser.add_argument('--workers', type=int, default=4, help='工作进程数')
+    parser.add_argument('--threads', type=int, default=4, help='每个进程的线程数')
+    parser.add_argument('--requests', type=int, default=2000, help='每个进程的请求数')
+    args = parser.parse_args()
+
+    run_benchmark(args.workers, args.requests, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML输入转换性能测试
+对比旧流程（convert_html 解析并序列化一次，optimize_for_wechat 再解析、逐类标签查找并序列化一次）
+与单次解析流程（解析得到的文档树直接交给后处理修改，只序列化一次）
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from extended_converter import WECHAT_HTML_TAIL, WECHAT_TAG_STYLES, ExtendedMarkdownToWeChatConverter
+
+
+def legacy_convert(converter, content):
+    """旧流程：两次解析、两次序列化，每类标签各遍历一次文档树"""
+    html_content = str(BeautifulSoup(content, 'html.parser'))
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for img in soup.find_all('img'):
+        if not img.get('style'):
+            img['style'] = WECHAT_TAG_STYLES['img']
+    for name in ('table', 'pre', 'blockquote'):
+        for tag in soup.find_all(name):
+            tag['style'] = WECHAT_TAG_STYLES[name]
+    return f"{converter.wechat_html_head()}    {soup}\n{WECHAT_HTML_TAIL}"
+
+
+def single_parse_convert(converter, content):
+    """单次解析流程"""
+    return converter.create_wechat_html(converter.convert_content(content, 'html'))
+
+
+def make_export(size_mb):
+    """生成多MB的HTML导出文件（由 sample_article.html 的正文重复组成）"""
+    body = BeautifulSoup((ROOT / 'sample_article.html').read_text(encoding='utf-8'), 'html.parser').body
+    section = ''.join(str(child) for child in body.contents)
+    repeat = size_mb * 1024 * 1024 // len(section.encode('utf-8')) + 1
+    return f"<html><body>{section * repeat}</body></html>"
+
+
+def measure(label, content, runs):
+    """运行两种流程并输出耗时"""
+    converter = ExtendedMarkdownToWeChatConverter()
+    outputs = []
+    timings = []
+    for convert in (legacy_convert, single_parse_convert):
+        start = time.perf_counter()
+        for _ in range(runs):
+            output = convert(converter, content)
+        timings.append((time.perf_counter() - start) / runs)
+        outputs.append(output)
+
+    legacy_time, single_time = timings
+    same = outputs[0] == outputs[1]
+    print(f"📄 {label}: {len(content.encode('utf-8')) / 1024:.0f} KB，每种流程运行 {runs} 次")
+    print(f"旧流程 (两次解析):  {legacy_time * 1000:.1f} 毫秒")
+    print(f"单次解析:           {single_time * 1000:.1f} 毫秒")
+    print(f"🚀 加速比: {legacy_time / single_time:.2f}x，输出{'一致' if same else '不一致'}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='HTML输入转换性能测试')
+    parser.add_argument('--size', type=int, default=5, help='HTML导出文件大小（MB）')
+    parser.add_argument('--runs', type=int, default=20, help='sample_article.html 的运行次数')
+    args = parser.parse_args()
+
+    measure('sample_article.html', (ROOT / 'sample_article.html').read_text(encoding='utf-8'), args.runs)
+    print("=" * 50)
+    measure('HTML导出文件', make_export(args.size), 1)
+
+
+if __name__ == "__main__":
+    main()
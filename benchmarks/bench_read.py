@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大文件读取内存测试
+对比旧实现（文本方式 f.read()，原始字节和解码后的字符串同时在内存中）、
+分块读取后拼接，以及 read_text 的 mmap 读取，输出耗时和内存峰值。
+mmap 方式的内存峰值中包含映射文件的页缓存，内存紧张时系统可以直接丢弃这部分页面，
+其余方式中对应的内存是不可回收的 bytes 对象或分块字符串。
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_markdown(path, size_mb):
+    """生成中文Markdown文件"""
+    block = ''.join(
+        f'## 第 {index} 节\n\n这是一段用于测试的中文正文，包含 **粗体** 和 [链接](https://example.com/{index})。\n\n'
+        for index in range(1000)
+    ).encode('utf-8')
+    with open(path, 'wb') as f:
+        for _ in range(size_mb * 1024 * 1024 // len(block) + 1):
+            f.write(block)
+
+
+def peak_rss_mb():
+    """当前进程的内存峰值（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(mode, path):
+    """在当前进程中读取一次，输出耗时和内存峰值（在独立子进程中调用）"""
+    from text_decoder import iter_decoded, read_text
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == 'legacy':
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    elif mode == 'chunked':
+        text = ''.join(iter_decoded(path))
+    else:
+        text = read_text(path)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'elapsed': elapsed,
+        'peak_mb': peak_rss_mb() - baseline,
+        'text_mb': sys.getsizeof(text) / 1024 / 1024,
+    }))
+
+
+def run_benchmark(size_mb):
+    """运行测试，每种读取方式在独立子进程中运行，内存峰值互不影响"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.md'
+        make_markdown(path, size_mb)
+        print(f"📄 测试文件: {path.stat().st_size / 1024 / 1024:.0f} MB UTF-8 Markdown")
+        print("=" * 50)
+
+        modes = (
+            ('legacy', '旧实现 (f.read())'),
+            ('chunked', '分块读取后拼接'),
+            ('mmap', 'read_text (mmap)'),
+        )
+        for mode, label in modes:
+            output = subprocess.run(
+                [sys.executable, __file__, '--mode', mode, str(path)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:22} {stats['elapsed']:.2f} 秒，内存峰值增加 {stats['peak_mb']:.0f} MB"
+                  f"（解码后的字符串 {stats['text_mb']:.0f} MB）")
+
+        size = path.stat().st_size / 1024 / 1024
+        print(f"\n💡 mmap 方式的峰值中约 {size:.0f} MB 是映射文件的页缓存，可由系统回收；"
+              f"进程独占的内存约为解码后的字符串本身")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='大文件读取内存测试')
+    parser.add_argument('--size', type=int, default=200, help='测试文件大小（MB）')
+    parser.add_argument('--mode', choices=['legacy', 'chunked', 'mmap'], help=argparse.SUPPRESS)
+    parser.add_argument('document', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.document)
+        return
+
+    run_benchmark(args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RST转换性能测试
+对比 RST → HTML → Markdown → HTML 往返路径与 RST → HTML 直接路径，
+以及小片段重复转换时每次新建docutils组件与复用发布器的差别
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import docutils.core
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rst_wechat import SETTINGS_OVERRIDES, WeChatHTMLWriter
+from universal_converter import UniversalToWeChatConverter
+
+
+def make_document(index, sections):
+    """生成一篇包含各种RST元素的文档"""
+    parts = [f"文档 {index}\n{'=' * 20}\n"]
+    for section in range(sections):
+        parts.append(f"""
+第 {section} 节
+{'-' * 20}
+
+这是一段包含 *强调*、**粗体** 和 ``行内代码`` 的正文，并带有一个 `链接 <https://example.com/{section}>`_。
+
+- 列表项一
+- 列表项二
+
+  - 嵌套列表项
+
+.. note:: 这是第 {section} 节的提示。
+
+.. code:: python
+
+   def section_{section}():
+       return {section}
+
+=====  =====
+列一   列二
+=====  =====
+{section}      {section * 2}
+=====  =====
+""")
+    return ''.join(parts)
+
+
+def run_benchmark(documents, sections):
+    """运行性能测试"""
+    converter = UniversalToWeChatConverter()
+    corpus = [make_document(i, sections) for i in range(documents)]
+    total_kb = sum(len(doc.encode('utf-8')) for doc in corpus) / 1024
+
+    print(f"📚 测试语料: {documents} 篇文档，每篇 {sections} 节，共 {total_kb:.0f} KB")
+    print("=" * 50)
+
+    start = time.perf_counter()
+    for doc in corpus:
+        converter.markdown_to_wechat_html(converter.rst_to_markdown(doc))
+    round_trip = time.perf_counter() - start
+    print(f"往返路径 (RST → HTML → Markdown → HTML): {round_trip:.2f} 秒")
+
+    start = time.perf_counter()
+    for doc in corpus:
+        converter.html_to_wechat_html(converter.rst_to_html(doc))
+    direct = time.perf_counter() - start
+    print(f"直接路径 (RST → HTML):                  {direct:.2f} 秒")
+
+    print(f"🚀 加速比: {round_trip / direct:.2f}x")
+
+
+def run_snippet_benchmark(snippets):
+    """小片段重复转换：每次调用 publish_parts 与复用发布器"""
+    converter = UniversalToWeChatConverter()
+    corpus = [f"片段 {i}\n{'-' * 20}\n\n这是一段包含 *强调* 和 ``行内代码`` 的正文。\n" for i in range(snippets)]
+
+    print(f"🧩 小片段: {snippets} 个")
+    print("=" * 50)
+
+    start = time.perf_counter()
+    for doc in corpus:
+        docutils.core.publish_parts(source=doc, writer=WeChatHTMLWriter(), settings_overrides=SETTINGS_OVERRIDES)
+    fresh = time.perf_counter() - start
+    print(f"每次新建 (publish_parts): {fresh:.2f} 秒")
+
+    start = time.perf_counter()
+    for doc in corpus:
+        converter.rst_to_html(doc)
+    reused = time.perf_counter() - start
+    print(f"复用发布器 (RSTPublisher): {reused:.2f} 秒")
+
+    print(f"🚀 加速比: {fresh / reused:.2f}x")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='RST转换性能测试')
+    parser.add_argument('--documents', type=int, default=50, help='文档数量')
+    parser.add_argument('--sections', type=int, default=40, help='每篇文档的节数')
+    parser.add_argument('--snippets', type=int, default=500, help='小片段测试的片段数量')
+    args = parser.parse_args()
+
+    run_benchmark(args.documents, args.sections)
+    print()
+    run_snippet_benchmark(args.snippets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RTF文字提取性能测试
+对比旧实现（整个文件读入后交给 striprtf.rtf_to_text）与逐段流式提取（iter_rtf_lines）
+在嵌入大图片的RTF文件上的耗时和内存峰值
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_rtf(path, picture_mb, paragraphs=2000):
+    """生成中文RTF文件：正文中间嵌入一张十六进制编码的图片，结尾一张 \\bin 编码的图片"""
+    text = '段落{index}：微信公众号文章转换测试，包含中文和English混排。'
+    hex_line = os.urandom(64).hex().encode('ascii') + b'\n'
+
+    def paragraph(index):
+        encoded = text.format(index=index).encode('gbk')
+        return b''.join(b"\\'%02x" % byte if byte > 0x7F else bytes((byte,)) for byte in encoded) + b'\\par\n'
+
+    with open(path, 'wb') as f:
+        f.write(b'{\\rtf1\\ansi\\ansicpg936\\deff0{\\fonttbl{\\f0\\fnil\\fcharset134 SimSun;}}\n\\pard\\f0\\fs24 ')
+        for index in range(paragraphs // 2):
+            f.write(paragraph(index))
+        f.write(b'{\\pict\\pngblip\\picw800\\pich600\n')
+        for _ in range(picture_mb * 1024 * 1024 // len(hex_line)):
+            f.write(hex_line)
+        f.write(b'}\n')
+        for index in range(paragraphs // 2, paragraphs):
+            f.write(paragraph(index))
+        blob = os.urandom(picture_mb * 1024 * 1024 // 2)
+        f.write(b'{\\pict\\pngblip\\bin%d ' % len(blob) + blob + b'}\n}')
+
+
+def peak_rss_mb():
+    """当前进程的内存峰值（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(mode, input_file):
+    """在当前进程中提取一次文字，输出耗时、内存峰值和段落数（在独立子进程中调用）"""
+    if mode == 'legacy':
+        from striprtf.striprtf import rtf_to_text
+    else:
+        from rtf_text import iter_rtf_lines
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == 'legacy':
+        with open(input_file, 'r', encoding='latin-1') as f:
+            lines = [line for line in rtf_to_text(f.read()).split('\n') if line.strip()]
+    else:
+        lines = [line for line in iter_rtf_lines(input_file) if line.strip()]
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({'elapsed': elapsed, 'peak_mb': peak_rss_mb() - baseline, 'paragraphs': len(lines)}))
+
+
+def run_benchmark(picture_mb):
+    """运行测试，每种实现在独立子进程中运行，内存峰值互不影响"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.rtf'
+        make_rtf(path, picture_mb)
+        print(f"📄 测试文件: {path.stat().st_size / 1024 / 1024:.0f} MB RTF（含十六进制和 \\bin 图片）")
+        print("=" * 50)
+
+        for mode, label in (('legacy', '旧实现 (striprtf)'), ('stream', '逐段流式提取')):
+            output = subprocess.run(
+                [sys.executable, __file__, '--mode', mode, str(path)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:20} {stats['elapsed']:.2f} 秒，内存峰值增加 {stats['peak_mb']:.0f} MB，"
+                  f"{stats['paragraphs']} 个段落")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='RTF文字提取性能测试')
+    parser.add_argument('--size', type=int, default=50, help='嵌入图片的大小（MB）')
+    parser.add_argument('--mode', choices=['legacy', 'stream'], help=argparse.SUPPRESS)
+    parser.add_argument('document', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.document)
+        return
+
+    run_benchmark(args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+纯文本转换内存测试
+对比旧实现（整个文件读入后 split 成行列表，再构建第二个列表后 join）
+与逐行流式转换（ExtendedMarkdownToWeChatConverter.convert_file）的耗时和内存峰值
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_log(path, size_mb):
+    """生成日志风格的GBK编码纯文本文件"""
+    block = ''.join(
+        f'2024-01-01 12:00:{index % 60:02d} 服务 worker-{index % 8} 处理请求 #{index}，耗时 {index % 97} 毫秒\n'
+        + ('\n' if index % 20 == 0 else '')
+        for index in range(1000)
+    ).encode('gbk')
+    with open(path, 'wb') as f:
+        for _ in range(size_mb * 1024 * 1024 // len(block) + 1):
+            f.write(block)
+
+
+def legacy_convert(input_file, output_file):
+    """旧实现：整个文件读入内存，split 成行列表，再构建HTML行列表"""
+    with open(input_file, 'r', encoding='gb18030') as f:
+        content = f.read()
+    html_lines = []
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            html_lines.append('<br>')
+        elif line.startswith('# '):
+            html_lines.append(f'<h1>{line[2:]}</h1>')
+        elif line.startswith('- '):
+            html_lines.append(f'<li>{line[2:]}</li>')
+        else:
+            html_lines.append(f'<p>{line}</p>')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(html_lines))
+
+
+def peak_rss_mb():
+    """当前进程的内存峰值（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(mode, input_file):
+    """在当前进程中转换一次，输出耗时和内存峰值（在独立子进程中调用）"""
+    from extended_converter import ExtendedMarkdownToWeChatConverter
+
+    output_file = Path(input_file).with_suffix(f'.{mode}.html')
+    converter = ExtendedMarkdownToWeChatConverter()
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == 'legacy':
+        legacy_convert(input_file, output_file)
+    else:
+        converter.write_text_file(input_file, output_file)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({'elapsed': elapsed, 'peak_mb': peak_rss_mb() - baseline}))
+
+
+def run_benchmark(size_mb):
+    """运行测试，每种实现在独立子进程中运行，内存峰值互不影响"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.txt'
+        make_log(path, size_mb)
+        print(f"📄 测试文件: {path.stat().st_size / 1024 / 1024:.0f} MB GBK编码日志")
+        print("=" * 50)
+
+        for mode, label in (('legacy', '旧实现 (整体读入 + 行列表)'), ('stream', '逐行流式转换')):
+            output = subprocess.run(
+                [sys.executable, __file__, '--mode', mode, str(path)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:28} {stats['elapsed']:.2f} 秒，内存峰值增加 {stats['peak_mb']:.0f} MB")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='纯文本转换内存测试')
+    parser.add_argument('--size', type=int, default=200, help='测试文件大小（MB）')
+    parser.add_argument('--mode', choices=['legacy', 'stream'], help=argparse.SUPPRESS)
+    parser.add_argument('document', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.document)
+        return
+
+    run_benchmark(args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -51,13 +51,6 @@ def demo_extended_formats():
             except ImportError:
                 print("   ❌ 需要安装: pip install python-docx")
         
-        elif file_format == 'rtf':
-            try:
-                import striprtf
-                print("   ✅ RTF支持已安装")
-            except ImportError:
-                print("   ❌ 需要安装: pip install striprtf")
-        
         else:
             print("   ✅ 基础支持")
         
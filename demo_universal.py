@@ -228,7 +228,7 @@ if __name__ == "__main__":
     
     print("\n🎉 演示完成！")
     print("\n📋 使用说明:")
-    print("1. 安装依赖: pip install docutils python-docx striprtf")
+    print("1. 安装依赖: pip install docutils python-docx")
     print("2. 使用转换器: python universal_converter.py your_file.html")
     print("3. 查看支持的格式: python universal_converter.py --list-formats")
     print("4. 选择风格: python universal_converter.py file.txt --style tech")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word文档直接转换为HTML（基于mammoth）
+
+mammoth按样式映射把Word样式直接写成语义化HTML（标题、列表、表格、引用、代码块等），
+交给转换器共用的微信公众号后处理阶段，不需要构建python-docx的完整对象模型，
+也不经过Markdown中间格式。
+"""
+
+import mammoth
+import mammoth.html
+
+# Word样式到HTML的映射，未列出的标题、列表等使用mammoth的默认映射
+DOCX_STYLE_MAP = """
+p[style-name='Title'] => h1:fresh
+p[style-name='Subtitle'] => h2:fresh
+p[style-name='Quote'] => blockquote > p:fresh
+p[style-name='Intense Quote'] => blockquote > p:fresh
+p[style-name='Code'] => pre:separator('\\n')
+p[style-name='HTML Preformatted'] => pre:separator('\\n')
+r[style-name='HTML Code'] => code
+r[style-name='Strong'] => strong
+r[style-name='Emphasis'] => em
+strike => del
+"""
+
+
+def _image_converter(image_url):
+    """图片转换函数：按图片内容查找地址，没有地址的图片不输出
+
+    不使用mammoth默认的转换方式，避免图片以base64形式内嵌到HTML中。
+    """
+    def convert_image(image):
+        if image_url is None:
+            return []
+        with image.open() as f:
+            url = image_url(f.read())
+        if not url:
+            return []
+        attributes = {'src': url}
+        if image.alt_text:
+            attributes['alt'] = image.alt_text
+        return [mammoth.html.element('img', attributes)]
+
+    return convert_image
+
+
+def docx_to_html(source, image_url=None):
+    """将Word文档转换为HTML片段
+
+    Args:
+        source: 文件路径，或以二进制方式打开、可随机读取的文件对象
+        image_url: 根据图片内容返回图片地址的函数，为 None 时不输出图片
+
+    Returns:
+        str: HTML片段
+    """
+    convert_image = _image_converter(image_url)
+    if hasattr(source, 'read'):
+        result = mammoth.convert_to_html(source, style_map=DOCX_STYLE_MAP, convert_image=convert_image)
+    else:
+        with open(source, 'rb') as f:
+            result = mammoth.convert_to_html(f, style_map=DOCX_STYLE_MAP, convert_image=convert_image)
+    return result.value
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word文档转Markdown
+
+按文档顺序遍历一次 document.xml 的正文：段落逐个遍历文字片段（run），
+相邻且格式相同的片段先合并再加粗/斜体标记，表格、列表、超链接和图片在同一次遍历中处理，
+转换时间与文档大小成线性关系。
+"""
+
+from docx import Document
+from docx.oxml.ns import qn
+
+# 正文中的块级元素
+_P = qn('w:p')
+_TBL = qn('w:tbl')
+_SDT = qn('w:sdt')
+_SDT_CONTENT = qn('w:sdtContent')
+
+# 段落中的行内元素
+_R = qn('w:r')
+_HYPERLINK = qn('w:hyperlink')
+_T = qn('w:t')
+_TAB = qn('w:tab')
+_BR = qn('w:br')
+_CR = qn('w:cr')
+_NO_BREAK_HYPHEN = qn('w:noBreakHyphen')
+_RPR = qn('w:rPr')
+_B = qn('w:b')
+_I = qn('w:i')
+
+# 图片：新版的 w:drawing、旧版的 w:pict（VML），以及包裹两者的兼容性元素
+_DRAWING = qn('w:drawing')
+_PICT = qn('w:pict')
+_ALTERNATE_CONTENT = '{http://schemas.openxmlformats.org/markup-compatibility/2006}AlternateContent'
+_IMAGE_TAGS = (_DRAWING, _PICT, _ALTERNATE_CONTENT)
+_BLIP = qn('a:blip')
+_DOC_PR = qn('wp:docPr')
+_IMAGEDATA = '{urn:schemas-microsoft-com:vml}imagedata'
+_EMBED = qn('r:embed')
+
+# 包裹文字片段、需要继续向内遍历的行内元素（修订插入、智能标记、内容控件、简单域）
+_INLINE_CONTAINERS = {qn('w:ins'), qn('w:smartTag'), _SDT, _SDT_CONTENT, qn('w:fldSimple')}
+
+_VAL = qn('w:val')
+_RID = qn('r:id')
+_ANCHOR = qn('w:anchor')
+_FALSE_VALUES = {'0', 'false', 'off'}
+
+# 不转义、不加格式标记的片段（图片）
+_RAW = 'raw'
+
+# Markdown中需要转义的字符
+_ESCAPE_TABLE = str.maketrans({'\\': '\\\\', '*': '\\*', '_': '\\_', '`': '\\`'})
+
+# 列表项的缩进（python-markdown要求嵌套列表缩进4个空格）
+_LIST_INDENT = '    '
+
+
+def _flag(rpr, tag):
+    """读取run属性中的开关值（如 <w:b/>、<w:b w:val="0"/>）"""
+    if rpr is None:
+        return False
+    element = rpr.find(tag)
+    if element is None:
+        return False
+    return element.get(_VAL, 'true').lower() not in _FALSE_VALUES
+
+
+def _wrap(text, bold, italic):
+    """给合并后的片段加格式标记，首尾空白放在标记外面"""
+    core = text.strip()
+    if not core or not (bold or italic):
+        return text
+    mark = ('**' if bold else '') + ('*' if italic else '')
+    start = len(text) - len(text.lstrip())
+    end = start + len(core)
+    return f"{text[:start]}{mark}{core}{mark[::-1]}{text[end:]}"
+
+
+class DocxMarkdownBuilder:
+    """python-docx文档到Markdown的单次遍历转换器"""
+
+    def __init__(self, document, image_url=None):
+        """初始化
+
+        Args:
+            document: python-docx 的 Document 对象
+            image_url: 根据文档包中的图片文件名返回图片地址的函数，为 None 时不输出图片
+        """
+        self.document = document
+        self.part = document.part
+        self.image_url = image_url
+        self._style_names = None
+        self._numbering = None
+        # 当前列表的标识，用于区分前后相连的两个不同列表
+        self._list_key = None
+
+    def style_name(self, paragraph):
+        """段落样式名（python-docx的内置样式名，如 Heading 1）"""
+        if self._style_names is None:
+            self._style_names = {style.style_id: style.name for style in self.document.styles}
+
+        ppr = paragraph.pPr
+        style_id = ppr.pStyle.val if ppr is not None and ppr.pStyle is not None else None
+        return self._style_names.get(style_id) or ''
+
+    def is_ordered(self, num_id, level):
+        """判断编号列表的某一级是否为有序列表"""
+        if self._numbering is None:
+            self._numbering = self._load_numbering()
+        return self._numbering.get((num_id, level), 'bullet') not in ('bullet', 'none')
+
+    def _load_numbering(self):
+        """读取编号定义：(编号ID, 级别) -> 编号格式"""
+        try:
+            numbering = self.part.numbering_part.element
+        except (KeyError, NotImplementedError):
+            return {}
+
+        abstract_formats = {}
+        for abstract in numbering.findall(qn('w:abstractNum')):
+            formats = {}
+            for lvl in abstract.findall(qn('w:lvl')):
+                num_fmt = lvl.find(qn('w:numFmt'))
+                formats[lvl.get(qn('w:ilvl'))] = num_fmt.get(_VAL) if num_fmt is not None else 'decimal'
+            abstract_formats[abstract.get(qn('w:abstractNumId'))] = formats
+
+        result = {}
+        for num in numbering.findall(qn('w:num')):
+            abstract_id = num.find(qn('w:abstractNumId'))
+            if abstract_id is None:
+                continue
+            for level, num_fmt in abstract_formats.get(abstract_id.get(_VAL), {}).items():
+                result[(num.get(qn('w:numId')), level)] = num_fmt
+        return result
+
+    def link_target(self, hyperlink):
+        """超链接的目标地址"""
+        rid = hyperlink.get(_RID)
+        if rid is not None and rid in self.part.rels:
+            return self.part.rels[rid].target_ref
+        anchor = hyperlink.get(_ANCHOR)
+        return f'#{anchor}' if anchor else None
+
+    def image(self, element):
+        """将图片转换为Markdown图片，没有可用地址时返回 None"""
+        if self.image_url is None:
+            return None
+
+        blip = next(element.iter(_BLIP), None)
+        if blip is not None:
+            rid = blip.get(_EMBED)
+        else:
+            imagedata = next(element.iter(_IMAGEDATA), None)
+            rid = imagedata.get(_RID) if imagedata is not None else None
+
+        part = self.part.related_parts.get(rid) if rid else None
+        url = self.image_url(str(part.partname)) if part is not None else None
+        if not url:
+            return None
+
+        doc_pr = next(element.iter(_DOC_PR), None)
+        alt = doc_pr.get('descr', '') if doc_pr is not None else ''
+        return f"![{alt.replace('[', '').replace(']', '')}]({url})"
+
+    def iter_segments(self, element):
+        """按顺序生成段落中的片段：(文字, 格式, 链接)
+
+        格式为 (粗体, 斜体)，图片的格式为 _RAW。
+        """
+        stack = [(iter(element), None)]
+        while stack:
+            children, link = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+
+            tag = child.tag
+            if tag == _R:
+                rpr = child.find(_RPR)
+                style = (_flag(rpr, _B), _flag(rpr, _I))
+                for item in child:
+                    item_tag = item.tag
+                    if item_tag == _T:
+                        text = item.text
+                    elif item_tag == _TAB:
+                        text = '\t'
+                    elif item_tag in (_BR, _CR):
+                        text = '\n'
+                    elif item_tag == _NO_BREAK_HYPHEN:
+                        text = '-'
+                    elif item_tag in _IMAGE_TAGS:
+                        image = self.image(item)
+                        if image:
+                            yield image, _RAW, link
+                        continue
+                    else:
+                        continue
+                    if text:
+                        yield text, style, link
+            elif tag == _HYPERLINK:
+                stack.append((iter(child), self.link_target(child) or link))
+            elif tag in _INLINE_CONTAINERS:
+                stack.append((iter(child), link))
+
+    def inline(self, element, plain=False, line_break='  \n'):
+        """将段落内容转换为行内Markdown
+
+        相邻且格式、链接都相同的片段先合并，再整体加格式标记，
+        因此每个片段只处理一次。
+
+        Args:
+            element: w:p 元素
+            plain (bool): 不加粗体/斜体标记（用于标题）
+            line_break (str): 段落内换行的替换文本
+        """
+        output = []
+        link_parts = []
+        current_link = None
+        pieces = []
+        current_format = None
+
+        def flush_format():
+            if pieces:
+                target = link_parts if current_link is not None else output
+                if current_format == _RAW:
+                    target.append(''.join(pieces))
+                else:
+                    text = ''.join(pieces).translate(_ESCAPE_TABLE)
+                    text = text.replace('\n', line_break)
+                    target.append(text if plain else _wrap(text, *current_format))
+                pieces.clear()
+
+        def flush_link():
+            if current_link is not None and link_parts:
+                output.append(f"[{''.join(link_parts)}]({current_link})")
+                link_parts.clear()
+
+        for text, style, link in self.iter_segments(element):
+            if link != current_link:
+                flush_format()
+                flush_link()
+                current_link = link
+                current_format = None
+            if style != current_format:
+                flush_format()
+                current_format = style
+            pieces.append(text)
+
+        flush_format()
+        flush_link()
+        return ''.join(output).strip()
+
+    def table(self, element):
+        """将表格转换为Markdown表格，第一行作为表头"""
+        rows = []
+        for tr in element.iterchildren(qn('w:tr')):
+            cells = []
+            for tc in tr.iterchildren(qn('w:tc')):
+                text = ' '.join(filter(None, (
+                    self.inline(p, line_break=' ') for p in tc.iter(_P)
+                )))
+                cells.append(text.replace('|', '\\|'))
+
+                # 横向合并的单元格补齐空列，保持列数一致
+                tc_pr = tc.tcPr
+                span = tc_pr.grid_span if tc_pr is not None else 1
+                cells.extend([''] * (span - 1))
+            rows.append(cells)
+
+        if not rows:
+            return ''
+
+        width = max(len(row) for row in rows)
+        lines = []
+        for index, row in enumerate(rows):
+            row = row + [''] * (width - len(row))
+            lines.append('| ' + ' | '.join(row) + ' |')
+            if index == 0:
+                lines.append('| ' + ' | '.join(['---'] * width) + ' |')
+        return '\n'.join(lines)
+
+    def paragraph(self, element):
+        """将段落转换为Markdown块，返回 (类型, 文本)
+
+        类型为 text、item（列表项）或 first-item（新列表的第一项）。
+        """
+        style = self.style_name(element)
+
+        if style.startswith('Heading') or style == 'Title':
+            level = style.split()[-1]
+            level = int(level) if level.isdigit() else 1
+            text = self.inline(element, plain=True, line_break=' ')
+            return 'text', f"{'#' * min(level, 6)} {text}" if text else ''
+
+        text = self.inline(element)
+        if not text:
+            return 'text', ''
+
+        ppr = element.pPr
+        num_pr = ppr.numPr if ppr is not None else None
+        if num_pr is not None and num_pr.numId is not None and num_pr.numId.val:
+            level = num_pr.ilvl.val if num_pr.ilvl is not None else 0
+            ordered = self.is_ordered(str(num_pr.numId.val), str(level))
+            list_id = num_pr.numId.val
+        elif style.startswith('List Bullet') or style.startswith('List Number'):
+            last = style.split()[-1]
+            level = int(last) - 1 if last.isdigit() else 0
+            ordered = style.startswith('List Number')
+            list_id = None
+        else:
+            self._list_key = None
+            return 'text', text
+
+        # 顶层的编号或列表类型变化时开始一个新列表
+        list_key = (list_id, ordered)
+        if self._list_key is None or (level == 0 and self._list_key != list_key):
+            kind = 'first-item'
+            self._list_key = list_key
+        else:
+            kind = 'item'
+
+        marker = '1.' if ordered else '-'
+        indent = _LIST_INDENT * level
+        text = text.replace('\n', '\n' + indent + ' ' * (len(marker) + 1))
+        return kind, f"{indent}{marker} {text}"
+
+    def iter_blocks(self, body):
+        """按文档顺序生成Markdown块"""
+        stack = [iter(body)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+
+            tag = child.tag
+            if tag == _P:
+                yield self.paragraph(child)
+            elif tag == _TBL:
+                self._list_key = None
+                yield 'table', self.table(child)
+            elif tag in (_SDT, _SDT_CONTENT):
+                stack.append(iter(child))
+
+    def build(self):
+        """生成整篇文档的Markdown"""
+        parts = []
+        previous = None
+        for kind, text in self.iter_blocks(self.document.element.body):
+            if not text:
+                continue
+            if parts:
+                # 连续的列表项属于同一个列表
+                same_list = kind == 'item' and previous in ('item', 'first-item')
+                parts.append('\n' if same_list else '\n\n')
+            parts.append(text)
+            previous = kind
+        return ''.join(parts)
+
+
+def docx_to_markdown(file_path, image_url=None):
+    """Word文档转Markdown"""
+    return DocxMarkdownBuilder(Document(file_path), image_url).build()
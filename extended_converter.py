@@ -5,42 +5,72 @@
 支持多种输入格式：Markdown, HTML, TXT, RST, AsciiDoc, Word
 """
 
+import html
+import io
 import markdown
 import re
 from bs4 import BeautifulSoup
 import argparse
 import sys
 from pathlib import Path
+from asset_store import AssetStore, extract_docx_images
+from fs_utils import atomic_write_chunks, atomic_write_text
+from format_registry import MAMMOTH, PYTHON_DOCX, get_format, iter_formats
+from format_sniffer import detect_format
+from rtf_text import iter_rtf_lines
+from text_decoder import iter_lines, read_text
 from wechat_styles import WeChatStyleTemplates
 
-# 尝试导入可选依赖
-try:
-    import docutils.core
-    import docutils.writers.html4css1
-    RST_AVAILABLE = True
-except ImportError:
-    RST_AVAILABLE = False
+# 需要添加微信公众号样式的标签（图片只在没有样式时添加）
+WECHAT_TAG_STYLES = {
+    'img': 'max-width: 100%; height: auto; display: block; margin: 1em auto;',
+    'table': 'width: 100%; border-collapse: collapse; margin: 1em 0;',
+    'pre': 'background-color: #2c3e50; color: #ecf0f1; padding: 1em; border-radius: 5px; overflow-x: auto;',
+    'blockquote': 'margin: 1em 0; padding: 0.5em 1em; background-color: #f8f9fa; border-left: 4px solid #3498db;',
+}
 
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-
-try:
-    import striprtf
-    RTF_AVAILABLE = True
-except ImportError:
-    RTF_AVAILABLE = False
+# 微信公众号HTML文档中正文之后的部分
+WECHAT_HTML_TAIL = """
+</body>
+</html>"""
 
 
 class ExtendedMarkdownToWeChatConverter:
     """扩展版Markdown到微信公众号格式转换器"""
     
-    def __init__(self, style="default"):
-        """初始化转换器"""
+    # Word文档转换引擎
+    DOCX_ENGINES = ('auto', 'python-docx', 'mammoth')
+    
+    # 内置格式转HTML的方法（其余格式使用注册表中插件提供的转换函数）
+    HTML_METHODS = {
+        'markdown': 'convert_markdown',
+        'html': 'parse_html',
+        'text': 'convert_text',
+        'rst': 'convert_rst',
+        'docx': 'convert_docx',
+        'rtf': 'convert_rtf',
+    }
+    
+    # 纯文本行首标记对应的HTML标签
+    TEXT_LINE_TAGS = {
+        '#': 'h1',
+        '##': 'h2',
+        '###': 'h3',
+        '-': 'li',
+    }
+    
+    def __init__(self, style="default", docx_engine="auto", asset_store=None):
+        """初始化转换器
+        
+        Args:
+            style (str): 文章风格
+            docx_engine (str): Word文档转换引擎
+            asset_store (AssetStore): 保存Word文档中图片的资源存储，为 None 时不输出图片
+        """
         self.style = style
         self.wechat_styles = WeChatStyleTemplates.get_style_template(style)
+        self.docx_engine = self.resolve_docx_engine(docx_engine)
+        self.asset_store = asset_store
         
         # Markdown配置
         self.md_extensions = [
@@ -58,24 +88,46 @@ class ExtendedMarkdownToWeChatConverter:
                 'noclasses': True,
             }
         }
+        
+        # RST发布器：第一次转换RST时创建，之后重复转换时复用设置和docutils组件
+        self._rst_publisher = None
+    
+    @property
+    def rst_publisher(self):
+        """使用docutils默认HTML写入器的RST发布器"""
+        if self._rst_publisher is None:
+            get_format('rst').require()
+            import docutils.writers
+            from rst_wechat import SAFE_SETTINGS, RSTPublisher
+            self._rst_publisher = RSTPublisher(
+                docutils.writers.get_writer_class('html'),
+                {**SAFE_SETTINGS, 'output_encoding': 'unicode'}
+            )
+        return self._rst_publisher
+    
+    def resolve_docx_engine(self, engine):
+        """确定Word文档的转换引擎：auto 优先使用python-docx，未安装时使用mammoth"""
+        if engine not in self.DOCX_ENGINES:
+            raise ValueError(f"不支持的Word转换引擎: {engine}")
+        if engine == 'auto':
+            if PYTHON_DOCX.available() or not MAMMOTH.available():
+                return 'python-docx'
+            return 'mammoth'
+        return engine
+    
+    def docx_images(self, file_path):
+        """提取Word文档中的图片到资源存储，未配置资源存储时返回 None"""
+        if self.asset_store is None:
+            return None
+        return extract_docx_images(file_path, self.asset_store)
     
     def detect_file_format(self, file_path):
-        """检测文件格式"""
-        path = Path(file_path)
-        suffix = path.suffix.lower()
-        
-        format_map = {
-            '.md': 'markdown',
-            '.markdown': 'markdown',
-            '.html': 'html',
-            '.htm': 'html',
-            '.txt': 'text',
-            '.rst': 'rst',
-            '.docx': 'docx',
-            '.rtf': 'rtf',
-        }
+        """检测文件格式
         
-        return format_map.get(suffix, 'unknown')
+        只读取文件开头的一小段内容按文件签名和内容特征判断，扩展名作为提示，
+        因此另存为 .txt 的Markdown、没有扩展名的Word文档也能走正确的转换流程。
+        """
+        return detect_format(file_path)
     
     def convert_markdown(self, content):
         """转换Markdown格式"""
@@ -85,128 +137,127 @@ class ExtendedMarkdownToWeChatConverter:
         )
         return md.convert(content)
     
+    def parse_html(self, content):
+        """解析HTML输入，返回文档树
+        
+        HTML可以直接使用，只需要优化样式：文档树交给 create_wechat_html 修改后只序列化一次。
+        """
+        return BeautifulSoup(content, 'html.parser')
+    
     def convert_html(self, content):
         """转换HTML格式"""
-        # HTML可以直接使用，只需要优化样式
-        soup = BeautifulSoup(content, 'html.parser')
-        return str(soup)
+        return str(self.parse_html(content))
     
-    def convert_text(self, content):
-        """转换纯文本格式"""
-        # 将纯文本转换为简单的HTML
-        lines = content.split('\n')
-        html_lines = []
+    def iter_text_html(self, lines):
+        """逐行转换纯文本，生成HTML行
         
+        每行按第一个空格前的标记查表（TEXT_LINE_TAGS），没有标记的行作为段落。
+        
+        Args:
+            lines: 文本行的可迭代对象（如文件对象或 iter_lines 的结果）
+        """
         for line in lines:
             line = line.strip()
             if not line:
-                html_lines.append('<br>')
+                yield '<br>'
+                continue
+            
+            marker, space, rest = line.partition(' ')
+            tag = self.TEXT_LINE_TAGS.get(marker) if space else None
+            if tag:
+                yield f'<{tag}>{html.escape(rest, quote=False)}</{tag}>'
             else:
-                # 简单的格式检测
-                if line.startswith('# '):
-                    html_lines.append(f'<h1>{line[2:]}</h1>')
-                elif line.startswith('## '):
-                    html_lines.append(f'<h2>{line[3:]}</h2>')
-                elif line.startswith('### '):
-                    html_lines.append(f'<h3>{line[4:]}</h3>')
-                elif line.startswith('- '):
-                    html_lines.append(f'<li>{line[2:]}</li>')
-                else:
-                    html_lines.append(f'<p>{line}</p>')
+                yield f'<p>{html.escape(line, quote=False)}</p>'
+    
+    def convert_text(self, content):
+        """转换纯文本格式
         
-        return '\n'.join(html_lines)
+        Args:
+            content: 文本字符串，或文本行的可迭代对象
+        """
+        lines = io.StringIO(content) if isinstance(content, str) else content
+        return '\n'.join(self.iter_text_html(lines))
     
     def convert_rst(self, content):
         """转换RST格式"""
-        if not RST_AVAILABLE:
-            raise ImportError("需要安装 docutils: pip install docutils")
-        
         # 使用docutils转换RST到HTML
-        html = docutils.core.publish_parts(
-            source=content,
-            writer_name='html',
-            settings_overrides={'output_encoding': 'unicode'}
-        )['html_body']
-        
-        return html
+        return self.rst_publisher.publish_parts(content)['html_body']
     
     def convert_docx(self, file_path):
-        """转换Word文档"""
-        if not DOCX_AVAILABLE:
-            raise ImportError("需要安装 python-docx: pip install python-docx")
+        """转换Word文档
         
-        doc = Document(file_path)
-        html_content = []
+        python-docx引擎单次遍历生成Markdown（保留粗体、斜体、列表、表格和超链接）再转HTML；
+        mammoth引擎按Word样式直接生成语义化HTML。配置了资源存储时图片一并输出。
+        """
+        if self.docx_engine == 'mammoth':
+            MAMMOTH.load()
+            from docx_html import docx_to_html
+            images = self.docx_images(file_path)
+            return docx_to_html(file_path, images.url_for_bytes if images else None)
         
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
-            if text:
-                # 简单的样式检测
-                if paragraph.style.name.startswith('Heading'):
-                    level = paragraph.style.name.split()[-1]
-                    if level.isdigit():
-                        html_content.append(f'<h{level}>{text}</h{level}>')
-                    else:
-                        html_content.append(f'<h1>{text}</h1>')
-                else:
-                    html_content.append(f'<p>{text}</p>')
+        PYTHON_DOCX.load()
+        from docx import Document
+        from docx_markdown import DocxMarkdownBuilder
         
-        return '\n'.join(html_content)
+        images = self.docx_images(file_path)
+        builder = DocxMarkdownBuilder(Document(file_path), images.url_for_part if images else None)
+        return self.convert_markdown(builder.build())
     
-    def convert_rtf(self, content):
-        """转换RTF格式"""
-        if not RTF_AVAILABLE:
-            raise ImportError("需要安装 striprtf: pip install striprtf")
-        
-        # 使用striprtf转换RTF到纯文本
-        text = striprtf.rtf_to_text(content)
-        return self.convert_text(text)
+    def convert_rtf(self, file_path):
+        """转换RTF格式：逐段提取文字后按纯文本转换，跳过图片和嵌入对象"""
+        return self.convert_text(iter_rtf_lines(file_path))
     
     def convert_content(self, content, file_format, file_path=None):
-        """根据格式转换内容"""
-        if file_format == 'markdown':
-            return self.convert_markdown(content)
-        elif file_format == 'html':
-            return self.convert_html(content)
-        elif file_format == 'text':
-            return self.convert_text(content)
-        elif file_format == 'rst':
-            return self.convert_rst(content)
-        elif file_format == 'docx':
-            return self.convert_docx(file_path)
-        elif file_format == 'rtf':
-            return self.convert_rtf(content)
-        else:
+        """根据格式转换内容
+        
+        内置格式按 HTML_METHODS 调用对应方法，其余格式使用注册表中插件的转换函数。
+        二进制格式（如Word文档）使用 file_path，其余格式使用 content。
+        
+        Returns:
+            HTML字符串；HTML输入返回已解析的文档树，可以直接交给 create_wechat_html
+        """
+        plugin = get_format(file_format)
+        if plugin is None:
             raise ValueError(f"不支持的格式: {file_format}")
+        source = file_path if plugin.binary else content
+        
+        method = self.HTML_METHODS.get(file_format)
+        if method:
+            return getattr(self, method)(source)
+        
+        plugin.require()
+        if plugin.to_html is not None:
+            return plugin.to_html(source, self)
+        if plugin.to_markdown is not None:
+            return self.convert_markdown(plugin.to_markdown(source, self))
+        raise ValueError(f"不支持的格式: {file_format}")
     
     def optimize_for_wechat(self, html_content):
-        """优化HTML内容以适配微信公众号"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # 处理图片标签
-        for img in soup.find_all('img'):
-            if not img.get('style'):
-                img['style'] = 'max-width: 100%; height: auto; display: block; margin: 1em auto;'
+        """优化HTML内容以适配微信公众号
         
-        # 处理表格
-        for table in soup.find_all('table'):
-            table['style'] = 'width: 100%; border-collapse: collapse; margin: 1em 0;'
+        Args:
+            html_content: HTML字符串，或已解析的 BeautifulSoup 文档树（直接修改，不重新解析）
         
-        # 处理代码块
-        for pre in soup.find_all('pre'):
-            pre['style'] = 'background-color: #2c3e50; color: #ecf0f1; padding: 1em; border-radius: 5px; overflow-x: auto;'
+        Returns:
+            str: 优化后的HTML
+        """
+        if isinstance(html_content, BeautifulSoup):
+            soup = html_content
+        else:
+            soup = BeautifulSoup(html_content, 'html.parser')
         
-        # 处理引用块
-        for blockquote in soup.find_all('blockquote'):
-            blockquote['style'] = 'margin: 1em 0; padding: 0.5em 1em; background-color: #f8f9fa; border-left: 4px solid #3498db;'
+        # 一次遍历处理图片、表格、代码块和引用块
+        for tag in soup.find_all(list(WECHAT_TAG_STYLES)):
+            # 图片保留原有样式
+            if tag.name == 'img' and tag.get('style'):
+                continue
+            tag['style'] = WECHAT_TAG_STYLES[tag.name]
         
         return str(soup)
     
-    def create_wechat_html(self, html_content, title="", subtitle=""):
-        """创建完整的微信公众号HTML文档"""
-        optimized_html = self.optimize_for_wechat(html_content)
-        
-        full_html = f"""<!DOCTYPE html>
+    def wechat_html_head(self, title="", subtitle=""):
+        """微信公众号HTML文档中正文之前的部分"""
+        head = f"""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -218,19 +269,43 @@ class ExtendedMarkdownToWeChatConverter:
 """
         
         if title:
-            full_html += f'    <h1 class="wechat-title">{title}</h1>\n'
+            head += f'    <h1 class="wechat-title">{title}</h1>\n'
         if subtitle:
-            full_html += f'    <p class="wechat-subtitle">{subtitle}</p>\n'
+            head += f'    <p class="wechat-subtitle">{subtitle}</p>\n'
         
-        full_html += f"    {optimized_html}\n"
-        full_html += """
-</body>
-</html>"""
+        return head
+    
+    def create_wechat_html(self, html_content, title="", subtitle=""):
+        """创建完整的微信公众号HTML文档
         
-        return full_html
+        Args:
+            html_content: HTML字符串，或 parse_html 返回的文档树
+        """
+        optimized_html = self.optimize_for_wechat(html_content)
+        return f"{self.wechat_html_head(title, subtitle)}    {optimized_html}\n{WECHAT_HTML_TAIL}"
+    
+    def write_text_file(self, input_file, output_file, title="", subtitle=""):
+        """逐行转换纯文本文件并流式写入输出文件，内存占用与文件大小无关
+        
+        纯文本只生成标题、段落和列表项，不需要 optimize_for_wechat 处理。
+        先写入输出目录中的临时文件再重命名，中途失败不会留下半个文件。
+        """
+        def chunks():
+            yield self.wechat_html_head(title, subtitle)
+            yield '    '
+            for line in self.iter_text_html(iter_lines(input_file)):
+                yield f'{line}\n'
+            yield WECHAT_HTML_TAIL
+        
+        atomic_write_chunks(output_file, chunks())
     
     def convert_file(self, input_file, output_file=None, title="", subtitle=""):
-        """转换文件"""
+        """转换文件
+        
+        Returns:
+            str: 微信公众号HTML；纯文本文件流式写入输出文件，不在内存中生成完整HTML，
+                返回输出文件路径；失败时为 None
+        """
         try:
             # 检测文件格式
             file_format = self.detect_file_format(input_file)
@@ -239,33 +314,33 @@ class ExtendedMarkdownToWeChatConverter:
                 print(f"不支持的文件格式: {Path(input_file).suffix}")
                 return None
             
-            # 读取文件内容
-            if file_format == 'docx':
-                # Word文档需要特殊处理
-                html_content = self.convert_docx(input_file)
-            else:
-                with open(input_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                html_content = self.convert_content(content, file_format, input_file)
-            
-            # 创建微信公众号HTML
-            wechat_html = self.create_wechat_html(html_content, title, subtitle)
-            
             # 确定输出文件名
             if not output_file:
                 input_path = Path(input_file)
                 output_file = input_path.with_suffix('.html')
             
-            # 保存HTML文件
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(wechat_html)
+            if file_format == 'text':
+                # 纯文本逐行转换，不把整个文件读入内存
+                self.write_text_file(input_file, output_file, title, subtitle)
+                result = str(output_file)
+            else:
+                # 读取文件内容：二进制格式（如Word文档）直接读取文件
+                plugin = get_format(file_format)
+                content = None if plugin is None or plugin.binary else read_text(input_file)
+                html_content = self.convert_content(content, file_format, input_file)
+                
+                # 创建微信公众号HTML
+                result = self.create_wechat_html(html_content, title, subtitle)
+                
+                # 保存HTML文件（先写临时文件再重命名，中途失败不会留下半个文件）
+                atomic_write_text(output_file, result)
             
             print(f"转换完成！")
             print(f"输入文件: {input_file} ({file_format})")
             print(f"输出文件: {output_file}")
             print(f"可以直接复制HTML内容到微信公众号编辑器")
             
-            return wechat_html
+            return result
             
         except Exception as e:
             print(f"转换失败: {str(e)}")
@@ -282,6 +357,9 @@ def main():
     parser.add_argument('--style', help='文章风格', 
                        choices=WeChatStyleTemplates.get_available_styles(),
                        default='default')
+    parser.add_argument('--docx-engine', choices=ExtendedMarkdownToWeChatConverter.DOCX_ENGINES, default='auto',
+                       help='Word文档转换引擎（auto: 优先python-docx，未安装时使用mammoth）')
+    parser.add_argument('--assets-dir', help='Word文档中图片的保存目录（不指定时不输出图片）')
     parser.add_argument('--list-styles', action='store_true', help='列出所有可用风格')
     parser.add_argument('--list-formats', action='store_true', help='列出支持的输入格式')
     
@@ -291,20 +369,13 @@ def main():
     if args.list_formats:
         print("支持的输入格式：")
         print("=" * 50)
-        formats = [
-            ("Markdown", ".md, .markdown", "完全支持，包括表格、代码、列表等"),
-            ("HTML", ".html, .htm", "直接优化，保持原有结构"),
-            ("纯文本", ".txt", "基本格式转换，支持简单标题和列表"),
-            ("RST", ".rst", "需要安装 docutils: pip install docutils"),
-            ("Word", ".docx", "需要安装 python-docx: pip install python-docx"),
-            ("RTF", ".rtf", "需要安装 striprtf: pip install striprtf"),
-        ]
-        
-        for name, extensions, description in formats:
-            print(f"{name:10} {extensions:15} - {description}")
-        
-        print("\n依赖安装命令：")
-        print("pip install docutils python-docx striprtf")
+        for input_format in iter_formats():
+            extensions = ', '.join(input_format.suffixes)
+            description = input_format.description
+            if input_format.requires:
+                status = '已安装' if input_format.available() else '未安装'
+                description += f"（依赖{status}: {input_format.install_hint()}）"
+            print(f"{input_format.label:10} {extensions:15} - {description}")
         return
     
     # 列出风格
@@ -321,7 +392,11 @@ def main():
         parser.error("需要提供输入文件路径")
     
     # 创建转换器
-    converter = ExtendedMarkdownToWeChatConverter(style=args.style)
+    asset_store = None
+    if args.assets_dir:
+        asset_store = AssetStore.for_output(args.assets_dir, args.output or Path(args.input).with_suffix('.html'))
+    
+    converter = ExtendedMarkdownToWeChatConverter(style=args.style, docx_engine=args.docx_engine, asset_store=asset_store)
     
     # 执行转换
     converter.convert_file(args.input, args.output, args.title, args.subtitle)
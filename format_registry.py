@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输入格式注册表
+
+每种输入格式是一个 InputFormat 插件，记录格式名、扩展名、说明、可选依赖、读取方式，
+以及（第三方格式的）内容检测和转换函数。格式检测、各转换器、命令行的 --list-formats
+和网站的上传检查、/api/formats 都从这里读取，新增格式只需要注册一次。
+
+可选依赖只在格式第一次使用时导入；列出格式时只检查依赖是否已安装，不导入。
+
+第三方格式可以在代码中调用 register_format 注册，也可以在自己的包中声明入口点：
+
+    [project.entry-points."markdown2wechat.formats"]
+    asciidoc = "my_package.wechat:ASCIIDOC_FORMAT"
+
+入口点指向 InputFormat 对象，或调用后完成注册的函数，在第一次查询注册表时加载。
+"""
+
+import importlib
+import importlib.util
+import threading
+import warnings
+from importlib.metadata import entry_points
+
+# 第三方格式的入口点分组
+ENTRY_POINT_GROUP = 'markdown2wechat.formats'
+
+
+class OptionalDependency:
+    """可选依赖：第一次使用时才导入"""
+
+    def __init__(self, module, install):
+        """初始化
+
+        Args:
+            module (str): 模块名
+            install (str): 安装命令
+        """
+        self.module = module
+        self.install = install
+        self._loaded = None
+
+    def available(self):
+        """检查是否已安装（不导入模块）"""
+        if self._loaded is not None:
+            return True
+        try:
+            return importlib.util.find_spec(self.module) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def load(self):
+        """导入模块，未安装时抛出带安装命令的 ImportError"""
+        if self._loaded is None:
+            try:
+                self._loaded = importlib.import_module(self.module)
+            except ImportError as e:
+                raise ImportError(f"需要安装 {self.module.split('.')[0]}: {self.install}") from e
+        return self._loaded
+
+
+DOCUTILS = OptionalDependency('docutils', 'pip install docutils')
+PYTHON_DOCX = OptionalDependency('docx', 'pip install python-docx')
+MAMMOTH = OptionalDependency('mammoth', 'pip install mammoth')
+
+
+class InputFormat:
+    """输入格式插件"""
+
+    def __init__(self, name, label, suffixes, description='', requires=(), binary=False,
+                 detect=None, to_markdown=None, to_html=None):
+        """初始化
+
+        Args:
+            name (str): 格式名（detect_format 的返回值）
+            label (str): 显示名
+            suffixes (tuple): 扩展名（含点，如 .md）
+            description (str): 说明
+            requires (tuple): 可选依赖，每一项是 OptionalDependency，或其中任意一个可用即可的元组
+            binary (bool): 为 True 时转换函数收到文件路径（或文件对象），否则收到解码后的文本
+            detect: 内容检测函数 detect(prefix) -> bool，prefix 是文件开头的字节，先于内置规则调用
+            to_markdown: 转换函数 to_markdown(content, converter) -> Markdown
+            to_html: 转换函数 to_html(content, converter) -> HTML片段
+        """
+        self.name = name
+        self.label = label
+        self.suffixes = tuple(suffix.lower() for suffix in suffixes)
+        self.description = description
+        self.requires = tuple(requires)
+        self.binary = binary
+        self.detect = detect
+        self.to_markdown = to_markdown
+        self.to_html = to_html
+
+    def _groups(self):
+        """依赖按组返回，每组中任意一个可用即可"""
+        return [group if isinstance(group, tuple) else (group,) for group in self.requires]
+
+    def available(self):
+        """依赖是否都已安装"""
+        return all(any(dependency.available() for dependency in group) for group in self._groups())
+
+    def require(self):
+        """导入依赖，未安装时抛出带安装命令的 ImportError"""
+        for group in self._groups():
+            for dependency in group:
+                if dependency.available():
+                    dependency.load()
+                    break
+            else:
+                raise ImportError(f"{self.label} 格式需要安装依赖: {' 或 '.join(d.install for d in group)}")
+
+    def install_hint(self):
+        """安装依赖的命令"""
+        return ' / '.join(' 或 '.join(d.install for d in group) for group in self._groups())
+
+    def info(self):
+        """格式信息（用于命令行列表和 /api/formats）"""
+        return {
+            'name': self.label,
+            'format': self.name,
+            'extensions': list(self.suffixes),
+            'description': self.description,
+            'available': self.available(),
+        }
+
+
+_formats = {}
+_lock = threading.Lock()
+_entry_points_loaded = False
+
+
+def register_format(input_format, replace=False):
+    """注册输入格式
+
+    Args:
+        input_format (InputFormat): 格式插件
+        replace (bool): 是否替换同名格式
+    """
+    with _lock:
+        if input_format.name in _formats and not replace:
+            raise ValueError(f"输入格式已注册: {input_format.name}")
+        _formats[input_format.name] = input_format
+    return input_format
+
+
+def unregister_format(name):
+    """取消注册输入格式"""
+    with _lock:
+        return _formats.pop(name, None)
+
+
+def _load_entry_points():
+    """加载第三方包通过入口点声明的格式（只加载一次）"""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            plugin = entry_point.load()
+            if isinstance(plugin, InputFormat):
+                register_format(plugin, replace=True)
+            elif callable(plugin):
+                plugin()
+        except Exception as e:
+            warnings.warn(f"加载输入格式插件 {entry_point.name} 失败: {e}")
+
+
+def iter_formats():
+    """按注册顺序列出所有输入格式"""
+    _load_entry_points()
+    return list(_formats.values())
+
+
+def get_format(name):
+    """按格式名查找，不存在时返回 None"""
+    _load_entry_points()
+    return _formats.get(name)
+
+
+def format_for_suffix(suffix):
+    """按扩展名查找格式，不存在时返回 None"""
+    suffix = suffix.lower()
+    for input_format in iter_formats():
+        if suffix in input_format.suffixes:
+            return input_format
+    return None
+
+
+def allowed_extensions():
+    """所有注册格式的扩展名（不含点，用于上传检查）"""
+    return {suffix.lstrip('.') for input_format in iter_formats() for suffix in input_format.suffixes}
+
+
+def format_table():
+    """所有注册格式的信息"""
+    return [input_format.info() for input_format in iter_formats()]
+
+
+# 内置格式
+register_format(InputFormat('markdown', 'Markdown', ('.md', '.markdown'), '原生支持，功能最完整'))
+register_format(InputFormat('html', 'HTML', ('.html', '.htm'), '保持原有结构，统一为微信公众号样式'))
+register_format(InputFormat('text', '纯文本', ('.txt',), '识别简单的标题和列表'))
+register_format(InputFormat('rst', 'RST', ('.rst',), '直接转换为HTML', requires=(DOCUTILS,)))
+register_format(InputFormat('docx', 'Word', ('.docx',), '保留标题、列表、表格、链接和图片',
+                            requires=((PYTHON_DOCX, MAMMOTH),), binary=True))
+register_format(InputFormat('rtf', 'RTF', ('.rtf',), '提取文字后按纯文本转换，跳过图片和嵌入对象', binary=True))
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输入格式检测
+
+只读取文件开头的一小段内容（SNIFF_BYTES）识别格式，扩展名作为提示：
+- 文件签名优先：zip包中含 word/ 的是Word文档，以 {\\rtf 开头的是RTF，含NUL字节的二进制文件不支持
+- 以 <!DOCTYPE html> 或 <html> 开头的是HTML
+- .md/.rst/.html 等扩展名明确的文本文件，以及第三方注册的格式，按扩展名处理
+- 第三方格式可以提供内容检测函数，先于内置规则调用（见 format_registry）
+- .txt、未知扩展名或没有扩展名时，按HTML标签密度、RST标题下划线和指令、Markdown标记打分判断
+"""
+
+import codecs
+import re
+from pathlib import Path
+
+from format_registry import format_for_suffix, get_format, iter_formats
+from text_decoder import detect_encoding
+
+# 检测时最多读取的字节数
+SNIFF_BYTES = 8192
+
+_ZIP_SIGNATURE = b'PK\x03\x04'
+_DOCX_MARKER = b'word/'
+_RTF_SIGNATURE = b'{\\rtf'
+
+_HTML_START = ('<!doctype html', '<html')
+_HTML_TAG = re.compile(r'</?(?:p|div|h[1-6]|ul|ol|li|table|tr|td|th|span|a|br|img|strong|em|body|head|section|article)\b[^>]*>', re.I)
+
+# Markdown标记及其分值
+_MARKDOWN_PATTERNS = [
+    (re.compile(r'^#{1,6}\s+\S'), 2),
+    (re.compile(r'^(?:```|~~~)'), 2),
+    (re.compile(r'!?\[[^\]\n]+\]\([^)\s]+\)'), 2),
+    (re.compile(r'^\s*\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)+\|?\s*$'), 2),
+    (re.compile(r'\*\*[^*\n]+\*\*'), 1),
+    (re.compile(r'^>\s'), 1),
+]
+
+# RST标记及其分值
+_RST_PATTERNS = [
+    (re.compile(r'^\.\. [\w:-]+::'), 3),
+    (re.compile(r'^\.\. _[^:\n]+:'), 3),
+    (re.compile(r'`[^`\n]+ <[^>\n]+>`_'), 3),
+    (re.compile(r':\w+:`[^`\n]+`'), 2),
+    (re.compile(r'``[^`\n]+``'), 1),
+]
+
+# RST标题的下划线：同一个标点字符重复至少3次
+_UNDERLINE = re.compile(r'^([=\-~`:\'"^_*+#<>.])\1{2,}\s*$')
+
+
+def format_from_suffix(file_path):
+    """仅根据扩展名判断格式（扩展名来自格式注册表）"""
+    input_format = format_for_suffix(Path(file_path).suffix)
+    return input_format.name if input_format else 'unknown'
+
+
+def _is_trusted_hint(hint):
+    """扩展名对应的格式可以直接采用：内置的Markdown、RST、HTML，以及第三方注册的格式"""
+    if hint in ('unknown', 'text', 'docx', 'rtf'):
+        return False
+    return get_format(hint) is not None
+
+
+def read_prefix(source, size=SNIFF_BYTES):
+    """读取输入开头的一段字节
+
+    Args:
+        source: 文件路径，或以二进制方式打开、可定位的文件对象（读取后恢复原位置）
+    """
+    if hasattr(source, 'read'):
+        position = source.tell()
+        prefix = source.read(size)
+        source.seek(position)
+        return prefix
+
+    with open(source, 'rb') as f:
+        return f.read(size)
+
+
+def _decode_prefix(prefix):
+    """将开头字节解码为文本，返回 None 表示是二进制内容"""
+    encoding = detect_encoding(prefix)
+    if encoding == 'utf-16':
+        return prefix.decode('utf-16', errors='ignore')
+    if b'\x00' in prefix:
+        return None
+
+    # 按检测出的编码解码，GBK双字节字符的第二个字节不会被误认为 [ _ ` 等标记
+    text = prefix.decode(encoding, errors='ignore')
+    controls = sum(1 for char in text if char < ' ' and char not in '\t\n\r\f')
+    if controls > len(text) // 100 + 1:
+        return None
+    return text
+
+
+def _score_text(text, truncated):
+    """按内容特征给HTML、RST、Markdown打分"""
+    lines = text.splitlines()
+    if truncated and lines:
+        # 最后一行可能只读到一半
+        lines.pop()
+
+    scores = {'html': 0, 'rst': 0, 'markdown': 0}
+    previous = ''
+    for line in lines:
+        for pattern, score in _MARKDOWN_PATTERNS:
+            if pattern.search(line):
+                scores['markdown'] += score
+        for pattern, score in _RST_PATTERNS:
+            if pattern.search(line):
+                scores['rst'] += score
+
+        # 标题下划线：= 和 - 也可能是Markdown的Setext标题，其他字符只有RST使用
+        match = _UNDERLINE.match(line)
+        title = previous.strip()
+        if match and title and not _UNDERLINE.match(previous) and len(line.rstrip()) >= len(title):
+            scores['rst'] += 1 if match.group(1) in '=-' else 3
+        previous = line
+
+    tags = len(_HTML_TAG.findall(text))
+    content_lines = sum(1 for line in lines if line.strip())
+    if tags >= 5 and tags * 2 >= content_lines:
+        scores['html'] = tags
+
+    return scores
+
+
+def sniff_format(prefix, hint='unknown', truncated=False):
+    """根据输入开头的字节判断格式
+
+    Args:
+        prefix (bytes): 输入开头的一段字节
+        hint (str): 扩展名对应的格式
+        truncated (bool): prefix 是否只是输入的一部分
+
+    Returns:
+        str: 格式名，无法转换时为 unknown
+    """
+    # 第三方格式的内容检测优先
+    for input_format in iter_formats():
+        if input_format.detect is not None and input_format.detect(prefix):
+            return input_format.name
+
+    # 第三方二进制格式按扩展名处理；RTF只按文件签名识别
+    hint_format = get_format(hint)
+    binary_hint = hint if hint_format is not None and hint_format.binary and hint != 'rtf' else None
+
+    if prefix.startswith(_ZIP_SIGNATURE):
+        if _DOCX_MARKER in prefix:
+            return 'docx'
+        return binary_hint or 'unknown'
+
+    body = prefix[len(codecs.BOM_UTF8):] if prefix.startswith(codecs.BOM_UTF8) else prefix
+    if body.lstrip().startswith(_RTF_SIGNATURE):
+        return 'rtf'
+
+    text = _decode_prefix(prefix)
+    if text is None:
+        # 第三方二进制格式按扩展名处理，Word文档必须是zip包
+        return binary_hint if binary_hint not in (None, 'docx') else 'unknown'
+
+    head = text.lstrip()[:64].lower()
+    if head.startswith(_HTML_START):
+        return 'html'
+
+    if _is_trusted_hint(hint):
+        return hint
+
+    scores = _score_text(text, truncated)
+    if scores['html']:
+        return 'html'
+    if scores['rst'] >= 3 and scores['rst'] > scores['markdown']:
+        return 'rst'
+    if scores['markdown'] >= 2:
+        return 'markdown'
+    return 'text'
+
+
+def detect_format(source, hint=None):
+    """检测输入格式，只读取开头 SNIFF_BYTES 字节
+
+    Args:
+        source: 文件路径或以二进制方式打开的文件对象
+        hint (str): 扩展名对应的格式，默认根据文件名判断
+
+    Returns:
+        str: 格式名，无法转换时为 unknown
+    """
+    if hint is None:
+        name = getattr(source, 'name', None) if hasattr(source, 'read') else source
+        hint = format_from_suffix(name) if isinstance(name, (str, Path)) else 'unknown'
+
+    try:
+        prefix = read_prefix(source)
+    except OSError:
+        return hint
+
+    return sniff_format(prefix, hint, truncated=len(prefix) == SNIFF_BYTES)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件写入工具
+
+转换器、批量转换、站点导出和网站共用的原子写入：先写入同目录下的临时文件并 fsync，
+再重命名为目标文件，进程崩溃或断电时不会留下看起来完整、实际只写了一半的输出文件。
+"""
+
+import os
+from pathlib import Path
+
+
+def _sync_directory(directory):
+    """持久化目录项（重命名本身），不支持打开目录的平台上跳过"""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_chunks(path, chunks):
+    """原子地逐块写入文本文件（UTF-8），内存占用与文件大小无关
+
+    Args:
+        path: 输出文件路径
+        chunks: 依次写入的字符串
+
+    Returns:
+        int: 写入的字节数
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    size = 0
+    temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                f.write(data)
+                size += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+    _sync_directory(path.parent)
+
+    return size
+
+
+def atomic_write_text(path, text):
+    """原子地写入文本文件（UTF-8）
+
+    Returns:
+        int: 写入的字节数
+    """
+    return atomic_write_chunks(path, [text])
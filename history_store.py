@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换历史存储
+
+转换记录保存在SQLite数据库中，同一台机器上的多个gunicorn工作进程共用：
+- WAL模式：读不阻塞写，写只在提交时短暂加锁；synchronous=NORMAL 时提交不需要每次fsync
+- 按ID查找走主键索引，按时间列出和清理走时间索引
+- 每个进程（和线程）各自保持一个已设置好的连接，SQL语句固定，由连接缓存编译结果；
+  fork之后的子进程不会沿用父进程的连接
+- 写入合并提交：同一进程中同时到达的多条记录由第一个拿到写锁的线程在一个事务中一起写入，
+  每条记录在 add 返回前都已提交，其他工作进程随后立即可以读到
+- 统计计数（总数、按风格、按格式的次数、输入输出字节数和耗时）与记录在同一个事务中累加，
+  读取统计只需要读计数表，不随记录数增长；清理过期记录不影响统计
+- 转换结果（HTML）与记录在同一个事务中保存，任何工作进程在 add 返回后都能读到；
+  结果单独登记大小和最近访问时间（有索引），总大小作为计数保存，
+  超出上限时按最近访问时间从早到晚淘汰；过期记录按时间索引分批删除
+- 预览和下载只在内存中记下访问时间，随下一次写入、淘汰或定时任务一起写入数据库，
+  每个进程因访问而单独写入的频率不超过 TOUCH_INTERVAL 秒一次，读请求不争用写锁
+- 定时任务表让多个工作进程中只有一个在每个周期执行清理
+"""
+
+import json
+import os
+import posixpath
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# 表结构（记录中的其他字段保存在 extra 列中）
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    original_filename TEXT NOT NULL,
+    converted_filename TEXT NOT NULL,
+    style TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    subtitle TEXT NOT NULL DEFAULT '',
+    file_size INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_conversions_timestamp ON conversions (timestamp);
+CREATE TABLE IF NOT EXISTS counters (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    bytes_in INTEGER NOT NULL DEFAULT 0,
+    bytes_out INTEGER NOT NULL DEFAULT 0,
+    elapsed REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outputs_accessed ON outputs (accessed);
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    html TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS schedule (
+    name TEXT PRIMARY KEY,
+    next_run REAL NOT NULL
+);
+"""
+
+# 单独保存为列的字段
+COLUMNS = ('id', 'timestamp', 'original_filename', 'converted_filename', 'style', 'title', 'subtitle', 'file_size')
+
+_INSERT = f"INSERT OR REPLACE INTO conversions ({', '.join(COLUMNS)}, extra) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})"
+_SELECT = f"SELECT {', '.join(COLUMNS)}, extra FROM conversions"
+_COUNT = """
+INSERT INTO counters (kind, key, count, bytes_in, bytes_out, elapsed) VALUES (?, ?, 1, ?, ?, ?)
+ON CONFLICT (kind, key) DO UPDATE SET
+    count = count + 1,
+    bytes_in = bytes_in + excluded.bytes_in,
+    bytes_out = bytes_out + excluded.bytes_out,
+    elapsed = elapsed + excluded.elapsed
+"""
+# 保存的转换结果数和总大小（可增可减，不属于统计信息）
+_STORED = """
+INSERT INTO counters (kind, key, count, bytes_out) VALUES ('storage', 'outputs', ?, ?)
+ON CONFLICT (kind, key) DO UPDATE SET
+    count = count + excluded.count,
+    bytes_out = bytes_out + excluded.bytes_out
+"""
+_CLAIM = """
+INSERT INTO schedule (name, next_run) VALUES (?, ?)
+ON CONFLICT (name) DO UPDATE SET next_run = excluded.next_run WHERE next_run <= ?
+"""
+
+# 等待其他进程释放写锁的时间（毫秒）
+BUSY_TIMEOUT_MS = 5000
+
+# 访问时间最多在内存中积累的秒数
+TOUCH_INTERVAL = 60
+
+
+def _to_row(record):
+    """记录转换为数据库行"""
+    extra = {key: value for key, value in record.items() if key not in COLUMNS}
+    values = [record.get(key, '') for key in COLUMNS]
+    values[COLUMNS.index('file_size')] = record.get('file_size') or 0
+    return (*values, json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def _counter_rows(record):
+    """一条记录需要累加的计数：总数、按风格、按格式（扩展名）"""
+    values = (record.get('file_size') or 0, record.get('output_size') or 0, record.get('elapsed') or 0.0)
+    file_format = posixpath.splitext(record.get('original_filename', ''))[1].lower()
+    return [
+        ('total', '', *values),
+        ('style', record.get('style', ''), *values),
+        ('format', file_format, *values),
+    ]
+
+
+def _from_row(row):
+    """数据库行转换为记录"""
+    record = dict(zip(COLUMNS, row))
+    if row[-1]:
+        record.update(json.loads(row[-1]))
+    return record
+
+
+class HistoryStore:
+    """多进程共用的转换历史"""
+
+    def __init__(self, path):
+        """初始化，数据库不存在时创建
+
+        Args:
+            path (str): 数据库文件路径
+        """
+        self.path = str(path)
+        self._local = threading.local()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._touched = {}
+        self._touch_lock = threading.Lock()
+        self._touches_flushed = time.monotonic()
+
+        connection = self._connect()
+        with connection:
+            connection.executescript(_SCHEMA)
+        self._backfill_counters()
+
+    def _connect(self):
+        """当前进程和线程的连接，第一次使用时创建并设置"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _transaction(self):
+        """写事务：持有本进程的写锁，出错时回滚"""
+        connection = self._connect()
+        with self._write_lock:
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                yield connection
+                connection.execute('COMMIT')
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                raise
+
+    def _backfill_counters(self):
+        """计数表为空而已有记录时（从没有计数的版本升级），按现有记录补齐计数"""
+        with self._transaction() as connection:
+            if connection.execute("SELECT 1 FROM counters WHERE kind = 'total'").fetchone() is None:
+                rows = connection.execute(_SELECT).fetchall()
+                connection.executemany(_COUNT, [item for row in rows for item in _counter_rows(_from_row(row))])
+
+    def add(self, record, html=None):
+        """保存一条转换记录并累加统计计数，返回时已提交
+
+        记录中的 file_size、output_size（字节）和 elapsed（秒）计入统计。
+
+        Args:
+            record (dict): 转换记录
+            html (str): 转换结果，不为 None 时一起保存，按 converted_filename 登记
+        """
+        output = None if html is None else (record['id'], record['converted_filename'], html)
+        row = (_to_row(record), _counter_rows(record), output)
+        with self._pending_lock:
+            self._pending.append(row)
+
+        with self._write_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                # 已由其他线程一起写入
+                return
+            connection = self._connect()
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                self._apply_touches(connection)
+                connection.executemany(_INSERT, [record_row for record_row, _, _ in rows])
+                connection.executemany(_COUNT, [item for _, counter_rows, _ in rows for item in counter_rows])
+                for _, _, output in rows:
+                    if output is not None:
+                        self._store_output(connection, *output)
+                connection.execute('COMMIT')
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                # 其他线程的记录留给下一次写入
+                with self._pending_lock:
+                    self._pending[:0] = rows
+                raise
+
+    def get(self, conversion_id):
+        """按ID查找记录，不存在时返回 None"""
+        row = self._connect().execute(f'{_SELECT} WHERE id = ?', (conversion_id,)).fetchone()
+        return _from_row(row) if row else None
+
+    def __contains__(self, conversion_id):
+        return self._connect().execute('SELECT 1 FROM conversions WHERE id = ?', (conversion_id,)).fetchone() is not None
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM conversions').fetchone()[0]
+
+    def recent(self, limit=50):
+        """最近的记录，按时间从早到晚排列"""
+        rows = self._connect().execute(f'{_SELECT} ORDER BY timestamp DESC LIMIT ?', (limit,)).fetchall()
+        return [_from_row(row) for row in reversed(rows)]
+
+    def records(self):
+        """按时间顺序逐条读取所有记录"""
+        for row in self._connect().execute(f'{_SELECT} ORDER BY timestamp'):
+            yield _from_row(row)
+
+    def stats(self):
+        """统计信息，只读取计数表"""
+        totals = {'count': 0, 'bytes_in': 0, 'bytes_out': 0, 'elapsed': 0.0}
+        style_stats = {}
+        format_stats = {}
+        rows = self._connect().execute('SELECT kind, key, count, bytes_in, bytes_out, elapsed FROM counters')
+        for kind, key, count, bytes_in, bytes_out, elapsed in rows:
+            if kind == 'total':
+                totals = {'count': count, 'bytes_in': bytes_in, 'bytes_out': bytes_out, 'elapsed': elapsed}
+            elif kind == 'style':
+                style_stats[key] = count
+            elif kind == 'format':
+                format_stats[key] = count
+
+        return {
+            'total_conversions': totals['count'],
+            'style_stats': style_stats,
+            'format_stats': format_stats,
+            'bytes_in': totals['bytes_in'],
+            'bytes_out': totals['bytes_out'],
+            'average_elapsed_ms': totals['elapsed'] * 1000 / totals['count'] if totals['count'] else 0.0,
+        }
+
+    def delete_before(self, timestamp, limit=None):
+        """删除早于指定时间（ISO格式）的记录和保存的转换结果，返回被删除的记录
+
+        Args:
+            timestamp (str): ISO格式时间
+            limit (int): 最多删除的记录数（从最早的开始），为 None 时全部删除
+        """
+        with self._transaction() as connection:
+            rows = connection.execute(
+                f'{_SELECT} WHERE timestamp < ? ORDER BY timestamp LIMIT ?',
+                (timestamp, -1 if limit is None else limit)
+            ).fetchall()
+            ids = [(row[0],) for row in rows]
+            connection.executemany('DELETE FROM conversions WHERE id = ?', ids)
+            self._remove_outputs(connection, ids)
+        return [_from_row(row) for row in rows]
+
+    def _remove_outputs(self, connection, ids):
+        """在当前事务中删除保存的结果并扣减总大小，返回 (id, filename) 列表"""
+        removed = []
+        freed = 0
+        for (conversion_id,) in ids:
+            row = connection.execute('SELECT filename, size FROM outputs WHERE id = ?', (conversion_id,)).fetchone()
+            if row is not None:
+                removed.append((conversion_id, row[0]))
+                freed += row[1]
+        if removed:
+            removed_ids = [(conversion_id,) for conversion_id, _ in removed]
+            connection.executemany('DELETE FROM outputs WHERE id = ?', removed_ids)
+            connection.executemany('DELETE FROM results WHERE id = ?', removed_ids)
+            connection.execute(_STORED, (-len(removed), -freed))
+        return removed
+
+    def _store_output(self, connection, conversion_id, filename, html):
+        """在当前事务中保存转换结果并登记大小（同一ID再次保存时替换）"""
+        self._remove_outputs(connection, [(conversion_id,)])
+        size = len(html.encode('utf-8'))
+        connection.execute('INSERT INTO results (id, html) VALUES (?, ?)', (conversion_id, html))
+        connection.execute(
+            'INSERT INTO outputs (id, filename, size, accessed) VALUES (?, ?, ?, ?)',
+            (conversion_id, filename, size, time.time())
+        )
+        connection.execute(_STORED, (1, size))
+
+    def output(self, conversion_id):
+        """保存的转换结果，不存在（未保存、已过期或已淘汰）时返回 None"""
+        row = self._connect().execute('SELECT html FROM results WHERE id = ?', (conversion_id,)).fetchone()
+        return row[0] if row else None
+
+    def has_output(self, conversion_id):
+        """转换结果是否仍然保存着"""
+        return self._connect().execute('SELECT 1 FROM outputs WHERE id = ?', (conversion_id,)).fetchone() is not None
+
+    def touch_output(self, conversion_id):
+        """记录转换结果被访问（预览或下载），用于按最近访问时间淘汰
+
+        访问时间先记在内存中，距上次写入超过 TOUCH_INTERVAL 秒时才一起写入数据库。
+        """
+        with self._touch_lock:
+            self._touched[conversion_id] = time.time()
+            due = time.monotonic() - self._touches_flushed >= TOUCH_INTERVAL
+        if due:
+            self.flush_touches()
+
+    def _apply_touches(self, connection):
+        """在当前事务中写入积累的访问时间"""
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._touches_flushed = time.monotonic()
+        if touched:
+            connection.executemany(
+                'UPDATE outputs SET accessed = ? WHERE id = ?',
+                [(accessed, conversion_id) for conversion_id, accessed in touched.items()]
+            )
+
+    def flush_touches(self):
+        """把积累的访问时间写入数据库"""
+        with self._touch_lock:
+            if not self._touched:
+                return
+        with self._transaction() as connection:
+            self._apply_touches(connection)
+
+    def output_bytes(self):
+        """保存的转换结果总大小（字节）"""
+        row = self._connect().execute("SELECT bytes_out FROM counters WHERE kind = 'storage' AND key = 'outputs'").fetchone()
+        return row[0] if row else 0
+
+    def evict_outputs(self, max_bytes, limit=100):
+        """总大小超出上限时删除最久没有访问的转换结果，一次最多 limit 个
+
+        Returns:
+            list: 被删除的 (id, filename)，由调用方删除缓存和旧版本保存的结果文件；为空表示已不超出上限
+        """
+        with self._transaction() as connection:
+            self._apply_touches(connection)
+            row = connection.execute("SELECT bytes_out FROM counters WHERE kind = 'storage' AND key = 'outputs'").fetchone()
+            excess = (row[0] if row else 0) - max_bytes
+            if excess <= 0:
+                return []
+            ids = []
+            for conversion_id, size in connection.execute(
+                    'SELECT id, size FROM outputs ORDER BY accessed LIMIT ?', (limit,)).fetchall():
+                ids.append((conversion_id,))
+                excess -= size
+                if excess <= 0:
+                    break
+            return self._remove_outputs(connection, ids)
+
+    def claim(self, name, interval):
+        """多个进程共用的定时任务：到期时只有一个调用者得到 True，并把下次执行推迟 interval 秒"""
+        now = time.time()
+        return self._connect().execute(_CLAIM, (name, now + interval, now)).rowcount == 1
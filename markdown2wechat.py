@@ -19,6 +19,7 @@ from bs4 import BeautifulSoup
 import argparse
 import sys
 from pathlib import Path
+from text_decoder import read_text
 from wechat_styles import WeChatStyleTemplates
 
 
@@ -128,9 +129,8 @@ class MarkdownToWeChatConverter:
     def convert_file(self, input_file, output_file=None, title="", subtitle=""):
         """转换Markdown文件"""
         try:
-            # 读取Markdown文件
-            with open(input_file, 'r', encoding='utf-8') as f:
-                markdown_content = f.read()
+            # 读取Markdown文件（自动识别UTF-8、GBK等编码）
+            markdown_content = read_text(input_file)
             
             # 转换
             html_content = self.convert_markdown_to_html(markdown_content)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中间结果缓存
+
+两步转换中，Word、RST、RTF、HTML等源格式转换为Markdown（或直接转换为HTML片段）是耗时的一步，
+而切换文章风格、修改标题只影响之后的渲染。中间结果按缓存键保存，
+缓存键由源文件内容哈希、源格式、转换器版本和影响中间结果的选项组成：
+源文件或转换方式变化时缓存键随之变化，不需要主动失效。
+命中时更新文件的修改时间，prune 按修改时间删除过期或超出总大小的结果。
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+# 计算源文件哈希时每次读取的字节数
+_HASH_CHUNK = 1024 * 1024
+
+# 中间结果类型对应的扩展名
+INTERMEDIATE_SUFFIXES = {
+    'markdown': '.md',
+    'html': '.html',
+}
+
+
+def source_digest(source):
+    """源文件的内容哈希
+
+    Args:
+        source: 文件路径，或以二进制方式打开、可定位的文件对象（从当前位置读起，读取后恢复原位置）
+    """
+    digest = hashlib.sha256()
+    if hasattr(source, 'read'):
+        position = source.tell()
+        for chunk in iter(lambda: source.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+        source.seek(position)
+    else:
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(digest, *parts):
+    """由源文件哈希和转换参数（格式、转换器版本、选项）生成缓存键"""
+    key = hashlib.sha256(':'.join(str(part) for part in parts).encode('utf-8'))
+    key.update(digest.encode('ascii'))
+    return key.hexdigest()
+
+
+class MarkdownCache:
+    """按缓存键保存中间结果的目录
+
+    文件保存为 <键前两位>/<键><扩展名>，写入是原子的，多个进程可以共用同一个目录。
+    """
+
+    def __init__(self, root):
+        """初始化
+
+        Args:
+            root (str): 缓存目录
+        """
+        self.root = Path(root)
+
+    def path(self, key, kind):
+        """中间结果文件路径"""
+        return self.root / key[:2] / f'{key}{INTERMEDIATE_SUFFIXES[kind]}'
+
+    def find(self, key):
+        """查找中间结果，返回 (类型, 内容)，不存在时返回 None"""
+        if len(key) != 64 or not all(char in '0123456789abcdef' for char in key):
+            return None
+        for kind in INTERMEDIATE_SUFFIXES:
+            path = self.path(key, kind)
+            try:
+                content = path.read_text(encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            try:
+                os.utime(path)
+            except OSError:
+                # 刚好被 prune 删除
+                pass
+            return kind, content
+        return None
+
+    def put(self, key, kind, content):
+        """保存中间结果"""
+        path = self.path(key, kind)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def prune(self, max_age=None, max_bytes=None):
+        """删除超过 max_age 秒没有使用的结果，总大小仍超过 max_bytes 时从最久没有使用的开始删除
+
+        Returns:
+            tuple: (删除的文件数, 释放的字节数)
+        """
+        entries = []
+        for path in self.root.glob('*/*'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        cutoff = time.time() - max_age if max_age is not None else None
+        total = sum(size for _, size, _ in entries)
+        removed = freed = 0
+        for mtime, size, path in entries:
+            if (cutoff is None or mtime >= cutoff) and (max_bytes is None or total <= max_bytes):
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
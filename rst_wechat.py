@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RST直接转换为微信公众号HTML
+
+提供一个docutils写出器，直接把RST文档树写成结构简洁的HTML片段，
+交给转换器共用的微信公众号后处理阶段，不再经过 RST → HTML → Markdown → HTML 的往返转换。
+
+RSTPublisher 缓存docutils的设置和读取器/解析器/写出器，
+重复转换时只需解析和写出，不必每次重新构建这些对象。
+"""
+
+import copy
+import re
+import threading
+
+import docutils.core
+import docutils.io
+from docutils import nodes, parsers, readers
+from docutils.writers import html4css1
+
+# docutils生成的class/id属性以及多余id对应的空span，微信公众号编辑器用不到
+_ATTRIBUTE_PATTERN = re.compile(r'\s(?:class|id)="[^"]*"')
+_EXTRA_ID_PATTERN = re.compile(r'<span id="[^"]*"></span>')
+
+# 安全设置：转换的文档可能来自网站上传，禁止 include 等指令读取服务器上的文件，
+# 也禁止 raw 指令把任意HTML原样写入输出
+SAFE_SETTINGS = {
+    'file_insertion_enabled': False,
+    'raw_enabled': False,
+}
+
+# 转换设置
+SETTINGS_OVERRIDES = {
+    **SAFE_SETTINGS,
+    'output_encoding': 'unicode',
+    'initial_header_level': 2,
+    'syntax_highlight': 'none',
+    'toc_backlinks': 'none',
+    'footnote_backlinks': False,
+    'embed_stylesheet': False,
+    'stylesheet_path': '',
+}
+
+
+class WeChatHTMLTranslator(html4css1.HTMLTranslator):
+    """生成微信公众号适用HTML的翻译器
+
+    与docutils默认输出相比：
+    - 不输出 class/id 属性和章节的 div 包装，样式由后处理阶段统一添加
+    - 文档标题为 h1，章节标题从 h2 开始，行内代码使用 <code>
+    - 提示、警告等指令输出为引用块，标题加粗
+    """
+
+    def starttag(self, node, tagname, suffix='\n', empty=False, **attributes):
+        tag = super().starttag(node, tagname, suffix, empty, **attributes)
+        return _EXTRA_ID_PATTERN.sub('', _ATTRIBUTE_PATTERN.sub('', tag))
+
+    def visit_section(self, node):
+        self.section_level += 1
+
+    def depart_section(self, node):
+        self.section_level -= 1
+
+    def visit_literal(self, node):
+        # 行内代码使用 <code>，与Markdown生成的HTML保持一致
+        self.body.append('<code>' + self.encode(node.astext()) + '</code>')
+        raise nodes.SkipNode
+
+    def visit_admonition(self, node):
+        self.body.append('<blockquote>\n')
+
+    def depart_admonition(self, node=None):
+        self.body.append('</blockquote>\n')
+
+    def visit_title(self, node):
+        if isinstance(node.parent, nodes.Admonition):
+            self.body.append('<p><strong>')
+            self.context.append('</strong></p>\n')
+        else:
+            super().visit_title(node)
+
+
+class WeChatHTMLWriter(html4css1.Writer):
+    """使用 WeChatHTMLTranslator 的docutils写出器"""
+
+    def __init__(self):
+        super().__init__()
+        self.translator_class = WeChatHTMLTranslator
+
+
+def parts_to_html(parts):
+    """从写出器的各部分中取出HTML片段：标题、副标题、文档信息和正文"""
+    return parts['body_pre_docinfo'] + parts['docinfo'] + parts['body']
+
+
+class RSTPublisher:
+    """可复用的docutils发布器
+
+    与 docutils.core.publish_parts 的结果相同，但设置只在第一次使用时生成一次
+    （需要读取配置文件、构建选项解析器，是小文档转换的主要开销），
+    读取器、解析器和写出器每个线程各创建一份并重复使用，可在多线程中共用同一个实例。
+    """
+
+    def __init__(self, writer_class=WeChatHTMLWriter, settings_overrides=None):
+        """初始化发布器
+
+        Args:
+            writer_class: docutils写出器类
+            settings_overrides (dict): 转换设置，默认为 SETTINGS_OVERRIDES
+        """
+        self.writer_class = writer_class
+        self.settings_overrides = SETTINGS_OVERRIDES if settings_overrides is None else settings_overrides
+        self._settings = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _publisher(self):
+        """获取当前线程的发布器，第一次使用时创建"""
+        publisher = getattr(self._local, 'publisher', None)
+        if publisher is None:
+            parser = parsers.get_parser_class('restructuredtext')()
+            reader = readers.get_reader_class('standalone')(parser)
+            publisher = docutils.core.Publisher(
+                reader, parser, self.writer_class(),
+                source_class=docutils.io.StringInput,
+                destination_class=docutils.io.StringOutput,
+            )
+            with self._lock:
+                if self._settings is None:
+                    publisher.process_programmatic_settings(None, self.settings_overrides, None)
+                    self._settings = publisher.settings
+            self._local.publisher = publisher
+        return publisher
+
+    def publish_parts(self, rst_content):
+        """将RST文本转换为写出器的各个部分"""
+        publisher = self._publisher()
+        # 转换过程会修改设置（源路径、输出路径等），每次使用一份副本
+        publisher.settings = copy.copy(self._settings)
+        publisher.set_source(rst_content, None)
+        publisher.set_destination(None, None)
+        try:
+            publisher.publish()
+            return dict(publisher.writer.parts)
+        finally:
+            # 不保留上一篇文档的引用
+            publisher.document = None
+            publisher.source = None
+
+
+# 模块共用的发布器
+_default_publisher = RSTPublisher()
+
+
+def publish_wechat_html(rst_content, publisher=None):
+    """将RST文本直接转换为HTML片段"""
+    parts = (publisher or _default_publisher).publish_parts(rst_content)
+    return parts_to_html(parts)
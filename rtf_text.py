@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RTF文字提取
+
+按块读取RTF文件并逐个处理控制字，每遇到段落结束就产出一段文字，不需要把整个文件读入内存：
+- 图片（\\pict）、嵌入对象、字体表、样式表等不输出内容的组只记录括号层级，
+  组内的十六进制数据直接跳到下一个 \\ { } 处，不逐字处理也不保存
+- \\binN 后面的N字节原始数据直接跳过，不会被当作控制字或括号
+- \\'hh 按文档的代码页（\\ansicpgN，中文文档通常是936）解码，\\uN 按Unicode解码
+- 一次最多保留一个数据块和当前段落，内存占用与嵌入对象的大小无关
+"""
+
+import codecs
+import re
+
+# 每次读取的字节数
+CHUNK_BYTES = 64 * 1024
+
+# 没有 \ansicpg 时使用的代码页
+DEFAULT_CODEPAGE = 'cp1252'
+
+# 内容不输出的组（图片、嵌入对象、字体表、文档信息等）
+SKIPPED_DESTINATIONS = frozenset((
+    'author', 'buptim', 'colortbl', 'comment', 'company', 'creatim', 'datafield', 'datastore',
+    'do', 'doccomm', 'fldinst', 'fonttbl', 'footer', 'footerf', 'footerl', 'footerr', 'footnote',
+    'ftncn', 'ftnsep', 'ftnsepc', 'generator', 'header', 'headerf', 'headerl', 'headerr', 'info',
+    'keywords', 'latentstyles', 'levelnumbers', 'leveltext', 'listoverridetable', 'listtable',
+    'nonshppict', 'objdata', 'object', 'operator', 'pict', 'pn', 'pntext', 'printim', 'private',
+    'revtbl', 'revtim', 'rsidtbl', 'shpinst', 'stylesheet', 'subject', 'template', 'themedata',
+    'title', 'xmlnstbl',
+))
+
+# 结束当前段落的控制字
+PARAGRAPH_WORDS = frozenset(('par', 'sect', 'page', 'line', 'row'))
+
+# 输出为字符的控制字和控制符号
+SPECIAL_CHARS = {
+    'tab': '\t',
+    'cell': '|',
+    'nestcell': '|',
+    'emdash': '\u2014',
+    'endash': '\u2013',
+    'emspace': '\u2003',
+    'enspace': '\u2002',
+    'qmspace': '\u2005',
+    'bullet': '\u2022',
+    'lquote': '\u2018',
+    'rquote': '\u2019',
+    'ldblquote': '\u201c',
+    'rdblquote': '\u201d',
+    '~': '\xa0',
+    '_': '\u2011',
+    '{': '{',
+    '}': '}',
+    '\\': '\\',
+}
+
+# 控制字（\word 或 \wordN，后面的一个空格属于控制字）、\'hh、控制符号、括号、换行、文字
+_TOKEN = re.compile(
+    rb"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-fA-F]{2})|\\(.)|([{}])|([\r\n]+)|([^\\{}\r\n]+)",
+    re.S
+)
+
+# 跳过的组中只需要找下一个控制字或括号
+_SKIP_TO = re.compile(rb'[\\{}]')
+
+# 控制字最长的字节数，从数据块末尾这么多字节内开始的控制字留到下一块再处理
+_MAX_CONTROL_BYTES = 48
+
+
+def _codepage(number):
+    """\\ansicpgN 对应的Python编码名，不支持时使用默认代码页"""
+    try:
+        return codecs.lookup(f'cp{number}').name
+    except LookupError:
+        return DEFAULT_CODEPAGE
+
+
+class RTFTextReader:
+    """RTF文字提取的解析状态"""
+
+    def __init__(self):
+        self.codepage = DEFAULT_CODEPAGE
+        self.skipping = False      # 当前组的内容是否不输出
+        self.uc = 1                # \uN 之后需要跳过的替代字符数
+        self.stack = []            # 外层组的 (skipping, uc)
+        self.fallback = 0          # 还需要跳过的替代字符数
+        self.raw = bytearray()     # 尚未解码的文字字节
+        self.parts = []            # 当前段落已解码的文字
+        self.binary = 0            # \binN 之后还需要跳过的原始字节数
+        self.high_surrogate = None # 等待与下一个 \uN 组成一个字符的UTF-16高位代理
+
+    def flush_bytes(self):
+        """按代码页解码累积的文字字节"""
+        if self.raw:
+            self.parts.append(self.raw.decode(self.codepage, errors='replace'))
+            self.raw.clear()
+
+    def lone_surrogate(self):
+        """没有配对的高位代理输出为替换字符"""
+        if self.high_surrogate is not None:
+            self.parts.append('\ufffd')
+            self.high_surrogate = None
+
+    def unicode_char(self, code):
+        """\\uN 的字符：UTF-16代理对（emoji等）合并为一个字符，不成对的代理输出为替换字符"""
+        if 0xD800 <= code < 0xDC00:
+            self.lone_surrogate()
+            self.high_surrogate = code
+        elif 0xDC00 <= code < 0xE000:
+            if self.high_surrogate is None:
+                self.parts.append('\ufffd')
+            else:
+                self.parts.append(chr(0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code - 0xDC00)))
+                self.high_surrogate = None
+        else:
+            self.lone_surrogate()
+            self.parts.append(chr(code))
+
+    def end_paragraph(self):
+        """结束当前段落并返回其文字"""
+        self.flush_bytes()
+        self.lone_surrogate()
+        text = ''.join(self.parts)
+        self.parts.clear()
+        return text
+
+    def add_bytes(self, data):
+        """添加文字字节，先去掉 \\uN 之后的替代字符"""
+        if self.fallback:
+            skipped = min(self.fallback, len(data))
+            self.fallback -= skipped
+            data = data[skipped:]
+        if data and not self.skipping:
+            self.lone_surrogate()
+            self.raw.extend(data)
+
+    def control_word(self, word, param):
+        """处理控制字，结束段落时返回 True"""
+        self.fallback = 0
+        if word == 'bin':
+            self.binary = max(param or 0, 0)
+        elif self.skipping:
+            pass
+        elif word in SKIPPED_DESTINATIONS:
+            self.skipping = True
+        elif word in PARAGRAPH_WORDS:
+            return True
+        elif word in SPECIAL_CHARS:
+            self.flush_bytes()
+            self.lone_surrogate()
+            self.parts.append(SPECIAL_CHARS[word])
+        elif word == 'u' and param is not None:
+            self.flush_bytes()
+            self.unicode_char(param + 65536 if param < 0 else param)
+            self.fallback = self.uc
+        elif word == 'uc' and param is not None:
+            self.uc = param
+        elif word == 'ansicpg' and param:
+            self.flush_bytes()
+            self.codepage = _codepage(param)
+        return False
+
+    def control_symbol(self, symbol):
+        """处理控制符号，结束段落时返回 True"""
+        if symbol == '*':
+            # 可忽略的目标：不认识的一律不输出
+            self.skipping = True
+        elif self.skipping:
+            pass
+        elif symbol in '\r\n':
+            return True
+        elif symbol in SPECIAL_CHARS:
+            self.flush_bytes()
+            self.lone_surrogate()
+            self.parts.append(SPECIAL_CHARS[symbol])
+        return False
+
+    def feed(self, buffer, final):
+        """处理一块数据
+
+        Returns:
+            tuple: (本块中结束的段落列表, 未处理完、需要与下一块拼接的剩余数据)
+        """
+        paragraphs = []
+        position = 0
+        size = len(buffer)
+
+        while position < size:
+            if self.binary:
+                skipped = min(self.binary, size - position)
+                self.binary -= skipped
+                position += skipped
+                continue
+
+            if self.skipping:
+                # 跳过的组中的文字（如图片的十六进制数据）不需要逐字处理
+                found = _SKIP_TO.search(buffer, position)
+                if found is None:
+                    break
+                position = found.start()
+
+            match = _TOKEN.match(buffer, position)
+            if match is None:
+                # 数据块末尾只有一个反斜杠
+                return paragraphs, buffer[position:]
+
+            word, param, hex_code, symbol, brace, newline, text = match.groups()
+            if not final and text is None and size - position < _MAX_CONTROL_BYTES:
+                # 数据块末尾的控制字可能被截断（如 \'4 或缺少参数的 \u12），与下一块拼接后再处理
+                return paragraphs, buffer[position:]
+            position = match.end()
+
+            if text is not None:
+                self.add_bytes(text)
+            elif hex_code is not None:
+                self.add_bytes(bytes((int(hex_code, 16),)))
+            elif word is not None:
+                if self.control_word(word.decode('ascii'), int(param) if param else None):
+                    paragraphs.append(self.end_paragraph())
+            elif symbol is not None:
+                if self.control_symbol(symbol.decode('latin-1')):
+                    paragraphs.append(self.end_paragraph())
+            elif brace == b'{':
+                self.flush_bytes()
+                self.stack.append((self.skipping, self.uc))
+            elif brace == b'}':
+                self.flush_bytes()
+                if self.stack:
+                    self.skipping, self.uc = self.stack.pop()
+                self.fallback = 0
+
+        return paragraphs, b''
+
+
+def iter_rtf_lines(source, chunk_size=CHUNK_BYTES):
+    """逐段提取RTF中的文字，生成文本行
+
+    Args:
+        source: RTF文件路径，或以二进制方式打开的文件对象
+        chunk_size (int): 每次读取的字节数
+    """
+    if not hasattr(source, 'read'):
+        with open(source, 'rb') as f:
+            yield from iter_rtf_lines(f, chunk_size)
+        return
+
+    reader = RTFTextReader()
+    pending = b''
+    while True:
+        chunk = source.read(chunk_size)
+        paragraphs, pending = reader.feed(pending + chunk, final=not chunk)
+        yield from paragraphs
+        if not chunk:
+            break
+
+    last = reader.end_paragraph()
+    if last:
+        yield last
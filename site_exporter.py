@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态站点导出
+将文章目录导出为可直接部署的静态站点
+
+站点结构：
+    index.html                    文章索引（主风格）
+    articles/<路径>.html          文章页面（主风格）
+    styles/<风格>/index.html      各风格的文章索引
+    styles/<风格>/<路径>.html     文章的其他风格版本
+
+增量导出：只重新转换源文件或风格指纹发生变化的文章；
+索引页只在列表数据真正变化时才重写。
+导出状态中记录每个风格页面的路径，主风格改变使页面路径变化时重新生成，并删除旧路径上的页面。
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from batch_converter import BatchConverter
+from fs_utils import atomic_write_text
+from universal_converter import UniversalToWeChatConverter
+from wechat_styles import WeChatStyleTemplates
+
+# 导出格式版本，页面结构变化时递增，使所有页面重新生成
+EXPORT_VERSION = '1'
+
+# 导出状态文件（保存在站点目录中）
+SITE_STATE_FILE = '.site_state.json'
+
+
+def theme_fingerprint(style):
+    """风格指纹：风格模板或导出格式变化时随之变化"""
+    digest = hashlib.sha256()
+    digest.update(f'{EXPORT_VERSION}:{style}:'.encode('utf-8'))
+    digest.update(WeChatStyleTemplates.get_style_template(style).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """源文件内容指纹"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_title(html_content, default):
+    """从HTML片段中提取第一个标题作为文章标题"""
+    match = re.search(r'<h[1-6][^>]*>(.*?)</h[1-6]>', html_content, re.DOTALL)
+    if not match:
+        return default
+    title = html.unescape(re.sub(r'<[^>]+>', '', match.group(1))).strip()
+    return title or default
+
+
+# 子进程内按风格缓存的转换器
+_worker_converters = {}
+
+
+def export_one(job):
+    """导出单篇文章的各风格页面，可在子进程中执行
+
+    源文件只转换一次HTML片段，再分别渲染需要更新的各个风格。
+
+    Args:
+        job (dict): 包含 id, source, pages（风格 -> 输出路径）
+
+    Returns:
+        dict: 导出结果
+    """
+    result = {'id': job['id']}
+
+    try:
+        converters = {}
+        for style in job['pages']:
+            if style not in _worker_converters:
+                _worker_converters[style] = UniversalToWeChatConverter(style=style)
+            converters[style] = _worker_converters[style]
+
+        first = next(iter(converters.values()))
+        html_content = first.file_to_html(job['source'])
+        result['title'] = extract_title(html_content, Path(job['id']).stem)
+
+        for style, output in job['pages'].items():
+            wechat_html = converters[style].html_to_wechat_html(html_content)
+            atomic_write_text(output, wechat_html)
+
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+
+    return result
+
+
+class SiteExporter:
+    """静态站点导出器"""
+
+    def __init__(self, source_dir, output_dir, styles=None, workers=1):
+        """初始化导出器
+
+        Args:
+            source_dir (str): 文章源目录
+            output_dir (str): 站点输出目录
+            styles (list): 导出的风格，第一个为主风格
+            workers (int): 并行转换的进程数
+        """
+        self.source_dir = Path(source_dir).resolve()
+        self.output_dir = Path(output_dir).resolve()
+        self.styles = list(styles or ['default'])
+        self.primary_style = self.styles[0]
+        self.workers = max(1, workers)
+
+        self.batch = BatchConverter(self.source_dir, self.output_dir)
+
+    def page_path(self, rel_path, style):
+        """文章在指定风格下的页面路径"""
+        page = Path(rel_path).with_suffix('.html')
+        if style == self.primary_style:
+            return self.output_dir / 'articles' / page
+        return self.output_dir / 'styles' / style / page
+
+    def relative(self, path):
+        """站点目录中的相对路径，保存在导出状态中"""
+        return Path(path).relative_to(self.output_dir).as_posix()
+
+    def remove_page(self, rel_page):
+        """删除站点目录中的旧页面，并清理因此变空的目录"""
+        page = self.output_dir / rel_page
+        if page.exists():
+            page.unlink()
+
+        directory = page.parent
+        while directory != self.output_dir and directory.is_dir() and not any(directory.iterdir()):
+            directory.rmdir()
+            directory = directory.parent
+
+    def index_path(self, style):
+        """指定风格的索引页路径"""
+        if style == self.primary_style:
+            return self.output_dir / 'index.html'
+        return self.output_dir / 'styles' / style / 'index.html'
+
+    def load_state(self):
+        """读取上次导出状态"""
+        try:
+            with open(self.output_dir / SITE_STATE_FILE, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('articles', {})
+        state.setdefault('indexes', {})
+        state.setdefault('index_pages', {})
+        return state
+
+    def save_state(self, state):
+        """保存导出状态"""
+        state['timestamp'] = datetime.now().isoformat()
+        atomic_write_text(self.output_dir / SITE_STATE_FILE, json.dumps(state, ensure_ascii=False, indent=2))
+
+    def source_changed(self, rel_path, record):
+        """检查源文件相对上次导出是否变化
+
+        大小和修改时间都未变化时直接认为未变化，否则再比较内容指纹，
+        这样只是被touch过的文件不会被重新转换。
+        """
+        stat = (self.source_dir / rel_path).stat()
+        if record.get('size') == stat.st_size and record.get('mtime_ns') == stat.st_mtime_ns:
+            return False
+
+        fingerprint = file_fingerprint(self.source_dir / rel_path)
+        changed = fingerprint != record.get('fingerprint')
+        record.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, fingerprint=fingerprint)
+        return changed
+
+    def render_index(self, style, listing):
+        """渲染索引页"""
+        items = []
+        for entry in listing:
+            href = os.path.relpath(self.page_path(entry['id'], style), self.index_path(style).parent)
+            items.append(f'<li><a href="{html.escape(Path(href).as_posix())}">{html.escape(entry["title"])}</a></li>')
+
+        other_styles = []
+        for other in self.styles:
+            if other != style:
+                href = os.path.relpath(self.index_path(other), self.index_path(style).parent)
+                description = WeChatStyleTemplates.get_style_description(other)
+                other_styles.append(f'<a href="{html.escape(Path(href).as_posix())}">{html.escape(description)}</a>')
+
+        converter = UniversalToWeChatConverter(style=style)
+        body = '<ul>\n' + '\n'.join(items) + '\n</ul>'
+        if other_styles:
+            body += '\n<p>其他风格：' + ' | '.join(other_styles) + '</p>'
+
+        return converter.html_to_wechat_html(body, title='文章索引', subtitle=f'共 {len(listing)} 篇文章')
+
+    def export(self, force=False):
+        """执行增量导出
+
+        Args:
+            force (bool): 忽略导出状态，重新生成所有页面
+
+        Returns:
+            dict: 导出汇总
+        """
+        state = {'articles': {}, 'indexes': {}, 'index_pages': {}} if force else self.load_state()
+        articles = state['articles']
+        fingerprints = {style: theme_fingerprint(style) for style in self.styles}
+
+        sources = self.batch.collect_sources()
+        # 本次导出的所有页面，旧页面路径与其中之一相同时会被覆盖，不能删除
+        targets = {
+            self.relative(self.page_path(rel_path, style)) for rel_path in sources for style in self.styles
+        } | {self.relative(self.index_path(style)) for style in self.styles}
+
+        # 删除已不存在的文章及其页面
+        removed = []
+        for rel_path in sorted(set(articles) - set(sources)):
+            record = articles.pop(rel_path)
+            for rel_page in record.get('pages', {}).values():
+                if rel_page not in targets:
+                    self.remove_page(rel_page)
+            removed.append(rel_path)
+
+        # 找出源文件、风格指纹或页面路径变化的文章
+        jobs = []
+        for rel_path in sources:
+            record = articles.setdefault(rel_path, {})
+            themes = record.setdefault('themes', {})
+            recorded_pages = record.setdefault('pages', {})
+            source_changed = self.source_changed(rel_path, record)
+
+            pages = {}
+            for style in self.styles:
+                page = self.page_path(rel_path, style)
+                rel_page = self.relative(page)
+                if (source_changed or themes.get(style) != fingerprints[style]
+                        or recorded_pages.get(style) != rel_page or not page.exists()):
+                    pages[style] = str(page)
+
+            # 不再导出的风格或路径已变化的页面，删除旧文件
+            for style, rel_page in list(recorded_pages.items()):
+                if style not in self.styles or rel_page != self.relative(self.page_path(rel_path, style)):
+                    if rel_page not in targets:
+                        self.remove_page(rel_page)
+                    del recorded_pages[style]
+                    themes.pop(style, None)
+            for style in list(themes):
+                if style not in self.styles:
+                    del themes[style]
+
+            if pages:
+                jobs.append({'id': rel_path, 'source': str(self.source_dir / rel_path), 'pages': pages})
+
+        # 并行转换
+        results = []
+        if self.workers == 1 or len(jobs) <= 1:
+            results = [export_one(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(export_one, job) for job in jobs]
+                results = [future.result() for future in as_completed(futures)]
+
+        pages_by_id = {job['id']: job['pages'] for job in jobs}
+        failed = []
+        for result in results:
+            record = articles[result['id']]
+            if result['status'] == 'ok':
+                record['title'] = result['title']
+                for style, page in pages_by_id[result['id']].items():
+                    record['themes'][style] = fingerprints[style]
+                    record['pages'][style] = self.relative(page)
+            else:
+                # 记录为未导出，下次重新转换
+                record.pop('fingerprint', None)
+                record.pop('size', None)
+                failed.append(result)
+
+        # 索引页：只有列表数据变化时才重写
+        listing = [
+            {'id': rel_path, 'title': articles[rel_path].get('title', Path(rel_path).stem)}
+            for rel_path in sources
+            if articles[rel_path].get('title') is not None
+        ]
+        indexes_written = []
+        for style, rel_page in list(state['index_pages'].items()):
+            if style not in self.styles or rel_page != self.relative(self.index_path(style)):
+                if rel_page not in targets:
+                    self.remove_page(rel_page)
+                del state['index_pages'][style]
+                state['indexes'].pop(style, None)
+
+        for style in self.styles:
+            digest = hashlib.sha256(json.dumps(
+                {'listing': listing, 'styles': self.styles, 'theme': fingerprints[style]},
+                ensure_ascii=False, sort_keys=True
+            ).encode('utf-8')).hexdigest()
+
+            index_path = self.index_path(style)
+            if state['indexes'].get(style) != digest or not index_path.exists():
+                atomic_write_text(index_path, self.render_index(style, listing))
+                state['indexes'][style] = digest
+                state['index_pages'][style] = self.relative(index_path)
+                indexes_written.append(str(index_path))
+
+        self.save_state(state)
+
+        return {
+            'rebuilt': sorted(result['id'] for result in results if result['status'] == 'ok'),
+            'failed': failed,
+            'removed': removed,
+            'indexes_written': indexes_written,
+            'total': len(sources),
+        }
+
+
+def main():
+    """主函数"""
+    available_styles = WeChatStyleTemplates.get_available_styles()
+
+    parser = argparse.ArgumentParser(description='将文章目录导出为静态站点')
+    parser.add_argument('input_dir', help='文章源目录')
+    parser.add_argument('-o', '--output-dir', default='site', help='站点输出目录（默认: site）')
+    parser.add_argument('--styles', nargs='+', choices=available_styles, default=['default'],
+                       help='导出的风格，第一个为主风格')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='并行转换的进程数')
+    parser.add_argument('--force', action='store_true', help='忽略导出状态，重新生成所有页面')
+
+    args = parser.parse_args()
+
+    if not Path(args.input_dir).is_dir():
+        parser.error(f"源目录不存在: {args.input_dir}")
+
+    exporter = SiteExporter(args.input_dir, args.output_dir, styles=args.styles, workers=args.workers)
+    summary = exporter.export(force=args.force)
+
+    print(f"🎉 导出完成: 共 {summary['total']} 篇文章，重新生成 {len(summary['rebuilt'])} 篇")
+    if summary['removed']:
+        print(f"🗑️  删除文章: {len(summary['removed'])} 篇")
+    if summary['indexes_written']:
+        print(f"📋 更新索引页: {len(summary['indexes_written'])} 个")
+    for result in summary['failed']:
+        print(f"❌ 导出失败: {result['id']} - {result['error']}")
+
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
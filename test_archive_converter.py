@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩包转换测试
+"""
+
+import io
+import json
+import multiprocessing
+import tarfile
+import zipfile
+
+import pytest
+from docx import Document
+
+from archive_converter import REPORT_NAME, ArchiveConverter, ArchiveError, ArchiveLimits, safe_member_name
+from universal_converter import UniversalToWeChatConverter
+
+
+def docx_bytes(text):
+    """生成只有一个标题的Word文档"""
+    doc = Document()
+    doc.add_heading(text, level=1)
+    output = io.BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return path
+
+
+def read_result(path):
+    """读取结果zip包，返回 (文件名 -> 内容, 转换报告)"""
+    with zipfile.ZipFile(path) as archive:
+        files = {name: archive.read(name).decode('utf-8') for name in archive.namelist()}
+    return files, json.loads(files.pop(REPORT_NAME))
+
+
+def test_safe_member_name():
+    """测试成员路径检查"""
+    assert safe_member_name('docs/./a.md') == 'docs/a.md'
+    assert safe_member_name('docs\\b.md') == 'docs/b.md'
+    for name in ('../a.md', 'docs/../../a.md', '/etc/a.md', 'C:/a.md', '.'):
+        assert safe_member_name(name) is None
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_zip_members_are_converted(tmp_path, workers):
+    """测试zip包中的各格式文件直接转换，不支持和不安全的文件跳过"""
+    source = make_zip(tmp_path / 'articles.zip', {
+        'a.md': '# 文章A\n\n内容A',
+        'sub/b.html': '<!DOCTYPE html><html><body><h2>文章B</h2></body></html>',
+        'sub/c.docx': docx_bytes('文章C'),
+        'broken.docx': b'\x00\x01not a word document',
+        'notes.bin': b'\x00\x01',
+        '.hidden.md': '# 隐藏',
+        '__MACOSX/._a.md': 'x',
+        '../escape.md': '# 逃逸',
+    })
+    output = tmp_path / 'result.zip'
+
+    report = UniversalToWeChatConverter().convert_archive(source, output, workers=workers)
+    files, saved = read_result(output)
+
+    assert saved == report
+    assert set(files) == {'a.html', 'sub/b.html', 'sub/c.html'}
+    assert '文章A' in files['a.html']
+    assert '文章B' in files['sub/b.html']
+    assert '文章C' in files['sub/c.html']
+    assert report['converted'] == 3
+    assert report['failed'] == 1
+    assert [item['source'] for item in report['results'] if item['status'] == 'failed'] == ['broken.docx']
+    assert {item['source']: item['reason'] for item in report['skipped']} == {
+        'notes.bin': '不支持的格式',
+        '.hidden.md': '隐藏文件',
+        '__MACOSX/._a.md': '隐藏文件',
+        '../escape.md': '不安全的路径',
+    }
+    assert not (tmp_path / 'escape.md').exists()
+
+
+def test_output_names_are_unique(tmp_path):
+    """测试同名不同扩展名的文件不会互相覆盖，转换进程可用 spawn 方式启动"""
+    source = make_zip(tmp_path / 'articles.zip', {
+        'a.md': '# Markdown版本',
+        'a.txt': '纯文本版本',
+        'A.html': '<p>HTML版本</p>',
+    })
+    output = tmp_path / 'result.zip'
+
+    converter = ArchiveConverter(UniversalToWeChatConverter(), workers=2, mp_context=multiprocessing.get_context('spawn'))
+    report = converter.convert(source, output)
+    files, _ = read_result(output)
+
+    assert {item['source']: item['output'] for item in report['results']} == {
+        'a.md': 'a.html', 'a.txt': 'a.txt.html', 'A.html': 'A.html.html',
+    }
+    assert 'Markdown版本' in files['a.html']
+    assert '纯文本版本' in files['a.txt.html']
+    assert 'HTML版本' in files['A.html.html']
+
+
+def test_tar_stream_is_converted(tmp_path):
+    """测试tar.gz包按流读取（不需要随机访问）"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for name, text in (('a.md', '# 文章A'), ('b.txt', '文章B')):
+            data = text.encode('utf-8')
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    class Unseekable(io.RawIOBase):
+        def __init__(self, data):
+            self.data = io.BytesIO(data)
+
+        def readable(self):
+            return True
+
+        def readinto(self, target):
+            chunk = self.data.read(len(target))
+            target[:len(chunk)] = chunk
+            return len(chunk)
+
+    converter = ArchiveConverter(UniversalToWeChatConverter())
+    output = io.BytesIO(b''.join(converter.iter_archive(Unseekable(buffer.getvalue()))))
+    files, report = read_result(output)
+
+    assert set(files) == {'a.html', 'b.html'}
+    assert report['converted'] == 2
+
+
+def test_archive_limits(tmp_path):
+    """测试压缩炸弹防护：压缩比、单个文件和总大小的上限"""
+    converter = UniversalToWeChatConverter()
+
+    bomb = make_zip(tmp_path / 'bomb.zip', {'bomb.md': '#' * 1024 * 1024, 'ok.md': '# 正常'})
+    report = converter.convert_archive(bomb, tmp_path / 'bomb_result.zip', limits=ArchiveLimits(max_ratio=100))
+    assert report['skipped'] == [{'source': 'bomb.md', 'reason': '压缩比异常'}]
+    assert report['converted'] == 1
+
+    large = make_zip(tmp_path / 'large.zip', {'large.md': '# 标题\n' + 'x' * 4096})
+    report = converter.convert_archive(large, tmp_path / 'large_result.zip', limits=ArchiveLimits(max_member_bytes=1024))
+    assert report['skipped'] == [{'source': 'large.md', 'reason': '文件过大'}]
+
+    many = make_zip(tmp_path / 'many.zip', {f'{i}.md': f'# {i}\n' + 'x' * 600 for i in range(4)})
+    with pytest.raises(ArchiveError):
+        converter.convert_archive(many, tmp_path / 'many_result.zip', limits=ArchiveLimits(max_total_bytes=2048))
+    with pytest.raises(ArchiveError):
+        converter.convert_archive(many, tmp_path / 'many_result.zip', limits=ArchiveLimits(max_members=3))
+
+
+def make_tar(path, members):
+    with tarfile.open(path, 'w:gz') as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_tar_limits_count_skipped_members(tmp_path):
+    """测试tar流中跳过的大文件也计入总大小，整个流的压缩比有上限"""
+    converter = UniversalToWeChatConverter()
+    bomb = make_tar(tmp_path / 'bomb.tar.gz', {'bomb.md': b'\0' * 5 * 1024 * 1024, 'ok.md': b'# ok'})
+    assert bomb.stat().st_size < 16 * 1024
+
+    limits = ArchiveLimits(max_member_bytes=1024, max_total_bytes=64 * 1024)
+    with pytest.raises(ArchiveError, match='解压后超过'):
+        converter.convert_archive(bomb, tmp_path / 'bomb_result.zip', limits=limits)
+
+    limits = ArchiveLimits(max_member_bytes=1024, max_ratio=100)
+    with pytest.raises(ArchiveError, match='压缩比'):
+        converter.convert_archive(bomb, tmp_path / 'bomb_result.zip', limits=limits)
+
+
+def test_invalid_archive(tmp_path):
+    """测试无效的压缩包"""
+    source = tmp_path / 'bad.zip'
+    source.write_bytes(b'not an archive at all')
+    with pytest.raises(ArchiveError):
+        UniversalToWeChatConverter().convert_archive(source, tmp_path / 'bad_result.zip')
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量转换器测试
+"""
+
+import io
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from batch_converter import (
+    BatchConverter, BatchJournal, ProgressReporter, assign_shards, load_job_manifest, merge_manifests,
+    parse_shard
+)
+from fs_utils import atomic_write_text
+
+
+def git(repo, *args):
+    """在测试仓库中执行git命令"""
+    subprocess.run(
+        ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+        cwd=repo, check=True, capture_output=True
+    )
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def test_git_incremental_conversion(tmp_path):
+    """测试基于git的增量转换"""
+    repo = tmp_path / 'articles'
+    output = tmp_path / 'site'
+    write(repo / 'a.md', '# A\n\n内容A')
+    write(repo / 'b.md', '# B\n\n内容B')
+    write(repo / 'sub' / 'c.txt', '# C')
+    write(repo / 'notes.bin', 'ignored')
+    git(repo, 'init', '-q')
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'init')
+
+    batch = BatchConverter(repo, output)
+    summary = batch.run(incremental=True)
+    assert summary['base_commit'] is None
+    assert len(summary['converted']) == 3
+    assert (output / 'sub' / 'c.html').exists()
+
+    # 修改、删除、重命名
+    write(repo / 'a.md', '# A\n\n新的内容A')
+    (repo / 'b.md').unlink()
+    (repo / 'sub' / 'c.txt').rename(repo / 'sub' / 'd.txt')
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'update')
+    write(repo / 'e.md', '# E 未提交的新文件')
+
+    summary = batch.run(incremental=True)
+    assert summary['base_commit'] is not None
+    converted = sorted(Path(path).name for path in summary['converted'])
+    assert converted == ['a.md', 'd.txt', 'e.md']
+    assert not (output / 'b.html').exists()
+    assert not (output / 'sub' / 'c.html').exists()
+    assert (output / 'sub' / 'd.html').exists()
+    assert '新的内容A' in (output / 'a.html').read_text(encoding='utf-8')
+
+    # 上次构建时未跟踪的文件提交后会再转换一次，之后没有变更时不转换任何文件
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'add e')
+    summary = batch.run(incremental=True)
+    assert [Path(path).name for path in summary['converted']] == ['e.md']
+    summary = batch.run(incremental=True)
+    assert summary['converted'] == []
+
+
+def test_incremental_detects_changes_outside_git_diff(tmp_path):
+    """测试git差异看不到的变化：转换后删除的未跟踪文件、转换后撤销的未提交修改"""
+    repo = tmp_path / 'articles'
+    output = tmp_path / 'site'
+    write(repo / 'a.md', '# A\n\n原内容')
+    git(repo, 'init', '-q')
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'init')
+
+    batch = BatchConverter(repo, output)
+    batch.run(incremental=True)
+
+    write(repo / 'draft.md', '# 草稿')
+    write(repo / 'a.md', '# A\n\n未提交的修改')
+    summary = batch.run(incremental=True)
+    assert sorted(Path(path).name for path in summary['converted']) == ['a.md', 'draft.md']
+
+    (repo / 'draft.md').unlink()
+    git(repo, 'checkout', '--', 'a.md')
+    summary = batch.run(incremental=True)
+    assert [Path(path).name for path in summary['converted']] == ['a.md']
+    assert summary['removed'] == [str(output / 'draft.html')]
+    assert '原内容' in (output / 'a.html').read_text(encoding='utf-8')
+
+    assert batch.run(incremental=True)['converted'] == []
+
+
+def test_since_ref(tmp_path):
+    """测试指定基准引用"""
+    repo = tmp_path / 'articles'
+    write(repo / 'a.md', '# A')
+    git(repo, 'init', '-q')
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'init')
+    git(repo, 'tag', 'v1')
+    write(repo / 'b.md', '# B')
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'add b')
+
+    batch = BatchConverter(repo, repo / 'out')
+    summary = batch.run(since='v1')
+    assert [Path(path).name for path in summary['converted']] == ['b.md']
+
+
+def test_shards_are_disjoint_and_balanced(tmp_path):
+    """测试分片互不重叠、按大小均衡，且合并后覆盖完整"""
+    source = tmp_path / 'articles'
+    for i in range(20):
+        write(source / f'{i:02d}.md', '# 标题\n\n' + '内容' * (i * 50 + 1))
+
+    git(source, 'init', '-q')
+    git(source, 'add', '-A')
+    git(source, 'commit', '-q', '-m', 'init')
+
+    manifests = []
+    for index in range(3):
+        batch = BatchConverter(source, tmp_path / 'out', shard=(index, 3))
+        summary = batch.run()
+        manifests.append(summary['manifest_file'])
+
+    # 分片运行不写入共用的构建状态
+    assert not (tmp_path / 'out' / '.wechat_build_state.json').exists()
+
+    merged, problems = merge_manifests(manifests)
+    assert problems == []
+    assert len(merged['files']) == 20
+
+    loads = []
+    for manifest_file in manifests:
+        with open(manifest_file, encoding='utf-8') as f:
+            loads.append(sum(entry['size'] for entry in json.load(f)['files']))
+    assert max(loads) - min(loads) <= max(path.stat().st_size for path in source.iterdir())
+
+    # 缺少分片时合并失败
+    merged, problems = merge_manifests(manifests[:2])
+    assert any('缺少分片 2/3' in problem for problem in problems)
+
+
+def test_shard_assignment_is_stable():
+    """测试分片分配与输入顺序无关"""
+    entries = [(f'dir/{i}.md', (i * 37) % 11) for i in range(50)]
+    assert assign_shards(entries, 4) == assign_shards(list(reversed(entries)), 4)
+    assert parse_shard('2/4') == (2, 4)
+
+
+def test_resume_skips_finished_files(tmp_path):
+    """测试断点续转跳过日志中已完成的文件"""
+    source = tmp_path / 'articles'
+    output = tmp_path / 'out'
+    for name in ('a', 'b', 'c'):
+        write(source / f'{name}.md', f'# {name}')
+
+    batch = BatchConverter(source, output)
+    batch.run()
+
+    # 模拟崩溃：日志最后一行只写了一半，c 的记录丢失
+    journal = batch.journal_path()
+    lines = journal.read_text(encoding='utf-8').splitlines(keepends=True)
+    journal.write_text(''.join(lines[:2]) + lines[2][:10], encoding='utf-8')
+    write(source / 'a.md', '# a 已修改的内容')
+
+    summary = batch.run(resume=True)
+    assert summary['skipped'] == 1
+    assert len(summary['converted']) == 3
+    records = BatchJournal.load(journal)
+    assert sorted(records) == ['a.md', 'b.md', 'c.md']
+    assert '已修改的内容' in (output / 'a.html').read_text(encoding='utf-8')
+
+
+def test_atomic_write_leaves_no_temp_files(tmp_path):
+    """测试原子写入"""
+    target = tmp_path / 'out' / 'a.html'
+    assert atomic_write_text(target, '内容') == len('内容'.encode('utf-8'))
+    assert target.read_text(encoding='utf-8') == '内容'
+    assert [path.name for path in target.parent.iterdir()] == ['a.html']
+
+
+def test_job_manifest_and_result_stream(tmp_path):
+    """测试任务清单和JSON Lines结果流"""
+    write(tmp_path / 'docs' / 'a.md', '# A')
+    write(tmp_path / 'docs' / 'b.txt', '# B')
+    jobs = [
+        {'input': 'docs/a.md', 'style': 'tech', 'title': '标题A', 'output': 'custom/a.html'},
+        {'input': 'docs/b.txt', 'subtitle': '副标题B'},
+    ]
+    manifest = tmp_path / 'jobs.jsonl'
+    manifest.write_text('\n'.join(json.dumps(job, ensure_ascii=False) for job in jobs), encoding='utf-8')
+
+    results_path = tmp_path / 'results.jsonl'
+    batch = BatchConverter(tmp_path, tmp_path / 'out')
+    with open(results_path, 'w', encoding='utf-8') as results_file:
+        summary = batch.run_manifest(manifest, results_file=results_file)
+
+    assert summary['failed'] == []
+    results = [json.loads(line) for line in results_path.read_text(encoding='utf-8').splitlines()]
+    assert [result['id'] for result in results] == ['docs/a.md', 'docs/b.txt']
+    assert results[0]['style'] == 'tech'
+    assert results[0]['bytes'] == (tmp_path / 'custom' / 'a.html').stat().st_size
+    assert '标题A' in (tmp_path / 'custom' / 'a.html').read_text(encoding='utf-8')
+    assert '副标题B' in (tmp_path / 'out' / 'docs' / 'b.html').read_text(encoding='utf-8')
+
+
+def test_job_manifest_rejects_malformed_entries(tmp_path):
+    """测试任务清单中非对象条目给出清晰的错误"""
+    manifest = tmp_path / 'jobs.jsonl'
+    manifest.write_text('{"input": "a.md"}\n"b.md"\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='任务 2 应为对象'):
+        load_job_manifest(manifest, tmp_path / 'out')
+
+    manifest = tmp_path / 'jobs.json'
+    manifest.write_text('{"jobs": {"input": "a.md"}}', encoding='utf-8')
+    with pytest.raises(ValueError, match='任务清单应为'):
+        load_job_manifest(manifest, tmp_path / 'out')
+
+
+def test_progress_reporter_throttles_and_reports(tmp_path):
+    """测试进度报告：非终端输出JSON摘要，且按时间间隔节流"""
+    stream = io.StringIO()
+    reporter = ProgressReporter(total=100, total_bytes=100 * 1024, workers=2, stream=stream, interval=3600)
+    reporter.start({'id': 'slow.docx'})
+    for i in range(50):
+        reporter.start({'id': f'{i}.md'})
+        reporter.finish({'id': f'{i}.md', 'status': 'ok', 'source_size': 1024})
+    assert stream.getvalue() == ''
+
+    stats = reporter.snapshot()
+    assert stats['done'] == 50
+    assert stats['in_flight'] == 1
+    assert stats['slowest']['id'] == 'slow.docx'
+    assert stats['eta'] is not None
+
+    reporter.close()
+    summary = json.loads(stream.getvalue())
+    assert summary['event'] == 'summary'
+    assert summary['done'] == 50
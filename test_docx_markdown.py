@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word文档转Markdown测试
+"""
+
+import base64
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from asset_store import AssetStore, extract_docx_images
+from extended_converter import ExtendedMarkdownToWeChatConverter
+from universal_converter import UniversalToWeChatConverter
+
+# 1x1像素的PNG图片
+PIXEL_PNG = 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+
+
+def add_hyperlink(paragraph, text, url):
+    """在段落末尾添加超链接"""
+    rid = paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), rid)
+    run = OxmlElement('w:r')
+    text_element = OxmlElement('w:t')
+    text_element.text = text
+    run.append(text_element)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+def make_sample(path):
+    """生成包含格式、列表、表格和超链接的示例文档"""
+    doc = Document()
+    doc.add_heading('文章标题', level=1)
+
+    paragraph = doc.add_paragraph('重点')
+    paragraph.add_run('内容').bold = True
+    paragraph.add_run('很').bold = True
+    paragraph.add_run(' 重点 ')
+    paragraph.add_run('斜体').italic = True
+    paragraph.add_run('，参见')
+    add_hyperlink(paragraph, '文档', 'https://example.com/doc')
+
+    doc.add_paragraph('第一项', style='List Bullet')
+    doc.add_paragraph('第二项', style='List Bullet')
+    doc.add_paragraph('步骤', style='List Number')
+
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = '名称'
+    table.cell(0, 1).text = '值'
+    table.cell(1, 0).text = 'a|b'
+    table.cell(1, 1).text = '1'
+
+    doc.save(path)
+    return path
+
+
+def test_docx_runs_tables_lists_and_links(tmp_path):
+    """测试按文字片段转换：格式合并、表格、列表和超链接"""
+    source = make_sample(tmp_path / 'doc.docx')
+    markdown_content = UniversalToWeChatConverter().docx_to_markdown(source)
+
+    assert markdown_content.startswith('# 文章标题\n\n')
+    # 相邻的粗体片段合并，同样的文字在其他位置不会被误加粗
+    assert '重点**内容很** 重点 *斜体*，参见[文档](https://example.com/doc)' in markdown_content
+    assert '- 第一项\n- 第二项\n\n1. 步骤' in markdown_content
+    assert '| 名称 | 值 |\n| --- | --- |\n| a\\|b | 1 |' in markdown_content
+
+
+def test_docx_engines(tmp_path):
+    """测试Word转换引擎：mammoth直接生成HTML，两个转换器的python-docx引擎都保留表格和列表"""
+    source = make_sample(tmp_path / 'doc.docx')
+
+    converter = UniversalToWeChatConverter(docx_engine='mammoth')
+    assert converter.is_direct_html('docx')
+    converter.file_to_markdown = None
+    html_content = converter.file_to_html(source)
+    assert '<h1>文章标题</h1>' in html_content
+    assert '<strong>内容很</strong>' in html_content
+    assert '<ol><li>步骤</li></ol>' in html_content
+    assert '<a href="https://example.com/doc">文档</a>' in html_content
+
+    assert not UniversalToWeChatConverter(docx_engine='python-docx').is_direct_html('docx')
+
+    for engine in ('python-docx', 'mammoth'):
+        html_content = ExtendedMarkdownToWeChatConverter(docx_engine=engine).convert_docx(source)
+        assert '<table>' in html_content and '<li>第一项</li>' in html_content
+
+
+def test_docx_images_are_stored_once_and_reused(tmp_path):
+    """测试Word文档中的图片按内容去重保存，重复上传时直接复用"""
+    image = tmp_path / 'pixel.png'
+    image.write_bytes(base64.b64decode(PIXEL_PNG))
+
+    doc = Document()
+    doc.add_paragraph('图片前')
+    doc.add_picture(str(image))
+    doc.add_picture(str(image))
+    source = tmp_path / 'images.docx'
+    doc.save(source)
+
+    store = AssetStore(tmp_path / 'assets', url_prefix='/api/assets')
+    images = extract_docx_images(source, store)
+    assert (images.stored, images.reused) == (1, 0)
+    assert len(list((tmp_path / 'assets').rglob('*.png'))) == 1
+
+    url = images.url_for_bytes(image.read_bytes())
+    assert url.startswith('/api/assets/') and url.endswith('.png')
+
+    markdown_content = UniversalToWeChatConverter(asset_store=store).docx_to_markdown(source)
+    assert markdown_content.count(f']({url})') == 2
+
+    html_content = UniversalToWeChatConverter(docx_engine='mammoth', asset_store=store).file_to_html(source)
+    assert html_content.count(f'<img src="{url}"') == 2
+
+    # 再次上传同一文档：图片直接复用，不重新处理
+    images = extract_docx_images(source, store)
+    assert (images.stored, images.reused) == (0, 1)
+
+    # 未配置资源存储时不输出图片
+    assert '![' not in UniversalToWeChatConverter().docx_to_markdown(source)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+扩展版转换器测试
+"""
+
+import extended_converter
+from extended_converter import WECHAT_TAG_STYLES, ExtendedMarkdownToWeChatConverter
+
+
+def test_html_input_is_parsed_once(tmp_path, monkeypatch):
+    """测试HTML输入只解析一次，后处理直接修改解析得到的文档树"""
+    parses = []
+    original = extended_converter.BeautifulSoup
+
+    class CountingSoup(original):
+        def __init__(self, *args, **kwargs):
+            parses.append(args[0] if args else None)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(extended_converter, 'BeautifulSoup', CountingSoup)
+
+    source = tmp_path / 'page.html'
+    source.write_text(
+        '<!DOCTYPE html><html><body><h2>标题</h2>'
+        '<img src="a.png"><img src="b.png" style="width: 50%">'
+        '<table><tr><td>1</td></tr></table><pre>code</pre><blockquote>引用</blockquote>'
+        '</body></html>',
+        encoding='utf-8'
+    )
+    result = ExtendedMarkdownToWeChatConverter().convert_file(source, tmp_path / 'page.out.html')
+
+    assert len(parses) == 1
+    assert f'<img src="a.png" style="{WECHAT_TAG_STYLES["img"]}"/>' in result
+    assert '<img src="b.png" style="width: 50%"/>' in result
+    for name in ('table', 'pre', 'blockquote'):
+        assert f'<{name} style="{WECHAT_TAG_STYLES[name]}">' in result
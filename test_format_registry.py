@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输入格式注册表测试
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from extended_converter import ExtendedMarkdownToWeChatConverter
+from format_registry import (
+    InputFormat, OptionalDependency, allowed_extensions, format_table, get_format,
+    register_format, unregister_format,
+)
+from format_sniffer import detect_format, format_from_suffix
+from universal_converter import UniversalToWeChatConverter
+
+
+def csv_to_markdown(content, converter):
+    """把CSV转换为Markdown表格"""
+    rows = [line.split(',') for line in content.strip().splitlines()]
+    lines = ['| ' + ' | '.join(rows[0]) + ' |', '|' + ' --- |' * len(rows[0])]
+    lines.extend('| ' + ' | '.join(row) + ' |' for row in rows[1:])
+    return '\n'.join(lines)
+
+
+def test_builtin_formats():
+    """测试内置格式的扩展名和依赖信息"""
+    assert {'md', 'markdown', 'html', 'htm', 'txt', 'rst', 'docx', 'rtf'} <= allowed_extensions()
+    table = {item['format']: item for item in format_table()}
+    assert table['docx']['extensions'] == ['.docx'] and table['docx']['available']
+    assert get_format('docx').binary and not get_format('rst').binary
+
+
+def test_optional_dependencies_are_imported_lazily():
+    """测试导入转换器时不导入可选依赖"""
+    code = (
+        'import sys, universal_converter, extended_converter; '
+        'universal_converter.UniversalToWeChatConverter(); '
+        'print(sorted(m for m in ("docutils", "docx", "mammoth", "striprtf") if m in sys.modules))'
+    )
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    assert output.strip() == '[]'
+
+
+def test_third_party_formats(tmp_path):
+    """测试第三方格式注册后可以被检测和转换"""
+    register_format(InputFormat('csv', 'CSV', ('.csv',), '转换为表格', to_markdown=csv_to_markdown))
+    register_format(InputFormat(
+        'banner', 'Banner', ('.banner',), '直接生成HTML',
+        detect=lambda prefix: prefix.startswith(b'BANNER:'),
+        to_html=lambda content, converter: f'<section>{content[7:].strip()}</section>',
+    ))
+    register_format(InputFormat(
+        'missing', 'Missing', ('.missing',),
+        requires=(OptionalDependency('wechat_missing_module', 'pip install wechat-missing'),),
+        to_markdown=lambda content, converter: content,
+    ))
+    try:
+        with pytest.raises(ValueError):
+            register_format(InputFormat('csv', 'CSV', ('.csv',)))
+
+        csv_file = tmp_path / 'scores.csv'
+        csv_file.write_text('姓名,分数\n张三,90\n', encoding='utf-8')
+        banner_file = tmp_path / 'notice.txt'
+        banner_file.write_text('BANNER: 停机通知', encoding='utf-8')
+        missing_file = tmp_path / 'data.missing'
+        missing_file.write_text('内容', encoding='utf-8')
+
+        assert 'csv' in allowed_extensions()
+        assert detect_format(csv_file) == 'csv'
+        assert detect_format(banner_file) == 'banner'
+
+        universal = UniversalToWeChatConverter()
+        assert '<td>张三</td>' in universal.file_to_html(csv_file)
+        assert universal.is_direct_html('banner')
+        assert universal.file_to_html(banner_file) == '<section>停机通知</section>'
+
+        extended = ExtendedMarkdownToWeChatConverter()
+        assert '<td>90</td>' in extended.convert_file(csv_file, tmp_path / 'scores.html')
+        assert '<section>停机通知</section>' in extended.convert_file(banner_file, tmp_path / 'notice.html')
+
+        assert not get_format('missing').available()
+        with pytest.raises(ImportError, match='pip install wechat-missing'):
+            universal.file_to_html(missing_file)
+    finally:
+        for name in ('csv', 'banner', 'missing'):
+            unregister_format(name)
+
+    assert format_from_suffix(csv_file) == 'unknown'
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输入格式检测测试
+"""
+
+import io
+
+from docx import Document
+
+from format_sniffer import SNIFF_BYTES, detect_format
+from universal_converter import UniversalToWeChatConverter
+
+
+class CountingReader(io.BytesIO):
+    """记录读取字节数的文件对象"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_content_overrides_suffix(tmp_path):
+    """测试按内容检测格式，扩展名只作为提示"""
+    samples = {
+        'notes.txt': '# 标题\n\n正文包含 **粗体** 和 [链接](https://example.com)。\n',
+        'doc.txt': '标题\n~~~~\n\n.. note:: 提示\n\n正文包含 ``代码``。\n',
+        'page.txt': '<div>\n<h2>标题</h2>\n<p>段落</p>\n<ul><li>一</li><li>二</li></ul>\n</div>\n',
+        'letter.txt': '{\\rtf1\\ansi 内容}',
+        'plain.txt': '这是一段普通文字。\n第二行文字。\n',
+        'article.md': '标题\n~~~~\n\n.. note:: 扩展名明确时按扩展名处理\n',
+        'legacy.html': '<!DOCTYPE html>\n<html><body><p>内容</p></body></html>',
+    }
+    expected = {
+        'notes.txt': 'markdown', 'doc.txt': 'rst', 'page.txt': 'html', 'letter.txt': 'rtf',
+        'plain.txt': 'text', 'article.md': 'markdown', 'legacy.html': 'html',
+    }
+    for name, content in samples.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+        assert detect_format(tmp_path / name) == expected[name], name
+
+    # 没有扩展名的Word文档、二进制文件
+    Document().save(tmp_path / 'upload')
+    assert detect_format(tmp_path / 'upload') == 'docx'
+    (tmp_path / 'image.bin').write_bytes(bytes(range(256)) * 4)
+    assert detect_format(tmp_path / 'image.bin') == 'unknown'
+
+
+def test_detection_reads_bounded_prefix():
+    """测试检测只读取开头一段内容，并恢复文件位置"""
+    reader = CountingReader(b'# title\n\n' + b'text line\n' * 1024 * 1024)
+    reader.seek(0)
+    assert detect_format(reader) == 'markdown'
+    assert reader.bytes_read == SNIFF_BYTES
+    assert reader.tell() == 0
+
+
+def test_markdown_saved_as_txt_uses_markdown_path(tmp_path):
+    """测试另存为 .txt 的Markdown按Markdown转换"""
+    source = tmp_path / 'notes.txt'
+    source.write_text('# 标题\n\n| 列一 | 列二 |\n| --- | --- |\n| 1 | 2 |\n', encoding='utf-8')
+
+    html_content = UniversalToWeChatConverter().file_to_html(source)
+    assert '<h1' in html_content and '<table>' in html_content
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换历史存储测试
+"""
+
+import multiprocessing
+import sqlite3
+import threading
+
+from history_store import HistoryStore
+
+
+def make_record(conversion_id, timestamp, style='default', **extra):
+    return {
+        'id': conversion_id,
+        'original_filename': f'{conversion_id}.md',
+        'converted_filename': f'converted_{conversion_id}.html',
+        'style': style,
+        'title': '',
+        'subtitle': '',
+        'timestamp': timestamp,
+        'file_size': 10,
+        **extra,
+    }
+
+
+def test_records_round_trip(tmp_path):
+    """测试保存、查找、按时间列出和清理"""
+    store = HistoryStore(tmp_path / 'history.db')
+    store.add(make_record('b', '2024-01-02T00:00:00', intermediate={'key': 'k', 'kind': 'markdown', 'cached': False}))
+    store.add(make_record('a', '2024-01-01T00:00:00', style='tech'))
+    store.add(make_record('c', '2024-01-03T00:00:00', intermediate=None))
+
+    assert len(store) == 3
+    assert 'a' in store and 'x' not in store
+    assert store.get('b')['intermediate'] == {'key': 'k', 'kind': 'markdown', 'cached': False}
+    assert store.get('a') == make_record('a', '2024-01-01T00:00:00', style='tech')
+    assert store.get('x') is None
+    assert [record['id'] for record in store.recent(2)] == ['b', 'c']
+    assert [record['id'] for record in store.records()] == ['a', 'b', 'c']
+
+    expired = store.delete_before('2024-01-02T12:00:00')
+    assert sorted(record['id'] for record in expired) == ['a', 'b']
+    assert [record['id'] for record in store.records()] == ['c']
+
+
+def test_stats_counters(tmp_path):
+    """测试统计计数随写入累加，清理记录后保留，重新打开后仍然可读"""
+    path = tmp_path / 'history.db'
+    store = HistoryStore(path)
+    store.add(make_record('a', '2024-01-01T00:00:00', output_size=100, elapsed=0.1))
+    store.add(make_record('b', '2024-01-02T00:00:00', style='tech', output_size=50, elapsed=0.3))
+    store.add({**make_record('c', '2024-01-03T00:00:00'), 'original_filename': 'c.DOCX'})
+    store.delete_before('2024-01-02T12:00:00')
+
+    stats = HistoryStore(path).stats()
+    assert stats['total_conversions'] == 3
+    assert stats['style_stats'] == {'default': 2, 'tech': 1}
+    assert stats['format_stats'] == {'.md': 2, '.docx': 1}
+    assert (stats['bytes_in'], stats['bytes_out']) == (30, 150)
+    assert round(stats['average_elapsed_ms']) == 133
+
+
+def test_stats_backfilled_from_existing_records(tmp_path):
+    """测试从没有计数表的数据库升级时按现有记录补齐计数"""
+    path = tmp_path / 'history.db'
+    store = HistoryStore(path)
+    store.add(make_record('a', '2024-01-01T00:00:00'))
+    store.add(make_record('b', '2024-01-02T00:00:00', style='tech'))
+    connection = sqlite3.connect(path)
+    connection.execute('DROP TABLE counters')
+    connection.commit()
+    connection.close()
+
+    stats = HistoryStore(path).stats()
+    assert stats['total_conversions'] == 2
+    assert stats['style_stats'] == {'default': 1, 'tech': 1}
+
+
+def test_delete_before_in_batches(tmp_path):
+    """测试过期记录从最早的开始分批删除，同时删除保存的结果"""
+    store = HistoryStore(tmp_path / 'history.db')
+    for index in range(5):
+        store.add(make_record(str(index), f'2024-01-0{index + 1}T00:00:00'), html='x' * 100)
+
+    assert [record['id'] for record in store.delete_before('2024-01-05T00:00:00', limit=3)] == ['0', '1', '2']
+    assert [record['id'] for record in store.delete_before('2024-01-05T00:00:00', limit=3)] == ['3']
+    assert store.delete_before('2024-01-05T00:00:00', limit=3) == []
+    assert store.output_bytes() == 100
+    assert store.output('3') is None and store.output('4') == 'x' * 100
+
+
+def test_evict_least_recently_accessed_outputs(tmp_path):
+    """测试保存的结果总大小超出上限时先淘汰最久没有访问的结果"""
+    store = HistoryStore(tmp_path / 'history.db')
+    for index in range(4):
+        store.add(make_record(str(index), '2024-01-01T00:00:00'), html='x' * 100)
+    store.add(make_record('3', '2024-01-01T00:00:00'), html='y' * 100)
+    assert store.output_bytes() == 400
+    assert store.output('3') == 'y' * 100 and store.has_output('3')
+
+    store.touch_output('0')
+    assert store.evict_outputs(400) == []
+    assert store.evict_outputs(250) == [('1', 'converted_1.html'), ('2', 'converted_2.html')]
+    assert store.evict_outputs(0, limit=1) == [('3', 'converted_3.html')]
+    assert store.output_bytes() == 100
+    assert store.output('1') is None and not store.has_output('1') and '1' in store
+
+
+def test_touches_are_batched(tmp_path):
+    """测试访问时间先积累在内存中，一次写入数据库"""
+    path = tmp_path / 'history.db'
+    store = HistoryStore(path)
+    for index in range(3):
+        store.add(make_record(str(index), '2024-01-01T00:00:00'), html='x' * 100)
+    connection = sqlite3.connect(path)
+    before = dict(connection.execute('SELECT id, accessed FROM outputs'))
+
+    store.touch_output('0')
+    store.touch_output('1')
+    assert dict(connection.execute('SELECT id, accessed FROM outputs')) == before
+
+    store.flush_touches()
+    after = dict(connection.execute('SELECT id, accessed FROM outputs'))
+    assert after['0'] > before['0'] and after['1'] > before['1'] and after['2'] == before['2']
+    assert HistoryStore(path).evict_outputs(100) == [('2', 'converted_2.html'), ('0', 'converted_0.html')]
+
+
+def test_claim_runs_once_per_interval(tmp_path):
+    """测试多个进程共用的定时任务在一个周期内只被领取一次"""
+    path = tmp_path / 'history.db'
+    first, second = HistoryStore(path), HistoryStore(path)
+    assert first.claim('cleanup', 3600)
+    assert not second.claim('cleanup', 3600)
+    assert second.claim('other', 3600)
+    assert second.claim('expired', -1) and first.claim('expired', 3600)
+
+
+def test_wal_mode_and_indexes(tmp_path):
+    """测试数据库使用WAL模式，按ID、时间和最近访问时间查找都走索引"""
+    path = tmp_path / 'history.db'
+    HistoryStore(path)
+    connection = sqlite3.connect(path)
+    assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    for table, query in (('conversions', 'WHERE id = ?'), ('conversions', 'WHERE timestamp < ?'),
+                         ('outputs', 'WHERE accessed < ?'), ('outputs', 'ORDER BY accessed LIMIT ?')):
+        plan = ' '.join(row[-1] for row in connection.execute(
+            f'EXPLAIN QUERY PLAN SELECT * FROM {table} {query}', ('1',)))
+        assert 'INDEX' in plan
+
+
+def test_concurrent_threads_share_commits(tmp_path):
+    """测试同一进程中多个线程同时写入时记录都不丢失"""
+    store = HistoryStore(tmp_path / 'history.db')
+
+    def write(worker):
+        for index in range(50):
+            store.add(make_record(f'{worker}-{index}', f'2024-01-01T00:00:{index:02d}'))
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store) == 400
+
+
+def _worker(path, worker, count, barrier, queue):
+    """子进程：写入记录和结果后读取其他进程写入的记录和结果"""
+    store = HistoryStore(path)
+    barrier.wait()
+    for index in range(count):
+        store.add(make_record(f'{worker}-{index}', f'2024-01-01T00:{index // 60:02d}:{index % 60:02d}'), html=str(worker))
+    barrier.wait()
+    queue.put((worker, len(store), all(store.output(f'{other}-0') == str(other) for other in range(4))))
+
+
+def test_records_are_shared_across_processes(tmp_path):
+    """测试多个工作进程写入的记录和结果彼此可见"""
+    path = tmp_path / 'history.db'
+    HistoryStore(path)
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(4)
+    queue = context.Queue()
+    processes = [context.Process(target=_worker, args=(path, worker, 100, barrier, queue)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    results = [queue.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert sorted(results) == [(worker, 400, True) for worker in range(4)]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML转Markdown测试
+"""
+
+import time
+
+from universal_converter import UniversalToWeChatConverter
+
+
+def test_each_node_emitted_once():
+    """测试每个节点只输出一次"""
+    converter = UniversalToWeChatConverter()
+    markdown_content = converter.html_to_markdown(
+        '<h2>标题</h2>'
+        '<p>普通 <strong>粗体</strong> 和 <a href="https://example.com">链接</a></p>'
+        '<ul><li>第一项</li><li>第二项</li></ul>'
+        '<ol><li>步骤</li></ol>'
+    )
+
+    assert markdown_content == (
+        '## 标题\n\n'
+        '普通 **粗体** 和 [链接](https://example.com)\n\n'
+        '- 第一项\n'
+        '- 第二项\n\n'
+        '1. 步骤'
+    )
+
+
+def test_nested_blocks():
+    """测试嵌套列表、引用和代码块"""
+    converter = UniversalToWeChatConverter()
+    markdown_content = converter.html_to_markdown(
+        '<ul><li>外层<ul><li>内层</li></ul></li></ul>'
+        '<blockquote><p>第一段</p><p>第二段</p></blockquote>'
+        '<pre><code class="language-python">print(1)\n</code></pre>'
+    )
+
+    assert markdown_content == (
+        '- 外层\n'
+        '    - 内层\n\n'
+        '> 第一段\n'
+        '>\n'
+        '> 第二段\n\n'
+        '```python\n'
+        'print(1)\n'
+        '```'
+    )
+
+
+def test_stray_items_empty_marks_and_backticks():
+    """测试列表外的 <li>、空的行内标记和包含反引号的代码"""
+    converter = UniversalToWeChatConverter()
+    markdown_content = converter.html_to_markdown(
+        '<li>孤立项</li>'
+        '<p>段落<strong></strong> 和 <em> </em>结尾</p>'
+        '<p>用 <code>a``b</code> 和 <code>`x</code></p>'
+        '<pre><code>```\ncode\n```</code></pre>'
+    )
+
+    assert markdown_content == (
+        '- 孤立项\n\n'
+        '段落 和 结尾\n\n'
+        '用 ```a``b``` 和 `` `x ``\n\n'
+        '````\n'
+        '```\n'
+        'code\n'
+        '```\n'
+        '````'
+    )
+
+
+def nested_html(depth):
+    """生成深层嵌套的HTML"""
+    opening = ''.join(f'<div><span><strong>第{i}层</strong>' for i in range(depth))
+    closing = '</span></div>' * depth
+    return opening + '<p>最内层 <em>文本</em></p>' + closing
+
+
+def test_linear_scaling_on_deeply_nested_html():
+    """测试深层嵌套HTML的输出大小和耗时随输入线性增长"""
+    converter = UniversalToWeChatConverter()
+
+    def measure(depth):
+        html_content = nested_html(depth)
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            markdown_content = converter.html_to_markdown(html_content)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return len(html_content), len(markdown_content), best
+
+    small_input, small_output, small_time = measure(500)
+    large_input, large_output, large_time = measure(4000)
+
+    # 输入增大8倍，输出和耗时也应大致增大8倍（平方复杂度会增大64倍）
+    assert large_output / small_output < 1.5 * large_input / small_input
+    assert large_time / small_time < 24
+    assert converter.html_to_markdown(nested_html(4000)).count('第3999层') == 1
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中间结果缓存测试
+"""
+
+import io
+import os
+import time
+
+from markdown_cache import MarkdownCache, source_digest
+from universal_converter import UniversalToWeChatConverter
+
+
+def test_intermediate_is_reused_across_styles(tmp_path, monkeypatch):
+    """测试切换风格时复用源格式转换得到的中间结果"""
+    cache = MarkdownCache(tmp_path / 'cache')
+    source = tmp_path / 'page.html'
+    source.write_text('<html><body><h2>标题</h2><p>正文</p></body></html>', encoding='utf-8')
+
+    calls = []
+    original = UniversalToWeChatConverter.convert_intermediate
+
+    def counting(self, input_file, file_format):
+        calls.append(file_format)
+        return original(self, input_file, file_format)
+
+    monkeypatch.setattr(UniversalToWeChatConverter, 'convert_intermediate', counting)
+
+    first = UniversalToWeChatConverter(style='default', markdown_cache=cache)
+    second = UniversalToWeChatConverter(style='tech', markdown_cache=cache)
+    default_html = first.convert_file_to_html(source)
+    tech_html = second.convert_file_to_html(source)
+
+    assert calls == ['html']
+    assert first.last_intermediate['cached'] is False
+    assert second.last_intermediate == dict(first.last_intermediate, cached=True)
+    assert default_html != tech_html
+    assert '标题' in tech_html
+
+    kind, content = cache.find(second.last_intermediate['key'])
+    assert kind == 'markdown'
+    assert content.startswith('## 标题')
+
+    # 源文件变化后重新转换
+    source.write_text('<html><body><h2>新标题</h2></body></html>', encoding='utf-8')
+    assert '新标题' in second.convert_file_to_html(source)
+    assert calls == ['html', 'html']
+
+
+def test_intermediate_key_depends_on_options(tmp_path):
+    """测试影响中间结果的选项参与缓存键，Markdown输入不缓存"""
+    cache = MarkdownCache(tmp_path / 'cache')
+    source = tmp_path / 'a.docx'
+    source.write_bytes(b'PK\x03\x04word/')
+
+    docx_key = UniversalToWeChatConverter(docx_engine='python-docx').intermediate_key(source, 'docx')
+    mammoth_key = UniversalToWeChatConverter(docx_engine='mammoth').intermediate_key(source, 'docx')
+    assert docx_key != mammoth_key
+
+    markdown = tmp_path / 'a.md'
+    markdown.write_text('# 标题', encoding='utf-8')
+    converter = UniversalToWeChatConverter(markdown_cache=cache)
+    converter.convert_file_to_html(markdown)
+    assert converter.last_intermediate is None
+    assert not (tmp_path / 'cache').exists()
+
+
+def test_cache_lookup():
+    """测试文件对象从当前位置计算哈希且不改变读取位置，无效的缓存键直接返回 None"""
+    stream = io.BytesIO(b'abc')
+    stream.seek(1)
+    assert source_digest(stream) == source_digest(io.BytesIO(b'bc'))
+    assert stream.tell() == 1
+
+    cache = MarkdownCache('unused')
+    assert cache.find('../../etc/passwd') is None
+    assert cache.find('0' * 64) is None
+
+
+def test_prune_by_age_and_size(tmp_path):
+    """测试按最近使用时间删除过期的结果，并把总大小限制在上限内"""
+    cache = MarkdownCache(tmp_path / 'cache')
+    now = time.time()
+    keys = [f'{index:064x}' for index in range(4)]
+    for index, key in enumerate(keys):
+        cache.put(key, 'markdown', 'x' * 100)
+        os.utime(cache.path(key, 'markdown'), (now - 1000 + index * 100,) * 2)
+
+    # 命中时更新使用时间，不会被当作最旧的结果删除
+    assert cache.find(keys[0]) == ('markdown', 'x' * 100)
+
+    assert cache.prune(max_age=850) == (1, 100)
+    assert cache.find(keys[1]) is None
+    assert cache.prune(max_bytes=250) == (1, 100)
+    assert cache.find(keys[2]) is None
+    assert cache.find(keys[0]) is not None and cache.find(keys[3]) is not None
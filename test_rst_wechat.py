@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RST直接转换测试
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import docutils.core
+import docutils.writers
+
+from extended_converter import ExtendedMarkdownToWeChatConverter
+from rst_wechat import RSTPublisher, parts_to_html
+from universal_converter import UniversalToWeChatConverter
+
+
+RST_SAMPLE = """
+文章标题
+========
+
+第一节
+------
+
+正文包含 *强调*、**粗体** 和 ``代码``。
+
+- 列表项
+
+.. note:: 注意事项
+"""
+
+
+def test_rst_to_html_is_clean():
+    """测试RST直接生成结构简洁的HTML"""
+    html_content = UniversalToWeChatConverter().rst_to_html(RST_SAMPLE)
+
+    assert '<h1>文章标题</h1>' in html_content
+    assert '<h2>第一节</h2>' in html_content
+    assert '<code>代码</code>' in html_content
+    assert '<blockquote>' in html_content and '<strong>Note</strong>' in html_content
+    assert 'class=' not in html_content
+    assert '<div' not in html_content
+
+
+def test_rst_file_skips_markdown(tmp_path):
+    """测试RST文件转换不经过Markdown"""
+    source = tmp_path / 'doc.rst'
+    source.write_text(RST_SAMPLE, encoding='utf-8')
+
+    converter = UniversalToWeChatConverter(style='tech')
+    converter.file_to_markdown = None
+    wechat_html = converter.convert_file_to_html(source, title='标题')
+
+    assert '<h1 class="wechat-title">标题</h1>' in wechat_html
+    assert 'border-left: 4px solid #3498db' in wechat_html
+
+
+def test_publisher_reuse_matches_publish_parts():
+    """测试复用的发布器与 publish_parts 结果一致，且可在多线程中共用"""
+    expected = docutils.core.publish_parts(
+        source=RST_SAMPLE, writer=docutils.writers.get_writer_class('html')(), settings_overrides={'output_encoding': 'unicode'}
+    )['html_body']
+    converter = ExtendedMarkdownToWeChatConverter()
+    assert converter.convert_rst(RST_SAMPLE) == expected
+    assert converter.convert_rst(RST_SAMPLE) == expected
+
+    publisher = RSTPublisher()
+    samples = [RST_SAMPLE.replace('第一节', f'第{i}节') for i in range(40)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(publisher.publish_parts, samples))
+    for i, parts in enumerate(results):
+        assert f'第{i}节' in parts_to_html(parts)
+        assert f'第{i + 1}节' not in parts_to_html(parts)
+
+
+def test_rst_include_and_raw_are_disabled(tmp_path):
+    """测试RST中的 include 和 raw 指令不会读取服务器文件或原样输出HTML"""
+    secret = tmp_path / 'secret.txt'
+    secret.write_text('服务器上的机密内容', encoding='utf-8')
+    rst_content = f"""
+正文
+
+.. include:: {secret.as_posix()}
+
+.. raw:: html
+
+   <script>alert(1)</script>
+"""
+
+    outputs = [
+        UniversalToWeChatConverter().rst_to_html(rst_content),
+        UniversalToWeChatConverter().rst_html_publisher.publish_parts(rst_content)['html_body'],
+        ExtendedMarkdownToWeChatConverter().convert_rst(rst_content),
+    ]
+    for html_content in outputs:
+        assert '机密内容' not in html_content
+        assert '<script>' not in html_content
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RTF文字提取测试
+"""
+
+import io
+import tracemalloc
+
+import pytest
+
+from extended_converter import ExtendedMarkdownToWeChatConverter
+from rtf_text import iter_rtf_lines
+from universal_converter import UniversalToWeChatConverter
+
+
+def rtf_escape(text, encoding='gbk'):
+    """把非ASCII字符编码为 \\'hh"""
+    return ''.join(
+        ''.join(f"\\'{byte:02x}" for byte in char.encode(encoding)) if ord(char) > 0x7F else char
+        for char in text
+    )
+
+
+SAMPLE = (
+    r"{\rtf1\ansi\ansicpg936\deff0{\fonttbl{\f0\fnil\fcharset134 " + rtf_escape('宋体') + r";}}"
+    r"{\colortbl ;\red255\green0\blue0;}{\*\generator Riched20}"
+    "\n\\uc1\\pard\\f0\\fs24 # " + rtf_escape('标题') + r"\par" + "\n"
+    + rtf_escape('正文') + r" \b bold\b0  \u8220?quote\u8221?\par" + "\n"
+    r"{\pict\pngblip\picw10 89504e470d0a1a0a" + "\n" r"0000000d49484452}"
+    r"{\*\shppict{\pict\bin6 {}\}\x}}"
+    r"- item\tab x\line next\par" "\n"
+    r"{\field{\*\fldinst HYPERLINK " '"https://example.com"' r"}{\fldrslt link}}\par" "\n"
+    "}"
+).encode('ascii')
+
+
+def test_rtf_lines():
+    """测试段落、代码页、Unicode字符和跳过的组"""
+    assert list(iter_rtf_lines(io.BytesIO(SAMPLE))) == [
+        '# 标题',
+        '正文 bold “quote”',
+        '- item\tx',
+        'next',
+        'link',
+    ]
+
+
+def test_surrogate_pairs():
+    """测试 \\uN 表示的UTF-16代理对合并为一个字符，不成对的代理替换为 U+FFFD"""
+    source = rb"{\rtf1\ansi a\u-10179?\u-8694?b\par \u-10179?x\u-8694?\par}"
+    assert list(iter_rtf_lines(io.BytesIO(source))) == ['a\U0001f60ab', '\ufffdx\ufffd']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64])
+def test_chunk_boundaries(chunk_size):
+    """测试控制字、\\'hh 和 \\bin 数据被数据块切开时结果不变"""
+    assert list(iter_rtf_lines(io.BytesIO(SAMPLE), chunk_size)) == list(iter_rtf_lines(io.BytesIO(SAMPLE)))
+
+
+def test_embedded_pictures_use_bounded_memory():
+    """测试嵌入的大图片不进入内存"""
+
+    def pieces():
+        """按需生成的RTF：16 MB十六进制图片和4 MB \\bin 图片"""
+        yield b'{\\rtf1\\ansi before\\par {\\pict\\pngblip '
+        for _ in range(16 * 1024):
+            yield b'0123456789abcde\n' * 64
+        yield b'}{\\pict\\bin4194304 '
+        for _ in range(4 * 1024):
+            yield b'}{\\' * 341 + b'x'
+        yield b'} after\\par}'
+
+    class Source(io.RawIOBase):
+        """不在测试进程中保存完整内容的输入"""
+
+        def __init__(self):
+            self.pieces = pieces()
+
+        def readable(self):
+            return True
+
+        def readinto(self, target):
+            data = next(self.pieces, b'')
+            target[:len(data)] = data
+            return len(data)
+
+    tracemalloc.start()
+    lines = list(iter_rtf_lines(io.BufferedReader(Source())))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert lines == ['before', ' after']
+    assert peak < 1024 * 1024
+
+
+def test_converters_read_rtf_files(tmp_path):
+    """测试两个转换器直接从文件提取RTF文字"""
+    source = tmp_path / 'doc.rtf'
+    source.write_bytes(SAMPLE)
+
+    markdown = UniversalToWeChatConverter().file_to_markdown(source)
+    assert markdown.startswith('# 标题\n正文 bold')
+
+    html = ExtendedMarkdownToWeChatConverter().convert_content(None, 'rtf', source)
+    assert html.startswith('<h1>标题</h1>\n<p>正文 bold')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态站点导出测试
+"""
+
+import os
+
+from site_exporter import SiteExporter
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def test_incremental_site_export(tmp_path):
+    """测试增量导出：只重建变化的文章，索引页只在列表变化时重写"""
+    source = tmp_path / 'articles'
+    site = tmp_path / 'site'
+    write(source / 'a.md', '# 文章A\n\n内容')
+    write(source / 'sub' / 'b.md', '# 文章B\n\n内容')
+
+    exporter = SiteExporter(source, site, styles=['default', 'tech'])
+    summary = exporter.export()
+    assert summary['rebuilt'] == ['a.md', 'sub/b.md']
+    assert len(summary['indexes_written']) == 2
+    assert (site / 'articles' / 'sub' / 'b.html').exists()
+    assert (site / 'styles' / 'tech' / 'a.html').exists()
+    index = (site / 'index.html').read_text(encoding='utf-8')
+    assert '文章A' in index and 'articles/sub/b.html' in index
+
+    # 没有变化时什么都不做
+    summary = exporter.export()
+    assert summary['rebuilt'] == []
+    assert summary['indexes_written'] == []
+
+    # 只修改正文：只重建该文章，索引不变
+    write(source / 'a.md', '# 文章A\n\n新的内容')
+    summary = exporter.export()
+    assert summary['rebuilt'] == ['a.md']
+    assert summary['indexes_written'] == []
+
+    # 只touch不修改内容：不重建
+    os.utime(source / 'sub' / 'b.md', None)
+    assert exporter.export()['rebuilt'] == []
+
+    # 修改标题、删除文章：索引重写
+    write(source / 'a.md', '# 新标题A\n\n新的内容')
+    (source / 'sub' / 'b.md').unlink()
+    summary = exporter.export()
+    assert summary['removed'] == ['sub/b.md']
+    assert len(summary['indexes_written']) == 2
+    assert not (site / 'articles' / 'sub' / 'b.html').exists()
+    assert '新标题A' in (site / 'index.html').read_text(encoding='utf-8')
+
+    # 新增风格：只生成新风格的页面
+    exporter = SiteExporter(source, site, styles=['default', 'tech', 'dark'])
+    summary = exporter.export()
+    assert summary['rebuilt'] == ['a.md']
+    assert (site / 'styles' / 'dark' / 'a.html').exists()
+
+
+def test_primary_style_change_moves_pages(tmp_path):
+    """测试改变主风格后页面移到新路径，旧路径上的页面被删除"""
+    source = tmp_path / 'articles'
+    site = tmp_path / 'site'
+    write(source / 'a.md', '# 文章A\n\n内容')
+
+    SiteExporter(source, site, styles=['default', 'tech']).export()
+    default_page = (site / 'articles' / 'a.html').read_text(encoding='utf-8')
+
+    summary = SiteExporter(source, site, styles=['tech', 'default']).export()
+    assert summary['rebuilt'] == ['a.md']
+    assert (site / 'articles' / 'a.html').read_text(encoding='utf-8') != default_page
+    assert (site / 'styles' / 'default' / 'a.html').read_text(encoding='utf-8') == default_page
+    assert not (site / 'styles' / 'tech').exists()
+
+    # 去掉原来的主风格：其页面和索引被删除
+    SiteExporter(source, site, styles=['tech']).export()
+    assert not (site / 'styles' / 'default' / 'a.html').exists()
+    assert not (site / 'styles' / 'default' / 'index.html').exists()
+    assert (site / 'articles' / 'a.html').exists() and (site / 'index.html').exists()
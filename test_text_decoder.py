@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本编码检测与分块解码测试
+"""
+
+import io
+
+from text_decoder import SAMPLE_BYTES, detect_encoding, iter_decoded, iter_lines, read_text
+from universal_converter import UniversalToWeChatConverter
+
+CHINESE_TEXT = '# 标题\n\n这是一段“中文”正文，包含全角标点：，。！\n' * 50
+
+
+class CountingReader(io.BytesIO):
+    """记录读取字节数的文件对象"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_detect_encoding():
+    """测试BOM、UTF-8、GB18030和回退编码"""
+    assert detect_encoding(CHINESE_TEXT.encode('utf-8')) == 'utf-8'
+    assert detect_encoding(CHINESE_TEXT.encode('gbk')) == 'gb18030'
+    assert detect_encoding(CHINESE_TEXT.encode('gb18030')) == 'gb18030'
+    assert detect_encoding(CHINESE_TEXT.encode('utf-8-sig')) == 'utf-8-sig'
+    assert detect_encoding(CHINESE_TEXT.encode('utf-16')) == 'utf-16'
+    assert detect_encoding('Café crème, déjà vu.'.encode('latin-1')) == 'latin-1'
+
+    # 样本末尾截断了一个多字节字符
+    sample = CHINESE_TEXT.encode('utf-8')[:101]
+    assert detect_encoding(sample) == 'utf-8'
+
+
+def test_chunked_decode_reads_each_byte_once():
+    """测试分块解码：多字节字符跨块也能正确衔接，每个字节只读取一次"""
+    for encoding in ('utf-8', 'gbk', 'utf-16'):
+        data = CHINESE_TEXT.encode(encoding)
+        reader = CountingReader(data)
+        assert ''.join(iter_decoded(reader, chunk_size=7)) == CHINESE_TEXT
+        assert reader.bytes_read == len(data)
+
+    data = (CHINESE_TEXT * 40).encode('gbk')
+    assert len(data) > SAMPLE_BYTES
+    reader = CountingReader(data)
+    assert read_text(reader) == CHINESE_TEXT * 40
+    assert reader.bytes_read == len(data)
+
+
+def test_gbk_file_converts(tmp_path):
+    """测试GBK编码的Markdown和RST文件可以直接转换"""
+    source = tmp_path / 'article.md'
+    source.write_bytes(CHINESE_TEXT.encode('gbk'))
+    rst_source = tmp_path / 'article.rst'
+    rst_source.write_bytes('标题\n====\n\n中文正文。\n'.encode('gb18030'))
+
+    converter = UniversalToWeChatConverter()
+    assert '这是一段“中文”正文' in converter.file_to_html(source)
+    assert '中文正文。' in converter.file_to_html(rst_source)
+
+
+def test_text_converters_consume_lines(tmp_path):
+    """测试纯文本转换器逐行处理，纯文本文件流式写入输出文件"""
+    from extended_converter import ExtendedMarkdownToWeChatConverter
+
+    text = '# 标题\n\n## 小节\n- 列表项\n1. 第一步\n#没有空格\n1 < 2 & 3\n'
+    extended = ExtendedMarkdownToWeChatConverter()
+    assert extended.convert_text(text) == (
+        '<h1>标题</h1>\n<br>\n<h2>小节</h2>\n<li>列表项</li>\n<p>1. 第一步</p>\n'
+        '<p>#没有空格</p>\n<p>1 &lt; 2 &amp; 3</p>'
+    )
+    assert extended.convert_text(iter(text.splitlines())).startswith('<h1>标题</h1>')
+
+    universal = UniversalToWeChatConverter()
+    assert universal.text_to_markdown('* 项目\n> 引用\n  1. 步骤  \n') == '- 项目\n> 引用\n1. 步骤'
+
+    lines = iter_lines(io.BytesIO(text.encode('gbk')), chunk_size=5)
+    assert list(lines) == text.split('\n')[:-1]
+
+    source = tmp_path / 'log.txt'
+    source.write_bytes('2024-01-01 服务启动\n- 列表项\n1 < 2\n'.encode('gbk'))
+    output = tmp_path / 'log.html'
+    assert extended.convert_file(source, output, '日志') == str(output)
+    result = output.read_text(encoding='utf-8')
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith('.')] == []
+    assert '<h1 class="wechat-title">日志</h1>' in result
+    assert '<li>列表项</li>' in result and result.endswith('</html>')
+
+
+def test_large_files_are_memory_mapped(tmp_path, monkeypatch):
+    """测试大文件通过 mmap 读取，结果与分块读取一致"""
+    import text_decoder
+
+    mapped = []
+    read_mapped = text_decoder._read_mapped
+    monkeypatch.setattr(text_decoder, 'MMAP_THRESHOLD', 1024)
+    monkeypatch.setattr(text_decoder, '_read_mapped', lambda *args: mapped.append(args) or read_mapped(*args))
+
+    for encoding in ('utf-8', 'gbk', 'utf-8-sig', 'utf-16'):
+        source = tmp_path / f'{encoding}.md'
+        source.write_bytes(CHINESE_TEXT.encode(encoding))
+        assert read_text(source) == CHINESE_TEXT
+        assert read_text(io.BytesIO(CHINESE_TEXT.encode(encoding))) == CHINESE_TEXT
+
+    small = tmp_path / 'small.md'
+    small.write_text('# 标题\n', encoding='utf-8')
+    assert read_text(small) == '# 标题\n'
+    assert len(mapped) == 4
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本文件编码检测与分块解码
+
+很多中文稿件以GBK/GB18030保存，按UTF-8读取会让整个转换失败。
+读取文件时先用第一块数据（SAMPLE_BYTES）判断编码：
+- 有BOM时按BOM确定（UTF-8、UTF-16）
+- 第一块是合法的UTF-8时按UTF-8解码
+- 第一块是合法的GB18030且非ASCII字符大多是汉字和中文标点时按GB18030解码
+- 都不是时按Latin-1解码（任何字节都能解码，不会失败）
+
+编码确定后，第一块和之后的数据块依次交给增量解码器，
+每个字节只读取一次，被数据块切开的多字节字符由解码器衔接。
+纯文本可以用 iter_lines 逐行读取，不需要把整个文件放进内存。
+
+需要完整字符串的格式（Markdown、HTML、RST）用 read_text 读取：大文件通过 mmap 映射后
+一次解码，原始字节留在可回收的页缓存中，不会和解码后的字符串同时占用一份进程内存。
+"""
+
+import codecs
+import mmap
+import os
+
+# 每次读取的字节数，第一块同时用于判断编码
+SAMPLE_BYTES = 64 * 1024
+
+# 超过此大小的文件通过 mmap 读取
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# 按顺序尝试的编码（GBK是GB18030的子集）
+CANDIDATE_ENCODINGS = ('utf-8', 'gb18030')
+
+# 都不匹配时使用的编码
+FALLBACK_ENCODING = 'latin-1'
+
+# 判断为GB18030时，非ASCII字符中汉字和中文标点至少占的比例
+MIN_CJK_RATIO = 0.6
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def _is_cjk(char):
+    """汉字、中文标点和全角字符"""
+    code = ord(char)
+    return (
+        0x4E00 <= code <= 0x9FFF        # 中日韩统一表意文字
+        or 0x3400 <= code <= 0x4DBF     # 扩展A
+        or 0x3000 <= code <= 0x303F     # 中文标点
+        or 0xFF00 <= code <= 0xFFEF     # 全角字符
+        or 0x2000 <= code <= 0x206F     # 常用标点（如 “” … —）
+    )
+
+
+def _try_decode(sample, encoding, final):
+    """用增量解码器解码样本，末尾被截断的多字节字符不算错误"""
+    try:
+        return codecs.getincrementaldecoder(encoding)('strict').decode(sample, final)
+    except UnicodeDecodeError:
+        return None
+
+
+def detect_encoding(sample, final=False):
+    """根据样本判断文本编码
+
+    Args:
+        sample (bytes): 文件开头的一段字节
+        final (bool): 样本是否是完整的文件内容
+
+    Returns:
+        str: 编码名
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    for encoding in CANDIDATE_ENCODINGS:
+        text = _try_decode(sample, encoding, final)
+        if text is None:
+            continue
+        if encoding == 'utf-8':
+            return encoding
+
+        # GB18030几乎能解码任意字节序列，解码结果还需要像中文
+        non_ascii = [char for char in text if ord(char) > 0x7F]
+        if not non_ascii or sum(map(_is_cjk, non_ascii)) >= len(non_ascii) * MIN_CJK_RATIO:
+            return encoding
+
+    return FALLBACK_ENCODING
+
+
+def iter_decoded(source, encoding=None, chunk_size=SAMPLE_BYTES):
+    """分块读取并解码文本，生成字符串片段
+
+    Args:
+        source: 文件路径，或以二进制方式打开的文件对象（从当前位置读起）
+        encoding (str): 指定编码，为 None 时根据第一块数据判断
+        chunk_size (int): 每次读取的字节数
+    """
+    if not hasattr(source, 'read'):
+        with open(source, 'rb') as f:
+            yield from iter_decoded(f, encoding, chunk_size)
+        return
+
+    chunk = source.read(chunk_size)
+    if encoding is None:
+        encoding = detect_encoding(chunk, final=len(chunk) < chunk_size)
+
+    # 样本之后的内容仍可能有个别非法字节，替换为 U+FFFD 而不是让整个转换失败
+    decoder = codecs.getincrementaldecoder(encoding)('replace')
+    while chunk:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+        chunk = source.read(chunk_size)
+
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def iter_lines(source, encoding=None, chunk_size=SAMPLE_BYTES):
+    """逐行读取文本文件（不含换行符），内存占用与文件大小无关"""
+    pending = ''
+    for text in iter_decoded(source, encoding, chunk_size):
+        lines = (pending + text).split('\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _read_mapped(path, encoding=None):
+    """通过 mmap 读取并解码整个文件
+
+    解码器直接读取映射的内存，不创建原始字节的副本，也不需要拼接分块解码的结果。
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, 'madvise'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        if encoding is None:
+            encoding = detect_encoding(mapped[:SAMPLE_BYTES], final=len(mapped) <= SAMPLE_BYTES)
+        with memoryview(mapped) as view:
+            return codecs.decode(view, encoding, 'replace')
+
+
+def read_text(source, encoding=None):
+    """读取整个文本文件，自动判断编码
+
+    大于 MMAP_THRESHOLD 的文件通过 mmap 读取，其余文件或文件对象分块读取。
+    """
+    if not hasattr(source, 'read'):
+        try:
+            if os.path.getsize(source) > MMAP_THRESHOLD:
+                return _read_mapped(source, encoding)
+        except (OSError, ValueError):
+            # 无法映射的文件（如管道）分块读取
+            pass
+    return ''.join(iter_decoded(source, encoding))
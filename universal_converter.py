@@ -3,50 +3,333 @@
 """
 通用格式到微信公众号转换器
 采用两步转换策略：其他格式 → Markdown → 微信公众号HTML
+RST和使用mammoth引擎的Word文档可直接生成HTML，跳过Markdown中间格式
 """
 
+import io
 import markdown
 import re
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
+from bs4.element import Comment, Declaration, Doctype, ProcessingInstruction
 import argparse
 import sys
 from pathlib import Path
+from archive_converter import ArchiveConverter, is_archive
+from asset_store import AssetStore, extract_docx_images
+from format_registry import MAMMOTH, PYTHON_DOCX, get_format, iter_formats
+from format_sniffer import detect_format
+from markdown_cache import MarkdownCache, cache_key, source_digest
+from rtf_text import iter_rtf_lines
+from text_decoder import iter_lines, read_text
 from wechat_styles import WeChatStyleTemplates
 
-# 尝试导入可选依赖
-try:
-    import docutils.core
-    import docutils.writers.html4css1
-    RST_AVAILABLE = True
-except ImportError:
-    RST_AVAILABLE = False
+# 中间结果的转换版本，源格式的转换方式变化时递增，使缓存的中间结果重新生成
+INTERMEDIATE_VERSION = '3'
 
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+# 不参与转换的字符串节点（注释、文档类型声明等）
+_SKIPPED_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction)
 
-try:
-    import striprtf
-    RTF_AVAILABLE = True
-except ImportError:
-    RTF_AVAILABLE = False
+# 内容不输出的标签
+_SKIPPED_TAGS = {'head', 'title', 'script', 'style', 'noscript', 'template'}
 
-try:
-    import mammoth
-    DOCX_MAMMOTH_AVAILABLE = True
-except ImportError:
-    DOCX_MAMMOTH_AVAILABLE = False
+# 只起分段作用的块级标签
+_BLOCK_TAGS = {
+    'html', 'body', 'p', 'div', 'section', 'article', 'header', 'footer', 'main',
+    'nav', 'aside', 'figure', 'figcaption', 'address', 'dl', 'dt', 'dd', 'center',
+}
+
+# 成对包围内容的行内标签
+_INLINE_MARKS = {
+    'strong': '**', 'b': '**',
+    'em': '*', 'i': '*',
+    'del': '~~', 's': '~~', 'strike': '~~',
+}
+
+
+def _longest_backtick_run(text):
+    """文本中最长的连续反引号数，代码标记需要比它更长"""
+    return max((len(run) for run in re.findall(r'`+', text)), default=0)
+
+
+class _MarkdownWriter:
+    """html_to_markdown 的输出状态
+    
+    遍历时依次收到进入标签、文本、离开标签三种事件：行内内容先累积在当前段落中，
+    遇到块级边界时整段输出，并加上标题、列表、引用等前缀。
+    """
+    
+    def __init__(self):
+        self.blocks = []          # (类型, 引用层级, 文本)
+        self.inline = []          # 当前段落的行内片段
+        self.quote_depth = 0
+        self.lists = []           # 每层列表: [是否有序, 下一个序号, 是否为列表外的 <li> 补上的列表]
+        self.item_marker = None   # 当前列表项尚未输出的标记
+        self.new_list = False     # 下一个列表项是否是新列表的第一项
+        self.heading = None       # 当前标题前缀
+        self.open_mark = None     # 刚输出、后面还没有内容的行内开始标记的位置
+        self.marks = []           # 未结束的行内标记的开始位置（段落已输出时为 None）
+    
+    def enter(self, tag):
+        """进入标签，返回是否需要继续遍历子节点"""
+        name = tag.name
+        
+        if name in _SKIPPED_TAGS:
+            return False
+        
+        if name in _INLINE_MARKS:
+            self.inline.append(_INLINE_MARKS[name])
+            self.open_mark = len(self.inline) - 1
+            self.marks.append(self.open_mark)
+        elif name == 'a':
+            self.inline.append('[')
+            self.open_mark = len(self.inline) - 1
+            self.marks.append(self.open_mark)
+        elif name == 'code':
+            text = tag.get_text()
+            fence = '`' * (_longest_backtick_run(text) + 1)
+            # 以反引号开头或结尾的代码需要用空格与标记隔开
+            if text[:1] == '`' or text[-1:] == '`':
+                text = f" {text} "
+            self.inline.append(f"{fence}{text}{fence}")
+            return False
+        elif name == 'img':
+            self.inline.append(f"![{tag.get('alt', '')}]({tag.get('src', '')})")
+            return False
+        elif name == 'br':
+            self.inline.append('\0')
+            return False
+        elif name in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            self.flush()
+            self.heading = '#' * int(name[1]) + ' '
+        elif name == 'blockquote':
+            self.flush()
+            self.quote_depth += 1
+        elif name in ('ul', 'ol'):
+            self.flush()
+            if not self.lists:
+                self.new_list = True
+            start = tag.get('start', '1')
+            self.lists.append([name == 'ol', int(start) if start.isdigit() else 1, False])
+        elif name == 'li':
+            self.flush()
+            if not self.lists:
+                self.lists.append([False, 1, True])
+            ordered, number, _ = self.lists[-1]
+            self.item_marker = f"{number}. " if ordered else "- "
+            self.lists[-1][1] += 1
+        elif name == 'pre':
+            self.flush()
+            self.pre(tag)
+            return False
+        elif name == 'hr':
+            self.flush()
+            self.add_block('hr', '---')
+            return False
+        elif name == 'table':
+            self.flush()
+            self.table(tag)
+            return False
+        elif name in _BLOCK_TAGS:
+            self.flush()
+        
+        return True
+    
+    def leave(self, tag):
+        """离开标签"""
+        name = tag.name
+        
+        if name in _INLINE_MARKS:
+            self.close_mark(_INLINE_MARKS[name])
+        elif name == 'a':
+            href = tag.get('href')
+            self.close_mark(f"]({href})" if href else ']')
+        elif name in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            self.flush()
+            self.heading = None
+        elif name == 'blockquote':
+            self.flush()
+            self.quote_depth -= 1
+        elif name in ('ul', 'ol'):
+            self.flush()
+            self.lists.pop()
+            self.item_marker = None
+        elif name == 'li':
+            self.flush()
+            self.item_marker = None
+            if self.lists and self.lists[-1][2]:
+                self.lists.pop()
+        elif name in _BLOCK_TAGS:
+            self.flush()
+    
+    def text(self, text):
+        """行内文本"""
+        # 开始标记后的空白移到标记之前，避免输出 "** 粗体**"
+        if self.open_mark == len(self.inline) - 1 and text[:1].isspace():
+            self.inline[-1] = ' ' + self.inline[-1]
+            text = text.lstrip()
+        if text:
+            self.inline.append(text)
+            self.open_mark = None
+    
+    def close_mark(self, mark):
+        """输出行内结束标记，结束标记前的空白移到标记之后；标记之间没有内容时两个标记都不输出"""
+        start = self.marks.pop() if self.marks else None
+        if start is not None and start == len(self.inline) - 1:
+            opening = self.inline.pop()
+            if opening[:1].isspace():
+                self.inline.append(' ')
+            self.open_mark = None
+            return
+        
+        if self.inline and self.inline[-1][-1:].isspace():
+            self.inline[-1] = self.inline[-1].rstrip()
+            self.inline.append(mark + ' ')
+        else:
+            self.inline.append(mark)
+        self.open_mark = None
+    
+    def indent(self):
+        """当前列表项内容的缩进"""
+        return '    ' * len(self.lists)
+    
+    def flush(self):
+        """将累积的行内内容作为一个段落输出"""
+        text = ' '.join(''.join(self.inline).split())
+        self.inline = []
+        self.open_mark = None
+        self.marks = [None] * len(self.marks)
+        if not text:
+            return
+        
+        # 合并空白后再还原 <br> 为Markdown硬换行
+        continuation = self.indent() if self.lists else ''
+        text = text.replace(' \0', '\0').replace('\0 ', '\0').replace('\0', '  \n' + continuation)
+        
+        if self.heading:
+            self.add_block('heading', self.heading + text)
+        elif self.item_marker is not None:
+            kind = 'first-item' if self.new_list else 'item'
+            self.add_block(kind, '    ' * (len(self.lists) - 1) + self.item_marker + text)
+            self.item_marker = None
+            self.new_list = False
+        else:
+            self.add_block('text', continuation + text)
+    
+    def pre(self, tag):
+        """代码块"""
+        language = ''
+        code = tag.find('code')
+        if code is not None:
+            for css_class in code.get('class', []):
+                if css_class.startswith('language-'):
+                    language = css_class[len('language-'):]
+        
+        code_text = tag.get_text().rstrip('\n')
+        indent = self.indent() if self.lists else ''
+        fence = '`' * max(3, _longest_backtick_run(code_text) + 1)
+        lines = [f"{fence}{language}"] + code_text.split('\n') + [fence]
+        self.add_block('pre', '\n'.join(indent + line if line else line for line in lines))
+    
+    def table(self, tag):
+        """表格：第一行作为表头"""
+        rows = []
+        sections = [tag] + tag.find_all(['thead', 'tbody', 'tfoot'], recursive=False)
+        for section in sections:
+            for tr in section.find_all('tr', recursive=False):
+                cells = [
+                    cell.get_text(' ', strip=True).replace('|', '\\|')
+                    for cell in tr.find_all(['th', 'td'], recursive=False)
+                ]
+                if cells:
+                    rows.append(cells)
+        
+        if not rows:
+            return
+        
+        width = max(len(row) for row in rows)
+        lines = []
+        for i, row in enumerate(rows):
+            row = row + [''] * (width - len(row))
+            lines.append('| ' + ' | '.join(row) + ' |')
+            if i == 0:
+                lines.append('|' + ' --- |' * width)
+        self.add_block('table', '\n'.join(lines))
+    
+    def add_block(self, kind, text):
+        """添加一个块，在引用中时为每行加上引用前缀"""
+        if self.quote_depth:
+            quote = '> ' * self.quote_depth
+            text = '\n'.join(quote + line if line else quote.rstrip() for line in text.split('\n'))
+        self.blocks.append((kind, self.quote_depth, text))
+    
+    def result(self):
+        """拼接所有块"""
+        self.flush()
+        
+        parts = []
+        previous = None
+        for kind, quote_depth, text in self.blocks:
+            if previous is not None:
+                if kind == 'item' and previous[0] in ('item', 'first-item'):
+                    # 相邻列表项之间不空行，保持为紧凑列表
+                    parts.append('\n')
+                elif quote_depth and previous[1]:
+                    # 同一引用内的段落之间用 ">" 空行分隔，避免引用被截断
+                    parts.append('\n' + ('> ' * min(quote_depth, previous[1])).rstrip() + '\n')
+                else:
+                    parts.append('\n\n')
+            parts.append(text)
+            previous = (kind, quote_depth)
+        
+        return ''.join(parts)
 
 
 class UniversalToWeChatConverter:
     """通用格式到微信公众号转换器"""
     
-    def __init__(self, style="default"):
-        """初始化转换器"""
+    # 可以直接生成HTML、不经过Markdown中间格式的输入格式
+    DIRECT_HTML_FORMATS = {'rst'}
+    
+    # Word文档转换引擎
+    DOCX_ENGINES = ('auto', 'python-docx', 'mammoth')
+    
+    # 内置格式转Markdown的方法（其余格式使用注册表中插件提供的转换函数）
+    MARKDOWN_METHODS = {
+        'html': 'html_to_markdown',
+        'text': 'text_to_markdown',
+        'rst': 'rst_to_markdown',
+        'docx': 'docx_to_markdown',
+        'rtf': 'rtf_to_markdown',
+    }
+    
+    # 纯文本行首标记对应的Markdown标记
+    TEXT_LINE_MARKERS = {
+        '#': '# ',
+        '##': '## ',
+        '###': '### ',
+        '-': '- ',
+        '*': '- ',
+        '>': '> ',
+        '1.': '1. ',
+    }
+    
+    def __init__(self, style="default", docx_engine="auto", asset_store=None, markdown_cache=None):
+        """初始化转换器
+        
+        Args:
+            style (str): 文章风格
+            docx_engine (str): Word文档转换引擎
+            asset_store (AssetStore): 保存Word文档中图片的资源存储，为 None 时不输出图片
+            markdown_cache (MarkdownCache): 中间结果缓存，为 None 时每次都从源文件转换
+        """
         self.style = style
         self.wechat_styles = WeChatStyleTemplates.get_style_template(style)
+        self.docx_engine = self.resolve_docx_engine(docx_engine)
+        self.asset_store = asset_store
+        self.markdown_cache = markdown_cache
+        
+        # 最近一次转换的中间结果信息（缓存键、类型、是否命中缓存），未使用缓存时为 None
+        self.last_intermediate = None
         
         # Markdown配置
         self.md_extensions = [
@@ -64,180 +347,206 @@ class UniversalToWeChatConverter:
                 'noclasses': True,
             }
         }
+        
+        # RST发布器：第一次转换RST时创建，之后重复转换时复用设置和docutils组件
+        self._rst_publisher = None
+        self._rst_html_publisher = None
+    
+    @property
+    def rst_publisher(self):
+        """生成微信公众号HTML的RST发布器"""
+        if self._rst_publisher is None:
+            get_format('rst').require()
+            from rst_wechat import SAFE_SETTINGS, RSTPublisher
+            self._rst_publisher = RSTPublisher()
+        return self._rst_publisher
+    
+    @property
+    def rst_html_publisher(self):
+        """使用docutils默认HTML写入器的RST发布器（用于转Markdown）"""
+        if self._rst_html_publisher is None:
+            get_format('rst').require()
+            import docutils.writers
+            from rst_wechat import SAFE_SETTINGS, RSTPublisher
+            self._rst_html_publisher = RSTPublisher(
+                docutils.writers.get_writer_class('html'),
+                {**SAFE_SETTINGS, 'output_encoding': 'unicode'}
+            )
+        return self._rst_html_publisher
+    
+    def resolve_docx_engine(self, engine):
+        """确定Word文档的转换引擎
+        
+        auto 优先使用python-docx单次遍历生成Markdown（大文档上比mammoth快约4倍、内存峰值更低），
+        未安装python-docx时使用mammoth；mammoth按Word样式直接生成HTML，保留引用、脚注等更多语义。
+        """
+        if engine not in self.DOCX_ENGINES:
+            raise ValueError(f"不支持的Word转换引擎: {engine}")
+        if engine == 'auto':
+            if PYTHON_DOCX.available() or not MAMMOTH.available():
+                return 'python-docx'
+            return 'mammoth'
+        return engine
+    
+    def is_direct_html(self, file_format):
+        """该格式是否直接生成HTML，不经过Markdown"""
+        if file_format in self.DIRECT_HTML_FORMATS or (file_format == 'docx' and self.docx_engine == 'mammoth'):
+            return True
+        if file_format in self.MARKDOWN_METHODS:
+            return False
+        plugin = get_format(file_format)
+        return plugin is not None and plugin.to_html is not None and plugin.to_markdown is None
+    
+    def input_format(self, file_format):
+        """查找输入格式插件，未注册时抛出 ValueError"""
+        plugin = get_format(file_format)
+        if plugin is None:
+            raise ValueError(f"不支持的格式: {file_format}")
+        return plugin
+    
+    def read_source(self, input_file, plugin):
+        """按插件的读取方式读取输入：二进制格式返回文件路径，文本格式返回解码后的内容"""
+        return input_file if plugin.binary else read_text(input_file)
+    
+    def docx_images(self, file_path):
+        """提取Word文档中的图片到资源存储，未配置资源存储时返回 None"""
+        if self.asset_store is None:
+            return None
+        return extract_docx_images(file_path, self.asset_store)
     
     def detect_file_format(self, file_path):
-        """检测文件格式"""
-        path = Path(file_path)
-        suffix = path.suffix.lower()
-        
-        format_map = {
-            '.md': 'markdown',
-            '.markdown': 'markdown',
-            '.html': 'html',
-            '.htm': 'html',
-            '.txt': 'text',
-            '.rst': 'rst',
-            '.docx': 'docx',
-            '.rtf': 'rtf',
-        }
+        """检测文件格式
         
-        return format_map.get(suffix, 'unknown')
+        只读取文件开头的一小段内容按文件签名和内容特征判断，扩展名作为提示，
+        因此另存为 .txt 的Markdown、没有扩展名的Word文档也能走正确的转换流程。
+        """
+        return detect_format(file_path)
     
     def convert_to_markdown(self, content, file_format, file_path=None):
-        """将各种格式转换为Markdown"""
+        """将各种格式转换为Markdown
+        
+        内置格式按 MARKDOWN_METHODS 调用对应方法，其余格式使用注册表中插件的转换函数。
+        二进制格式（如Word文档）使用 file_path，其余格式使用 content。
+        """
         if file_format == 'markdown':
             return content
-        elif file_format == 'html':
-            return self.html_to_markdown(content)
-        elif file_format == 'text':
-            return self.text_to_markdown(content)
-        elif file_format == 'rst':
-            return self.rst_to_markdown(content)
-        elif file_format == 'docx':
-            return self.docx_to_markdown(file_path)
-        elif file_format == 'rtf':
-            return self.rtf_to_markdown(content)
-        else:
-            raise ValueError(f"不支持的格式: {file_format}")
+        
+        plugin = self.input_format(file_format)
+        source = file_path if plugin.binary else content
+        
+        method = self.MARKDOWN_METHODS.get(file_format)
+        if method:
+            return getattr(self, method)(source)
+        
+        plugin.require()
+        if plugin.to_markdown is not None:
+            return plugin.to_markdown(source, self)
+        if plugin.to_html is not None:
+            return self.html_to_markdown(plugin.to_html(source, self))
+        raise ValueError(f"不支持的格式: {file_format}")
     
     def html_to_markdown(self, html_content):
-        """HTML转Markdown"""
+        """HTML转Markdown
+        
+        对文档树做一次遍历，每个节点只输出一次，耗时与文档大小成线性关系。
+        遍历使用显式栈而不是递归，深层嵌套的HTML也不会超出递归深度限制。
+        """
         soup = BeautifulSoup(html_content, 'html.parser')
-        markdown_content = []
-        
-        for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'li', 'blockquote', 'pre', 'code', 'strong', 'em', 'a', 'img']):
-            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                level = element.name[1]
-                markdown_content.append(f"{'#' * int(level)} {element.get_text()}")
-            elif element.name == 'p':
-                text = element.get_text().strip()
-                if text:
-                    markdown_content.append(text)
-            elif element.name == 'ul':
-                for li in element.find_all('li', recursive=False):
-                    markdown_content.append(f"- {li.get_text()}")
-            elif element.name == 'ol':
-                for i, li in enumerate(element.find_all('li', recursive=False), 1):
-                    markdown_content.append(f"{i}. {li.get_text()}")
-            elif element.name == 'blockquote':
-                text = element.get_text().strip()
-                markdown_content.append(f"> {text}")
-            elif element.name == 'pre':
-                code_text = element.get_text()
-                markdown_content.append(f"```\n{code_text}\n```")
-            elif element.name == 'code':
-                text = element.get_text()
-                markdown_content.append(f"`{text}`")
-            elif element.name == 'strong':
-                text = element.get_text()
-                markdown_content.append(f"**{text}**")
-            elif element.name == 'em':
-                text = element.get_text()
-                markdown_content.append(f"*{text}*")
-            elif element.name == 'a':
-                text = element.get_text()
-                href = element.get('href', '')
-                markdown_content.append(f"[{text}]({href})")
-            elif element.name == 'img':
-                src = element.get('src', '')
-                alt = element.get('alt', '')
-                markdown_content.append(f"![{alt}]({src})")
-        
-        return '\n\n'.join(markdown_content)
+        writer = _MarkdownWriter()
+        
+        stack = [(soup, False)]
+        while stack:
+            node, leaving = stack.pop()
+            if leaving:
+                writer.leave(node)
+            elif isinstance(node, NavigableString):
+                if not isinstance(node, _SKIPPED_STRINGS):
+                    writer.text(str(node))
+            elif writer.enter(node):
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.contents))
+        
+        return writer.result()
     
-    def text_to_markdown(self, text_content):
-        """纯文本转Markdown"""
-        lines = text_content.split('\n')
-        markdown_lines = []
+    def iter_text_markdown(self, lines):
+        """逐行转换纯文本，生成Markdown行
+        
+        每行按第一个空格前的标记查表（TEXT_LINE_MARKERS），没有标记的行原样保留。
         
+        Args:
+            lines: 文本行的可迭代对象（如文件对象或 iter_lines 的结果）
+        """
         for line in lines:
             line = line.strip()
-            if not line:
-                markdown_lines.append('')
-            elif line.startswith('# '):
-                markdown_lines.append(f"# {line[2:]}")
-            elif line.startswith('## '):
-                markdown_lines.append(f"## {line[3:]}")
-            elif line.startswith('### '):
-                markdown_lines.append(f"### {line[4:]}")
-            elif line.startswith('- '):
-                markdown_lines.append(f"- {line[2:]}")
-            elif line.startswith('* '):
-                markdown_lines.append(f"- {line[2:]}")
-            elif line.startswith('> '):
-                markdown_lines.append(f"> {line[2:]}")
-            elif line.startswith('1. '):
-                markdown_lines.append(f"1. {line[3:]}")
-            else:
-                markdown_lines.append(line)
+            marker, space, rest = line.partition(' ')
+            prefix = self.TEXT_LINE_MARKERS.get(marker) if space else None
+            yield f"{prefix}{rest}" if prefix else line
+    
+    def text_to_markdown(self, text_content):
+        """纯文本转Markdown
         
-        return '\n'.join(markdown_lines)
+        Args:
+            text_content: 文本字符串，或文本行的可迭代对象
+        """
+        lines = io.StringIO(text_content) if isinstance(text_content, str) else text_content
+        return '\n'.join(self.iter_text_markdown(lines))
+    
+    def rst_to_html(self, rst_content):
+        """RST直接转HTML片段，不经过Markdown中间格式"""
+        publisher = self.rst_publisher
+        from rst_wechat import publish_wechat_html
+        return publish_wechat_html(rst_content, publisher)
     
     def rst_to_markdown(self, rst_content):
         """RST转Markdown"""
-        if not RST_AVAILABLE:
-            raise ImportError("需要安装 docutils: pip install docutils")
-        
         # 使用docutils转换RST到HTML，然后转Markdown
-        html = docutils.core.publish_parts(
-            source=rst_content,
-            writer_name='html',
-            settings_overrides={'output_encoding': 'unicode'}
-        )['html_body']
+        html = self.rst_html_publisher.publish_parts(rst_content)['html_body']
         
         return self.html_to_markdown(html)
     
+    def docx_to_html(self, file_path):
+        """Word文档直接转HTML片段（基于mammoth），不经过Markdown中间格式"""
+        MAMMOTH.load()
+        from docx_html import docx_to_html
+        
+        images = self.docx_images(file_path)
+        return docx_to_html(file_path, images.url_for_bytes if images else None)
+    
     def docx_to_markdown(self, file_path):
         """Word文档转Markdown"""
-        if not DOCX_AVAILABLE:
-            raise ImportError("需要安装 python-docx: pip install python-docx")
+        if self.docx_engine == 'mammoth':
+            return self.html_to_markdown(self.docx_to_html(file_path))
         
-        doc = Document(file_path)
-        markdown_content = []
+        PYTHON_DOCX.load()
+        from docx import Document
+        from docx_markdown import DocxMarkdownBuilder
         
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
-            if not text:
-                continue
-            
-            # 检测标题样式
-            if paragraph.style.name.startswith('Heading'):
-                level = paragraph.style.name.split()[-1]
-                if level.isdigit():
-                    markdown_content.append(f"{'#' * int(level)} {text}")
-                else:
-                    markdown_content.append(f"# {text}")
-            else:
-                # 检测粗体和斜体
-                formatted_text = text
-                for run in paragraph.runs:
-                    if run.bold:
-                        formatted_text = formatted_text.replace(run.text, f"**{run.text}**")
-                    if run.italic:
-                        formatted_text = formatted_text.replace(run.text, f"*{run.text}*")
-                
-                markdown_content.append(formatted_text)
-        
-        return '\n\n'.join(markdown_content)
-    
-    def rtf_to_markdown(self, rtf_content):
-        """RTF转Markdown"""
-        if not RTF_AVAILABLE:
-            raise ImportError("需要安装 striprtf: pip install striprtf")
-        
-        # 使用striprtf转换RTF到纯文本
-        text = striprtf.rtf_to_text(rtf_content)
-        return self.text_to_markdown(text)
+        # 单次遍历：合并格式相同的相邻文字片段，表格、列表、超链接和图片一并处理
+        images = self.docx_images(file_path)
+        builder = DocxMarkdownBuilder(Document(file_path), images.url_for_part if images else None)
+        return builder.build()
     
-    def markdown_to_wechat_html(self, markdown_content, title="", subtitle=""):
-        """Markdown转微信公众号HTML"""
-        # 转换为HTML
+    def rtf_to_markdown(self, file_path):
+        """RTF转Markdown：逐段提取文字后按纯文本转换，跳过图片和嵌入对象"""
+        return self.text_to_markdown(iter_rtf_lines(file_path))
+    
+    def markdown_to_html(self, markdown_content):
+        """Markdown转HTML片段"""
         md = markdown.Markdown(
             extensions=self.md_extensions,
             extension_configs=self.md_config
         )
-        html_content = md.convert(markdown_content)
+        return md.convert(markdown_content)
+    
+    def markdown_to_wechat_html(self, markdown_content, title="", subtitle=""):
+        """Markdown转微信公众号HTML"""
+        return self.html_to_wechat_html(self.markdown_to_html(markdown_content), title, subtitle)
+    
+    def html_to_wechat_html(self, html_content, title="", subtitle=""):
+        """HTML片段转微信公众号HTML
         
+        各输入格式共用的后处理阶段：添加微信公众号适用的样式并生成完整的HTML文档。
+        """
         # 优化HTML
         soup = BeautifulSoup(html_content, 'html.parser')
         
@@ -284,6 +593,116 @@ class UniversalToWeChatConverter:
         
         return full_html
     
+    def file_to_markdown(self, input_file, file_format=None):
+        """读取文件并转换为Markdown"""
+        if file_format is None:
+            file_format = self.detect_file_format(input_file)
+        
+        if file_format == 'unknown':
+            raise ValueError(f"不支持的文件格式: {Path(getattr(input_file, 'name', '')).suffix}")
+        
+        plugin = self.input_format(file_format)
+        if plugin.binary:
+            # 二进制格式（如Word文档）直接读取文件
+            return self.convert_to_markdown(None, file_format, input_file)
+        
+        if file_format == 'text':
+            # 纯文本逐行转换，不先把整个文件解码成一个字符串
+            return self.text_to_markdown(iter_lines(input_file))
+        
+        content = read_text(input_file)
+        return self.convert_to_markdown(content, file_format, input_file)
+    
+    def intermediate_key(self, input_file, file_format):
+        """中间结果的缓存键：源文件哈希、格式、转换器版本和影响中间结果的选项"""
+        options = []
+        if file_format == 'docx':
+            # 图片地址写在中间结果中
+            options = [self.docx_engine, self.asset_store.url_prefix if self.asset_store else '']
+        return cache_key(source_digest(input_file), INTERMEDIATE_VERSION, file_format, *options)
+    
+    def convert_intermediate(self, input_file, file_format):
+        """读取文件并转换为中间结果，返回 (类型, 内容)
+        
+        RST、使用mammoth引擎的Word文档和只提供HTML转换函数的插件格式直接生成HTML片段，
+        类型为 html；其余格式转换为Markdown，类型为 markdown。
+        """
+        if file_format == 'rst':
+            return 'html', self.rst_to_html(read_text(input_file))
+        
+        if file_format == 'docx' and self.docx_engine == 'mammoth':
+            return 'html', self.docx_to_html(input_file)
+        
+        if self.is_direct_html(file_format):
+            plugin = self.input_format(file_format)
+            plugin.require()
+            return 'html', plugin.to_html(self.read_source(input_file, plugin), self)
+        
+        return 'markdown', self.file_to_markdown(input_file, file_format)
+    
+    def file_to_intermediate(self, input_file, file_format=None):
+        """读取文件并转换为中间结果，返回 (类型, 内容)
+        
+        设置了中间结果缓存时，内置的非Markdown格式的中间结果按缓存键复用，
+        切换风格或修改标题重新渲染时不再重复转换源文件。
+        """
+        if file_format is None:
+            file_format = self.detect_file_format(input_file)
+        
+        self.last_intermediate = None
+        if self.markdown_cache is None or file_format not in self.MARKDOWN_METHODS:
+            return self.convert_intermediate(input_file, file_format)
+        
+        key = self.intermediate_key(input_file, file_format)
+        cached = self.markdown_cache.find(key)
+        if cached is None:
+            kind, content = self.convert_intermediate(input_file, file_format)
+            self.markdown_cache.put(key, kind, content)
+        else:
+            kind, content = cached
+        
+        self.last_intermediate = {'key': key, 'kind': kind, 'cached': cached is not None}
+        return kind, content
+    
+    def file_to_html(self, input_file, file_format=None):
+        """读取文件并转换为HTML片段"""
+        kind, content = self.file_to_intermediate(input_file, file_format)
+        return content if kind == 'html' else self.markdown_to_html(content)
+    
+    def convert_file_to_html(self, input_file, title="", subtitle="", file_format=None):
+        """转换文件并返回微信公众号HTML
+        
+        与 convert_file 不同，本方法不写输出文件、不打印提示，出错时直接抛出异常，
+        供批量转换等需要自行处理结果的调用方使用。
+        """
+        html_content = self.file_to_html(input_file, file_format)
+        return self.html_to_wechat_html(html_content, title, subtitle)
+    
+    def convert_bytes(self, data, filename="", title="", subtitle=""):
+        """转换内存中的文件内容并返回微信公众号HTML，不读写输入输出文件
+        
+        Args:
+            data (bytes): 文件内容
+            filename (str): 原文件名，只用于按扩展名提示格式
+        """
+        source = io.BytesIO(data)
+        source.name = filename
+        return self.convert_file_to_html(source, title, subtitle)
+    
+    def convert_archive(self, archive, output_file, workers=1, limits=None, title="", subtitle=""):
+        """转换zip/tar压缩包中的所有文件，结果写入新的zip包，不解压到磁盘
+        
+        Args:
+            archive: 压缩包路径或以二进制方式打开的文件对象
+            output_file (str): 结果zip包路径
+            workers (int): 并行转换的进程数
+            limits (ArchiveLimits): 压缩包大小限制
+        
+        Returns:
+            dict: 转换报告
+        """
+        return ArchiveConverter(self, workers, limits).convert(archive, output_file, title, subtitle)
+    
     def convert_file(self, input_file, output_file=None, title="", subtitle=""):
         """转换文件"""
         try:
@@ -296,19 +715,20 @@ class UniversalToWeChatConverter:
             
             print(f"📄 检测到文件格式: {file_format}")
             
-            # 读取文件内容
-            if file_format == 'docx':
-                # Word文档需要特殊处理
-                markdown_content = self.docx_to_markdown(input_file)
+            kind, content = self.file_to_intermediate(input_file, file_format)
+            if self.last_intermediate and self.last_intermediate['cached']:
+                print(f"♻️ 使用缓存的中间结果")
+            if kind == 'html':
+                html_content = content
+                print(f"✅ 已直接转换为HTML")
+                pipeline = f"{file_format} → 微信公众号HTML"
             else:
-                with open(input_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                markdown_content = self.convert_to_markdown(content, file_format, input_file)
-            
-            print(f"✅ 已转换为Markdown格式")
+                print(f"✅ 已转换为Markdown格式")
+                html_content = self.markdown_to_html(content)
+                pipeline = f"{file_format} → Markdown → 微信公众号HTML"
             
             # 转换为微信公众号HTML
-            wechat_html = self.markdown_to_wechat_html(markdown_content, title, subtitle)
+            wechat_html = self.html_to_wechat_html(html_content, title, subtitle)
             
             # 确定输出文件名
             if not output_file:
@@ -322,7 +742,7 @@ class UniversalToWeChatConverter:
             print(f"🎉 转换完成！")
             print(f"输入文件: {input_file} ({file_format})")
             print(f"输出文件: {output_file}")
-            print(f"转换流程: {file_format} → Markdown → 微信公众号HTML")
+            print(f"转换流程: {pipeline}")
             print(f"可以直接复制HTML内容到微信公众号编辑器")
             
             return wechat_html
@@ -336,12 +756,17 @@ def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='通用格式到微信公众号文章格式转换器')
     parser.add_argument('input', nargs='?', help='输入文件路径')
-    parser.add_argument('-o', '--output', help='输出HTML文件路径')
+    parser.add_argument('-o', '--output', help='输出HTML文件路径（输入为压缩包时是结果zip包路径）')
     parser.add_argument('-t', '--title', help='文章标题')
     parser.add_argument('-s', '--subtitle', help='文章副标题')
     parser.add_argument('--style', help='文章风格', 
                        choices=WeChatStyleTemplates.get_available_styles(),
                        default='default')
+    parser.add_argument('--docx-engine', choices=UniversalToWeChatConverter.DOCX_ENGINES, default='auto',
+                       help='Word文档转换引擎（auto: 优先python-docx，未安装时使用mammoth）')
+    parser.add_argument('--assets-dir', help='Word文档中图片的保存目录（不指定时不输出图片）')
+    parser.add_argument('--cache-dir', help='中间结果缓存目录，切换风格重新转换时复用（不指定时不缓存）')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='输入为压缩包时并行转换的进程数（默认1）')
     parser.add_argument('--list-styles', action='store_true', help='列出所有可用风格')
     parser.add_argument('--list-formats', action='store_true', help='列出支持的输入格式')
     
@@ -351,22 +776,18 @@ def main():
     if args.list_formats:
         print("支持的输入格式：")
         print("=" * 50)
-        formats = [
-            ("Markdown", ".md, .markdown", "原生支持，功能最完整"),
-            ("HTML", ".html, .htm", "转换为Markdown后处理"),
-            ("纯文本", ".txt", "智能识别格式后转换"),
-            ("RST", ".rst", "需要安装 docutils"),
-            ("Word", ".docx", "需要安装 python-docx"),
-            ("RTF", ".rtf", "需要安装 striprtf"),
-        ]
-        
-        for name, extensions, description in formats:
-            print(f"{name:10} {extensions:15} - {description}")
+        for input_format in iter_formats():
+            extensions = ', '.join(input_format.suffixes)
+            description = input_format.description
+            if input_format.requires:
+                status = '已安装' if input_format.available() else '未安装'
+                description += f"（依赖{status}: {input_format.install_hint()}）"
+            print(f"{input_format.label:10} {extensions:15} - {description}")
         
         print("\n转换流程：")
         print("其他格式 → Markdown → 微信公众号HTML")
-        print("\n依赖安装命令：")
-        print("pip install docutils python-docx striprtf")
+        print("RST → 微信公众号HTML")
+        print("Word（--docx-engine mammoth）→ 微信公众号HTML")
         return
     
     # 列出风格
@@ -382,11 +803,39 @@ def main():
     if not args.input:
         parser.error("需要提供输入文件路径")
     
+    # 压缩包的结果写入新的zip包
+    archive = is_archive(args.input)
+    output_file = args.output
+    if archive and not output_file:
+        name = Path(args.input).name
+        output_file = str(Path(args.input).with_name(name[:name.index('.')] + '_wechat.zip'))
+    
     # 创建转换器
-    converter = UniversalToWeChatConverter(style=args.style)
+    asset_store = None
+    if args.assets_dir:
+        asset_store = AssetStore.for_output(args.assets_dir, output_file or Path(args.input).with_suffix('.html'))
+    
+    markdown_cache = MarkdownCache(args.cache_dir) if args.cache_dir else None
+    converter = UniversalToWeChatConverter(style=args.style, docx_engine=args.docx_engine, asset_store=asset_store,
+                                           markdown_cache=markdown_cache)
     
     # 执行转换
-    converter.convert_file(args.input, args.output, args.title, args.subtitle)
+    if not archive:
+        converter.convert_file(args.input, output_file, args.title, args.subtitle)
+        return
+    
+    try:
+        report = converter.convert_archive(args.input, output_file, args.workers, title=args.title or "",
+                                           subtitle=args.subtitle or "")
+    except (ValueError, OSError) as e:
+        print(f"❌ 转换失败: {str(e)}")
+        sys.exit(1)
+    
+    for item in report['results']:
+        if item['status'] != 'ok':
+            print(f"❌ {item['source']}: {item['error']}")
+    print(f"🎉 转换完成！成功 {report['converted']} 个，失败 {report['failed']} 个，跳过 {len(report['skipped'])} 个")
+    print(f"输出文件: {output_file}")
 
 
 if __name__ == "__main__":
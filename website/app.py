@@ -5,21 +5,34 @@ Markdown2WeChat 网站后端API服务
 基于Flask框架，提供文件转换API服务
 """
 
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, render_template, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 import tempfile
 import uuid
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
 from datetime import datetime, timedelta
+import io
+import itertools
 import json
+import multiprocessing
+import sqlite3
 
 # 导入转换器
 import sys
 sys.path.append('..')
 from universal_converter import UniversalToWeChatConverter
+from archive_converter import ArchiveConverter, ArchiveError, is_archive
+from asset_store import AssetStore
+from history_store import HistoryStore
+from markdown_cache import MarkdownCache
+from format_registry import allowed_extensions, format_table
 from wechat_styles import WeChatStyleTemplates
 
 # 配置日志
@@ -33,25 +46,84 @@ CORS(app)
 # 配置
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB最大文件大小
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['OUTPUT_FOLDER'] = 'outputs'
+app.config['OUTPUT_FOLDER'] = 'outputs'  # 旧版本保存转换结果的目录，只用于读取和清理旧记录
+app.config['ASSET_FOLDER'] = 'assets'
+app.config['CACHE_FOLDER'] = 'cache'
+app.config['DATA_FOLDER'] = 'data'
 app.config['SECRET_KEY'] = 'your-secret-key-here'
+app.config['ARCHIVE_WORKERS'] = 2  # 压缩包并行转换的进程数
+app.config['RECENT_OUTPUTS'] = 200  # 内存中保留的最近转换结果数
+app.config['CLEANUP_INTERVAL'] = int(os.environ.get('CLEANUP_INTERVAL', 3600))  # 清理间隔（秒），为0时不在后台清理
+app.config['FILE_RETENTION_HOURS'] = float(os.environ.get('FILE_RETENTION_HOURS', 24))  # 转换记录和结果的保留时间
+app.config['MAX_OUTPUT_BYTES'] = int(os.environ.get('MAX_OUTPUT_BYTES', 1024 * 1024 * 1024))  # 保存的转换结果总大小上限
+app.config['CLEANUP_BATCH'] = 200  # 每批清理的记录数
+app.config['MAX_CACHE_BYTES'] = int(os.environ.get('MAX_CACHE_BYTES', 256 * 1024 * 1024))  # 中间结果缓存总大小上限
 
 # 确保目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+os.makedirs(app.config['ASSET_FOLDER'], exist_ok=True)
+os.makedirs(app.config['CACHE_FOLDER'], exist_ok=True)
+os.makedirs(app.config['DATA_FOLDER'], exist_ok=True)
 
-# 允许的文件扩展名
-ALLOWED_EXTENSIONS = {
-    'md', 'markdown', 'html', 'htm', 'txt', 'rst', 'docx', 'rtf'
-}
+# 文章图片的资源存储：按内容哈希命名，各次转换共用，重复上传的图片直接复用
+asset_store = AssetStore(app.config['ASSET_FOLDER'], url_prefix='/api/assets')
 
-# 转换历史记录（实际项目中应使用数据库）
-conversion_history = {}
+# 中间结果缓存：同一文件换风格重新转换时直接复用源格式转换得到的Markdown或HTML片段
+markdown_cache = MarkdownCache(app.config['CACHE_FOLDER'])
+
+# 转换历史记录：保存在SQLite数据库中，各gunicorn工作进程共用
+history = HistoryStore(os.path.join(app.config['DATA_FOLDER'], 'history.db'))
+
+# 最近的转换结果：只是本进程的缓存，结果本身在转换完成时已保存到转换历史中
+recent_outputs = OrderedDict()
+recent_outputs_lock = threading.Lock()
+
+# 保存的转换结果超出大小上限时在后台线程中淘汰，不占用请求处理时间
+output_evictor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='output-evictor')
+
+def remember_output(conversion_id, html_content):
+    """把转换结果放入内存，超出数量时丢弃最早的结果"""
+    with recent_outputs_lock:
+        recent_outputs[conversion_id] = html_content
+        while len(recent_outputs) > app.config['RECENT_OUTPUTS']:
+            recent_outputs.popitem(last=False)
+
+def schedule_eviction():
+    """在后台淘汰最久没有访问的结果，直到保存的结果不超出大小上限"""
+    def evict():
+        try:
+            evict_outputs()
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"淘汰转换结果失败: {str(e)}")
+    
+    output_evictor.submit(evict)
+
+def load_output(record):
+    """读取转换结果：先查本进程的缓存，再查转换历史（所有工作进程共用），
+    最后查输出目录（旧版本把结果保存为文件），都没有时返回 None"""
+    history.touch_output(record['id'])
+    with recent_outputs_lock:
+        html_content = recent_outputs.get(record['id'])
+    if html_content is not None:
+        return html_content
+    
+    html_content = history.output(record['id'])
+    if html_content is not None:
+        remember_output(record['id'], html_content)
+        return html_content
+    
+    file_path = os.path.join(app.config['OUTPUT_FOLDER'], record['converted_filename'])
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
 
 def allowed_file(filename):
-    """检查文件扩展名是否允许"""
+    """检查文件扩展名是否允许（扩展名来自输入格式注册表）"""
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+           filename.rsplit('.', 1)[1].lower() in allowed_extensions()
 
 def generate_unique_filename(original_filename):
     """生成唯一的文件名"""
@@ -89,34 +161,27 @@ def convert_file():
         if style not in WeChatStyleTemplates.get_available_styles():
             style = 'default'
         
-        # 保存上传的文件
+        # 上传的文件直接在内存中转换，不写入上传目录
         filename = secure_filename(file.filename)
         unique_filename = generate_unique_filename(filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
-        
-        logger.info(f"文件上传成功: {unique_filename}")
+        data = file.read()
         
         # 创建转换器
-        converter = UniversalToWeChatConverter(style=style)
-        
-        # 执行转换
-        output_filename = f"converted_{unique_filename}.html"
-        output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
+        converter = UniversalToWeChatConverter(style=style, asset_store=asset_store, markdown_cache=markdown_cache)
         
-        result_html = converter.convert_file(
-            file_path, 
-            output_path, 
-            title, 
-            subtitle
-        )
+        # 执行转换（扩展名只用于提示格式）
+        start = time.perf_counter()
+        try:
+            result_html = converter.convert_bytes(data, file.filename, title, subtitle)
+        except ValueError as e:
+            return jsonify({'error': f'文件转换失败: {str(e)}'}), 400
+        elapsed = time.perf_counter() - start
         
-        if not result_html:
-            return jsonify({'error': '文件转换失败'}), 500
+        output_filename = f"converted_{unique_filename}.html"
         
-        # 记录转换历史
+        # 记录转换历史，结果一起保存，返回之后任何工作进程都能预览和下载
         conversion_id = str(uuid.uuid4())
-        conversion_history[conversion_id] = {
+        history.add({
             'id': conversion_id,
             'original_filename': filename,
             'converted_filename': output_filename,
@@ -124,11 +189,15 @@ def convert_file():
             'title': title,
             'subtitle': subtitle,
             'timestamp': datetime.now().isoformat(),
-            'file_size': os.path.getsize(file_path)
-        }
+            'file_size': len(data),
+            'output_size': len(result_html.encode('utf-8')),
+            'elapsed': elapsed,
+            'intermediate': converter.last_intermediate
+        }, html=result_html)
         
-        # 清理上传的临时文件
-        os.remove(file_path)
+        # 结果只保存在转换历史中，本进程另外缓存最近的结果
+        remember_output(conversion_id, result_html)
+        schedule_eviction()
         
         logger.info(f"转换完成: {conversion_id}")
         
@@ -139,28 +208,70 @@ def convert_file():
             'filename': output_filename,
             'style': style,
             'title': title,
-            'subtitle': subtitle
+            'subtitle': subtitle,
+            'intermediate': converter.last_intermediate
         })
         
     except Exception as e:
         logger.error(f"转换错误: {str(e)}")
         return jsonify({'error': f'转换失败: {str(e)}'}), 500
 
+@app.route('/api/convert-archive', methods=['POST'])
+def convert_archive():
+    """压缩包转换API：直接从上传的zip/tar包中读取文件转换，以zip包流式返回结果"""
+    if 'file' not in request.files:
+        return jsonify({'error': '没有上传文件'}), 400
+    
+    file = request.files['file']
+    if not is_archive(file.filename):
+        return jsonify({'error': '请上传zip或tar压缩包'}), 400
+    
+    title = request.form.get('title', '')
+    subtitle = request.form.get('subtitle', '')
+    style = request.form.get('style', 'default')
+    if style not in WeChatStyleTemplates.get_available_styles():
+        style = 'default'
+    
+    converter = ArchiveConverter(
+        UniversalToWeChatConverter(style=style, asset_store=asset_store),
+        workers=app.config['ARCHIVE_WORKERS'],
+        # 应用中有后台线程，转换进程用 spawn 启动，避免 fork 继承其他线程持有的锁
+        mp_context=multiprocessing.get_context('spawn')
+    )
+    chunks = converter.iter_archive(file.stream, title, subtitle)
+    
+    # 先取第一段数据，压缩包无效或超出限制时还能返回错误信息
+    try:
+        first = next(chunks)
+    except ArchiveError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    name = secure_filename(file.filename)
+    download_name = (name[:name.index('.')] if '.' in name else name) or 'archive'
+    logger.info(f"开始转换压缩包: {name}")
+    
+    return Response(
+        stream_with_context(itertools.chain([first], chunks)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={download_name}_wechat.zip'}
+    )
+
 @app.route('/api/download/<conversion_id>')
 def download_file(conversion_id):
     """下载转换后的文件"""
     try:
-        if conversion_id not in conversion_history:
+        record = history.get(conversion_id)
+        if record is None:
             return jsonify({'error': '转换记录不存在'}), 404
         
-        record = conversion_history[conversion_id]
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], record['converted_filename'])
+        html_content = load_output(record)
         
-        if not os.path.exists(file_path):
+        if html_content is None:
             return jsonify({'error': '文件不存在'}), 404
         
         return send_file(
-            file_path,
+            io.BytesIO(html_content.encode('utf-8')),
+            mimetype='text/html',
             as_attachment=True,
             download_name=f"wechat_article_{record['original_filename']}.html"
         )
@@ -173,24 +284,45 @@ def download_file(conversion_id):
 def preview_file(conversion_id):
     """预览转换后的文件"""
     try:
-        if conversion_id not in conversion_history:
+        record = history.get(conversion_id)
+        if record is None:
             return jsonify({'error': '转换记录不存在'}), 404
         
-        record = conversion_history[conversion_id]
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], record['converted_filename'])
+        html_content = load_output(record)
         
-        if not os.path.exists(file_path):
+        if html_content is None:
             return jsonify({'error': '文件不存在'}), 404
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
         return html_content
         
     except Exception as e:
         logger.error(f"预览错误: {str(e)}")
         return jsonify({'error': f'预览失败: {str(e)}'}), 500
 
+@app.route('/api/intermediate/<key>')
+def get_intermediate(key):
+    """查看缓存的中间结果（Markdown或HTML片段），key 为转换结果中的缓存键或转换记录ID"""
+    record = history.get(key)
+    if record is not None:
+        if not record.get('intermediate'):
+            return jsonify({'error': '该转换没有缓存的中间结果'}), 404
+        key = record['intermediate']['key']
+    
+    cached = markdown_cache.find(key)
+    if cached is None:
+        return jsonify({'error': '中间结果不存在'}), 404
+    
+    kind, content = cached
+    mimetype = 'text/markdown' if kind == 'markdown' else 'text/html'
+    return Response(content, mimetype=f'{mimetype}; charset=utf-8')
+
+@app.route('/api/assets/<path:name>')
+def get_asset(name):
+    """获取文章中的图片（按内容哈希命名，内容不会变化，可长期缓存）"""
+    response = send_from_directory(app.config['ASSET_FOLDER'], name, max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/api/styles')
 def get_styles():
     """获取所有可用的风格"""
@@ -212,14 +344,7 @@ def get_styles():
 def get_formats():
     """获取支持的格式"""
     try:
-        formats = [
-            {'name': 'Markdown', 'extensions': ['.md', '.markdown'], 'description': '原生支持，功能最完整'},
-            {'name': 'HTML', 'extensions': ['.html', '.htm'], 'description': '转换为Markdown后处理'},
-            {'name': '纯文本', 'extensions': ['.txt'], 'description': '智能识别格式后转换'},
-            {'name': 'RST', 'extensions': ['.rst'], 'description': '需要安装 docutils'},
-            {'name': 'Word', 'extensions': ['.docx'], 'description': '需要安装 python-docx'},
-            {'name': 'RTF', 'extensions': ['.rtf'], 'description': '需要安装 striprtf'},
-        ]
+        formats = format_table()
         
         return jsonify({'formats': formats})
         
@@ -232,7 +357,7 @@ def get_history():
     """获取转换历史"""
     try:
         # 只返回最近50条记录
-        recent_history = list(conversion_history.values())[-50:]
+        recent_history = history.recent(50)
         return jsonify({'history': recent_history})
         
     except Exception as e:
@@ -243,25 +368,8 @@ def get_history():
 def get_stats():
     """获取统计信息"""
     try:
-        total_conversions = len(conversion_history)
-        
-        # 按风格统计
-        style_stats = {}
-        for record in conversion_history.values():
-            style = record['style']
-            style_stats[style] = style_stats.get(style, 0) + 1
-        
-        # 按格式统计
-        format_stats = {}
-        for record in conversion_history.values():
-            ext = os.path.splitext(record['original_filename'])[1].lower()
-            format_stats[ext] = format_stats.get(ext, 0) + 1
-        
-        return jsonify({
-            'total_conversions': total_conversions,
-            'style_stats': style_stats,
-            'format_stats': format_stats
-        })
+        # 统计计数在每次转换时累加，这里只读取计数
+        return jsonify(history.stats())
         
     except Exception as e:
         logger.error(f"获取统计错误: {str(e)}")
@@ -291,33 +399,74 @@ def internal_error(e):
     """500错误处理"""
     return jsonify({'error': '服务器内部错误'}), 500
 
+def remove_output_file(conversion_id, output_filename):
+    """删除本进程缓存中的转换结果，以及旧版本保存在输出目录中的结果文件"""
+    with recent_outputs_lock:
+        recent_outputs.pop(conversion_id, None)
+    try:
+        os.remove(os.path.join(app.config['OUTPUT_FOLDER'], output_filename))
+    except FileNotFoundError:
+        pass
+
+def evict_outputs():
+    """保存的转换结果超出大小上限时分批淘汰最久没有访问的结果，返回淘汰的结果数"""
+    evicted = 0
+    while True:
+        removed = history.evict_outputs(app.config['MAX_OUTPUT_BYTES'], app.config['CLEANUP_BATCH'])
+        if not removed:
+            return evicted
+        for conversion_id, output_filename in removed:
+            remove_output_file(conversion_id, output_filename)
+        evicted += len(removed)
+
 def cleanup_old_files():
     """清理旧文件"""
     try:
-        current_time = datetime.now()
-        
-        # 清理超过24小时的转换记录
-        expired_records = []
-        for record_id, record in conversion_history.items():
-            record_time = datetime.fromisoformat(record['timestamp'])
-            if current_time - record_time > timedelta(hours=24):
-                expired_records.append(record_id)
-        
-        for record_id in expired_records:
-            record = conversion_history.pop(record_id)
-            file_path = os.path.join(app.config['OUTPUT_FOLDER'], record['converted_filename'])
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        
-        logger.info(f"清理了 {len(expired_records)} 个过期记录")
+        # 按时间索引从最早的开始分批删除过期记录，每批一个短事务，不长时间占用写锁
+        cutoff = (datetime.now() - timedelta(hours=app.config['FILE_RETENTION_HOURS'])).isoformat()
+        expired = 0
+        while True:
+            expired_records = history.delete_before(cutoff, limit=app.config['CLEANUP_BATCH'])
+            for record in expired_records:
+                remove_output_file(record['id'], record['converted_filename'])
+            expired += len(expired_records)
+            if len(expired_records) < app.config['CLEANUP_BATCH']:
+                break
+        
+        evicted = evict_outputs()
+        logger.info(f"清理了 {expired} 个过期记录，淘汰了 {evicted} 个超出大小上限的结果")
+        
+        # 中间结果缓存：保留时间与转换记录相同，超出大小上限时删除最久没有使用的
+        pruned, freed = markdown_cache.prune(
+            max_age=app.config['FILE_RETENTION_HOURS'] * 3600,
+            max_bytes=app.config['MAX_CACHE_BYTES']
+        )
+        logger.info(f"清理了 {pruned} 个缓存的中间结果，释放 {freed // 1024} KB")
         
     except Exception as e:
         logger.error(f"清理文件错误: {str(e)}")
 
+def run_cleanup_scheduler(stop_event):
+    """后台定时清理：每个工作进程都运行，每个周期只有一个进程执行清理"""
+    interval = app.config['CLEANUP_INTERVAL']
+    while True:
+        try:
+            # 每个进程积累的访问时间在淘汰之前写入，淘汰按所有进程的访问时间进行
+            history.flush_touches()
+            if history.claim('cleanup', interval):
+                cleanup_old_files()
+        except Exception as e:
+            logger.error(f"定时清理错误: {str(e)}")
+        if stop_event.wait(interval):
+            return
+
+# 导入时启动（gunicorn每个工作进程各自导入应用）；
+# 压缩包转换的子进程（spawn 方式启动时也会导入应用）不启动
+cleanup_stop = threading.Event()
+if app.config['CLEANUP_INTERVAL'] > 0 and multiprocessing.parent_process() is None:
+    threading.Thread(target=run_cleanup_scheduler, args=(cleanup_stop,), name='cleanup', daemon=True).start()
+
 if __name__ == '__main__':
-    # 启动时清理旧文件
-    cleanup_old_files()
-    
     # 启动Flask应用
     app.run(
         host='0.0.0.0',
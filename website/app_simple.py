@@ -8,6 +8,8 @@ Markdown2WeChat 网站后端API服务
 from flask import Flask, request, jsonify, send_file, render_template_string
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+import html
+import io
 import os
 import uuid
 from pathlib import Path
@@ -40,6 +42,14 @@ ALLOWED_EXTENSIONS = {
     'md', 'markdown', 'html', 'htm', 'txt'
 }
 
+# 纯文本行首标记对应的HTML标签
+TEXT_LINE_TAGS = {
+    '#': 'h1',
+    '##': 'h2',
+    '###': 'h3',
+    '-': 'li',
+}
+
 # 简单的样式模板
 STYLES = {
     'default': {
@@ -100,8 +110,22 @@ def generate_unique_filename(original_filename):
     name, ext = os.path.splitext(original_filename)
     return f"{name}_{timestamp}_{unique_id}{ext}"
 
+def iter_text_html(lines):
+    """逐行转换纯文本，按行首标记查表（TEXT_LINE_TAGS）生成HTML行"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            yield '<br>'
+            continue
+        marker, space, rest = line.partition(' ')
+        tag = TEXT_LINE_TAGS.get(marker) if space else None
+        if tag:
+            yield f'<{tag}>{html.escape(rest, quote=False)}</{tag}>'
+        else:
+            yield f'<p>{html.escape(line, quote=False)}</p>'
+
 def convert_to_html(content, file_format):
-    """将内容转换为HTML"""
+    """将内容转换为HTML，纯文本可以传入文本行的可迭代对象（如文件对象）"""
     if file_format in ['md', 'markdown']:
         # Markdown转换
         md = markdown.Markdown(extensions=['tables', 'fenced_code', 'codehilite', 'extra'])
@@ -111,23 +135,8 @@ def convert_to_html(content, file_format):
         return content
     elif file_format == 'txt':
         # 纯文本转换为简单HTML
-        lines = content.split('\n')
-        html_lines = []
-        for line in lines:
-            line = line.strip()
-            if not line:
-                html_lines.append('<br>')
-            elif line.startswith('# '):
-                html_lines.append(f'<h1>{line[2:]}</h1>')
-            elif line.startswith('## '):
-                html_lines.append(f'<h2>{line[3:]}</h2>')
-            elif line.startswith('### '):
-                html_lines.append(f'<h3>{line[4:]}</h3>')
-            elif line.startswith('- '):
-                html_lines.append(f'<li>{line[2:]}</li>')
-            else:
-                html_lines.append(f'<p>{line}</p>')
-        return '\n'.join(html_lines)
+        lines = io.StringIO(content) if isinstance(content, str) else content
+        return '\n'.join(iter_text_html(lines))
     else:
         return f'<p>不支持的文件格式: {file_format}</p>'
 
@@ -199,15 +208,13 @@ def convert_file():
         
         logger.info(f"文件上传成功: {unique_filename}")
         
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
         # 检测文件格式
         file_format = filename.rsplit('.', 1)[1].lower()
         
-        # 转换为HTML
-        html_content = convert_to_html(content, file_format)
+        # 读取文件并转换为HTML（纯文本直接逐行读取）
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f if file_format == 'txt' else f.read()
+            html_content = convert_to_html(content, file_format)
         
         # 创建微信公众号HTML
         result_html = create_wechat_html(html_content, title, subtitle, style)